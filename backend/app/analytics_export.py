@@ -0,0 +1,120 @@
+"""
+Streaming export of analytics logs.
+
+Exports read analytics_logs in (timestamp, id) order with yield_per, so rows
+arrive from the database EXPORT_CHUNK at a time and are written out before
+the next chunk is fetched. Memory stays flat however many rows match.
+
+Two formats:
+
+    NDJSON    one JSON object per log, streamed by GET /_synthetic/logs/export
+              and written by export_analytics.py, optionally gzip-compressed
+    columnar  gzip-compressed JSON files of COLUMNAR_CHUNK rows each, holding
+              one array per column, plus a manifest.json listing the files;
+              written by export_analytics.py --format columnar
+"""
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .db.models import AnalyticsLog
+
+EXPORT_CHUNK = 1000
+COLUMNAR_CHUNK = 50000
+EXPORT_COLUMNS = ("id", "session_id", "event_type", "event_data", "timestamp", "user_id")
+
+
+def export_statement(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     session_id: Optional[str] = None, event_type: Optional[str] = None,
+                     chunk: int = EXPORT_CHUNK):
+    """Logs from start (inclusive) to end (exclusive), oldest first, fetched chunk rows at a time"""
+    if start is not None and end is not None and start >= end:
+        raise ValueError("start must be before end")
+    statement = select(*(getattr(AnalyticsLog, column) for column in EXPORT_COLUMNS))
+    if start is not None:
+        statement = statement.where(AnalyticsLog.timestamp >= start)
+    if end is not None:
+        statement = statement.where(AnalyticsLog.timestamp < end)
+    if session_id is not None:
+        statement = statement.where(AnalyticsLog.session_id == session_id)
+    if event_type is not None:
+        statement = statement.where(AnalyticsLog.event_type == event_type)
+    return statement.order_by(AnalyticsLog.timestamp, AnalyticsLog.id).execution_options(yield_per=chunk)
+
+
+def record_of(row: Sequence[Any]) -> Dict[str, Any]:
+    """A log row as the JSON object GET /_synthetic/logs returns for it"""
+    record = dict(zip(EXPORT_COLUMNS, row))
+    if record["timestamp"] is not None:
+        record["timestamp"] = record["timestamp"].isoformat()
+    return record
+
+
+def ndjson_of(rows: Iterable[Sequence[Any]]) -> bytes:
+    return "".join(json.dumps(record_of(row)) + "\n" for row in rows).encode()
+
+
+def iter_ndjson(session: Session, statement) -> Iterator[bytes]:
+    """NDJSON of the statement's rows, one block of lines per fetched chunk"""
+    for rows in session.execute(statement).partitions():
+        yield ndjson_of(rows)
+
+
+async def stream_ndjson(db: AsyncSession, statement, compress: bool = False) -> AsyncIterator[bytes]:
+    """NDJSON of the statement's rows for a StreamingResponse, gzip-compressed on the fly with compress"""
+    # wbits 31: a gzip stream rather than raw zlib
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    result = await db.stream(statement)
+    async for rows in result.partitions():
+        data = ndjson_of(rows)
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def write_columnar(session: Session, statement, directory: str, chunk_rows: int = COLUMNAR_CHUNK,
+                   prefix: str = "analytics_logs") -> Dict[str, Any]:
+    """Write the statement's rows as gzip-compressed columnar chunk files and a manifest.
+
+    Each file is JSON {"columns": [...], "rows": n, "data": {column: [values]}}.
+    Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files: List[Dict[str, Any]] = []
+    data: Dict[str, List[Any]] = {column: [] for column in EXPORT_COLUMNS}
+
+    def write_chunk():
+        name = f"{prefix}-{len(files):05d}.json.gz"
+        with gzip.open(os.path.join(directory, name), "wt") as file:
+            json.dump({"columns": list(EXPORT_COLUMNS), "rows": len(data["id"]), "data": data}, file)
+        files.append({"file": name, "rows": len(data["id"]),
+                      "first_id": data["id"][0], "last_id": data["id"][-1]})
+        for values in data.values():
+            values.clear()
+
+    for rows in session.execute(statement).partitions():
+        for row in rows:
+            for column, value in record_of(row).items():
+                data[column].append(value)
+            if len(data["id"]) >= chunk_rows:
+                write_chunk()
+    if data["id"]:
+        write_chunk()
+
+    manifest = {
+        "columns": list(EXPORT_COLUMNS),
+        "rows": sum(entry["rows"] for entry in files),
+        "files": files,
+        "exported_at": datetime.utcnow().isoformat(),
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
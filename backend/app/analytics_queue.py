@@ -0,0 +1,213 @@
+"""
+Write-behind queue for analytics events.
+
+POST /_synthetic/log_event and /log_events used to commit their rows before
+answering, putting an INSERT on the request path of every click, scroll and
+key press. Instead the endpoints queue the rows here, timestamped when they
+arrive, and answer at once. A background task drains the queue into
+analytics_logs as multi-row INSERTs, every ANALYTICS_FLUSH_INTERVAL seconds
+or as soon as ANALYTICS_FLUSH_BATCH events are queued, and once more on
+shutdown. A crash loses at most the events still queued.
+
+The queue holds at most ANALYTICS_QUEUE_MAX events. When it is full,
+ANALYTICS_OVERFLOW_POLICY decides:
+
+    drop_newest  drop the new events (the default)
+    drop_oldest  evict the oldest queued events to make room
+    block        make the request wait up to ANALYTICS_ENQUEUE_TIMEOUT
+                 seconds for a flush to free space, then drop what still
+                 does not fit
+
+Dropped events are counted.
+
+A flush that fails because the database is unavailable puts the batch back
+to be retried. A flush that fails on the rows themselves (a value that
+cannot be bound, a violated constraint) is split in halves until the rows
+that cannot be written are isolated; those are counted as rejected and
+dropped, so one bad event never blocks the events queued behind it.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy.exc import DBAPIError, DataError, IntegrityError, InterfaceError, ProgrammingError, StatementError
+from .async_data_service import AsyncDataService
+from .db.db import AsyncSessionLocal
+from .periodic_flush import PeriodicFlusher
+
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1"))
+ANALYTICS_FLUSH_BATCH = int(os.getenv("ANALYTICS_FLUSH_BATCH", "500"))
+ANALYTICS_QUEUE_MAX = int(os.getenv("ANALYTICS_QUEUE_MAX", "10000"))
+ANALYTICS_OVERFLOW_POLICY = os.getenv("ANALYTICS_OVERFLOW_POLICY", "drop_newest")
+ANALYTICS_ENQUEUE_TIMEOUT = float(os.getenv("ANALYTICS_ENQUEUE_TIMEOUT", "2"))
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+def is_row_error(error: Exception) -> bool:
+    """Whether a failed write was caused by the rows written rather than the database"""
+    if isinstance(error, (DataError, IntegrityError, InterfaceError, ProgrammingError)):
+        return True
+    # Raised while converting a parameter, before the database was reached
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+class AnalyticsQueue(PeriodicFlusher):
+    name = "Analytics queue flush"
+
+    def __init__(self, session_factory: Callable[[], Any] = AsyncSessionLocal,
+                 interval: float = ANALYTICS_FLUSH_INTERVAL, batch_size: int = ANALYTICS_FLUSH_BATCH,
+                 max_size: int = ANALYTICS_QUEUE_MAX, policy: str = ANALYTICS_OVERFLOW_POLICY,
+                 enqueue_timeout: float = ANALYTICS_ENQUEUE_TIMEOUT):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown analytics overflow policy: {policy}")
+        super().__init__(session_factory, interval)
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.policy = policy
+        self.enqueue_timeout = enqueue_timeout
+        # (enqueued at, row) in arrival order
+        self._queue: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._space: Optional[asyncio.Event] = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def _offer(self, rows: List[Dict[str, Any]]) -> int:
+        """Queue as many rows as the bound and policy allow; returns how many were queued"""
+        now = time.monotonic()
+        with self._lock:
+            if self.policy == "drop_oldest":
+                accepted = len(rows)
+            else:
+                accepted = min(len(rows), max(0, self.max_size - len(self._queue)))
+            self._queue.extend((now, row) for row in rows[:accepted])
+            self.enqueued += accepted
+            while len(self._queue) > self.max_size:
+                self._queue.popleft()
+                self.dropped += 1
+            size = len(self._queue)
+        if size >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return accepted
+
+    async def put(self, rows: List[Dict[str, Any]]) -> int:
+        """Queue analytics log rows; returns how many were accepted, counting from the first.
+
+        Under drop_oldest every row is accepted; under drop_newest and
+        block the rows that do not fit are dropped (block first waits for
+        a flush to make room).
+        """
+        accepted = self._offer(rows)
+        if accepted < len(rows) and self.policy == "block" and self._space is not None:
+            deadline = time.monotonic() + self.enqueue_timeout
+            while accepted < len(rows):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._space.clear()
+                self._wakeup.set()
+                try:
+                    await asyncio.wait_for(self._space.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                accepted += self._offer(rows[accepted:])
+        if accepted < len(rows) and self.policy != "drop_oldest":
+            with self._lock:
+                self.dropped += len(rows) - accepted
+        return accepted
+
+    def _drain(self) -> List[Tuple[float, Dict[str, Any]]]:
+        with self._lock:
+            entries = list(self._queue)
+            self._queue.clear()
+        if self._space is not None:
+            self._space.set()
+        return entries
+
+    def _restore(self, entries: List[Tuple[float, Dict[str, Any]]]):
+        # Put back a batch that failed to write ahead of newer events, without growing past the bound
+        with self._lock:
+            room = max(0, self.max_size - len(self._queue))
+            kept = entries[len(entries) - room:] if room < len(entries) else entries
+            self.dropped += len(entries) - len(kept)
+            self._queue.extendleft(reversed(kept))
+
+    async def _insert(self, entries: List[Tuple[float, Dict[str, Any]]]):
+        async with self._session_factory() as db:
+            await AsyncDataService(db).add_analytics_logs([row for _, row in entries], self.batch_size)
+
+    async def _write(self, entries: List[Tuple[float, Dict[str, Any]]]) -> int:
+        written = done = 0
+        # Slices still to write, in queue order; a slice failing on its rows
+        # is replaced by its two halves
+        pending = deque([(0, len(entries))])
+        try:
+            while pending:
+                start, end = pending.popleft()
+                try:
+                    await self._insert(entries[start:end])
+                except Exception as e:
+                    if not is_row_error(e):
+                        raise
+                    if end - start > 1:
+                        middle = (start + end) // 2
+                        pending.extendleft([(middle, end), (start, middle)])
+                        continue
+                    self.rejected += 1
+                    print(f"Analytics queue dropped an event it cannot write: {e}")
+                else:
+                    written += end - start
+                done = end
+        finally:
+            # Only the events not yet written or rejected are restored on failure
+            del entries[:done]
+        return written
+
+    def start(self):
+        """Start the periodic flusher on the running event loop"""
+        if not self.running:
+            self._space = asyncio.Event()
+        super().start()
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still queued"""
+        await super().stop()
+        self._space = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = len(self._queue)
+            oldest = self._queue[0][0] if self._queue else None
+        return {
+            "running": self.running,
+            "policy": self.policy,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "max_size": self.max_size,
+            "depth": depth,
+            "oldest_event_age_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else None,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "flushed_events": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "mean_flush_ms": self.mean_flush_ms,
+        }
+
+
+analytics_queue = AnalyticsQueue()
+
+
+def get_analytics_queue_stats() -> Dict[str, Any]:
+    """Snapshot queue depth, flush latency and drop counts for the metrics endpoint"""
+    return analytics_queue.stats()
@@ -0,0 +1,113 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from .data_service import DataService
+
+
+def _delegate(name: str, read_only: bool = False):
+    """Build an async twin of a DataService method.
+
+    The sync implementation runs through AsyncSession.run_sync, so the ORM
+    code is shared. Only the driver I/O is awaited through the async driver:
+    the ORM and Python work of the call still runs on the event-loop thread,
+    so CPU-heavy work must not happen here. Read-only methods are flagged so
+    the RoutingSession sends them to the reader pool.
+    """
+    def call(session, *args, **kwargs):
+        if not read_only:
+            return getattr(DataService(session), name)(*args, **kwargs)
+        session.info["read_only"] = True
+        try:
+            return getattr(DataService(session), name)(*args, **kwargs)
+        finally:
+            session.info["read_only"] = False
+
+    async def method(self, *args, **kwargs):
+        return await self.db.run_sync(call, *args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncDataService.{name}"
+    method.__doc__ = getattr(DataService, name).__doc__
+    return method
+
+
+class AsyncDataService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # Users
+    get_user_by_id = _delegate("get_user_by_id", read_only=True)
+    get_user_by_username = _delegate("get_user_by_username", read_only=True)
+    get_user_by_email = _delegate("get_user_by_email", read_only=True)
+    get_users = _delegate("get_users", read_only=True)
+    get_all_users = _delegate("get_all_users", read_only=True)
+    get_user_stats = _delegate("get_user_stats", read_only=True)
+    create_user = _delegate("create_user")
+
+    # Questions
+    get_question = _delegate("get_question", read_only=True)
+    get_question_by_id = _delegate("get_question_by_id", read_only=True)
+    get_questions = _delegate("get_questions", read_only=True)
+    get_question_summaries = _delegate("get_question_summaries", read_only=True)
+    get_total_questions = _delegate("get_total_questions", read_only=True)
+    get_questions_by_user = _delegate("get_questions_by_user", read_only=True)
+    get_questions_by_tag = _delegate("get_questions_by_tag", read_only=True)
+    search_questions = _delegate("search_questions", read_only=True)
+    search_question_facets = _delegate("search_question_facets", read_only=True)
+    search_questions_with_fallback = _delegate("search_questions_with_fallback", read_only=True)
+    suggest_search = _delegate("suggest_search", read_only=True)
+    get_related_questions = _delegate("get_related_questions", read_only=True)
+    find_duplicate_questions = _delegate("find_duplicate_questions", read_only=True)
+    search_entities = _delegate("search_entities", read_only=True)
+    create_question = _delegate("create_question")
+    update_question = _delegate("update_question")
+    delete_question = _delegate("delete_question")
+    increment_question_views = _delegate("increment_question_views")
+    add_question_views = _delegate("add_question_views")
+    get_viewer_sketch = _delegate("get_viewer_sketch", read_only=True)
+    save_viewer_sketches = _delegate("save_viewer_sketches")
+
+    # Answers
+    get_answer = _delegate("get_answer", read_only=True)
+    get_answers = _delegate("get_answers", read_only=True)
+    get_answers_by_user = _delegate("get_answers_by_user", read_only=True)
+    get_answers_by_question = _delegate("get_answers_by_question", read_only=True)
+    create_answer = _delegate("create_answer")
+    update_answer = _delegate("update_answer")
+    delete_answer = _delegate("delete_answer")
+
+    # Tags
+    get_tag = _delegate("get_tag", read_only=True)
+    get_tag_by_name = _delegate("get_tag_by_name", read_only=True)
+    get_tags = _delegate("get_tags", read_only=True)
+    get_popular_tags = _delegate("get_popular_tags", read_only=True)
+    get_trending_tags = _delegate("get_trending_tags", read_only=True)
+    autocomplete_tags = _delegate("autocomplete_tags", read_only=True)
+    create_tag = _delegate("create_tag")
+    update_tag = _delegate("update_tag")
+    delete_tag = _delegate("delete_tag")
+    add_tag_to_question = _delegate("add_tag_to_question")
+    remove_tag_from_question = _delegate("remove_tag_from_question")
+
+    # Votes
+    get_user_vote_on_question = _delegate("get_user_vote_on_question", read_only=True)
+    get_user_vote_on_answer = _delegate("get_user_vote_on_answer", read_only=True)
+    get_user_votes_on_question_answers = _delegate("get_user_votes_on_question_answers", read_only=True)
+    vote_question = _delegate("vote_question")
+    vote_answer = _delegate("vote_answer")
+    remove_question_vote = _delegate("remove_question_vote")
+    remove_answer_vote = _delegate("remove_answer_vote")
+
+    # Comments
+    get_comments_for_question = _delegate("get_comments_for_question", read_only=True)
+    get_comments_for_answer = _delegate("get_comments_for_answer", read_only=True)
+    get_user_comment_vote = _delegate("get_user_comment_vote", read_only=True)
+    create_comment = _delegate("create_comment")
+    vote_comment = _delegate("vote_comment")
+
+    # Analytics
+    add_analytics_logs = _delegate("add_analytics_logs")
+    get_session_logs = _delegate("get_session_logs", read_only=True)
+    get_hourly_analytics = _delegate("get_hourly_analytics", read_only=True)
+    get_session_analytics = _delegate("get_session_analytics", read_only=True)
+
+    # Stats
+    get_site_stats = _delegate("get_site_stats", read_only=True)
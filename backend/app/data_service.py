@@ -1,26 +1,109 @@
+import bisect
+import heapq
 import json
 import os
 from typing import List, Optional, Dict, Any, cast
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, insert, delete
-from .db.models import User, Question as DBQuestion, Answer as DBAnswer, Tag, Vote
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import select, insert, update, delete, case, or_
+from .db.models import (User, Question as DBQuestion, Answer as DBAnswer, Tag, Vote, QuestionViewerSketch, AnalyticsLog,
+                        AnalyticsHourlyRollup, AnalyticsSessionRollup)
+from .db.rollups import get_high_water_mark, hour_of
 from .models import QuestionSummary, PaginatedResponse, SearchRequest, SearchResponse
 import math
 from datetime import datetime
 from sqlalchemy import func
 from .db.models import question_tags
 from .models import QuestionCreate, AnswerCreate, TagCreate, UserCreate
+from .pagination import encode_cursor, keyset_order, keyset_filter, next_cursor
+from .totals_cache import totals_cache, TOTAL_MODES
+from .sketches import HyperLogLog
+from .search import (ENTITIES, SEARCH_SORTS, search_engine, tag_autocomplete, search_cache, normalize_tags, database_key,
+                     related_questions, duplicate_detector, trigram_vocabulary, correct_query, tokenize)
+from .db.fts import questions_fts, has_question_fts, match_expression, fts_match, fts_rank
+
+# Length of the body excerpt shown on question listing pages
+EXCERPT_LENGTH = 200
+# Separator for the tag names aggregated into a single summary column
+TAG_SEPARATOR = "\x1f"
+
+# Keyset sort orders: (key columns, descending). The id tiebreaker makes every
+# order total, so a (sort_key, id) cursor identifies a unique position.
+QUESTION_SORTS = {
+    "newest": ((DBQuestion.created_at, DBQuestion.id), True),
+    "votes": ((DBQuestion.votes, DBQuestion.id), True),
+    "active": ((DBQuestion.updated_at, DBQuestion.id), True),
+}
+ANSWER_SORTS = {
+    "votes": ((DBAnswer.votes, DBAnswer.id), True),
+    "newest": ((DBAnswer.created_at, DBAnswer.id), True),
+    "oldest": ((DBAnswer.created_at, DBAnswer.id), False),
+}
+TAG_SORTS = {
+    "name": ((Tag.name, Tag.id), False),
+    "newest": ((Tag.created_at, Tag.id), True),
+}
+USER_SORT = ((User.id,), False)
+# Session logs, newest first
+LOG_SORT = ((AnalyticsLog.timestamp, AnalyticsLog.id), True)
+
+# Vote facet buckets: a question with v votes falls in the first bucket whose
+# upper bound exceeds v
+VOTE_BUCKET_BOUNDS = (0, 1, 5, 10)
+VOTE_BUCKETS = ("negative", "0", "1-4", "5-9", "10+")
+# Searches finding fewer questions are retried with misspellings corrected
+FUZZY_MIN_RESULTS = 3
+
+
+def get_sort(sorts: Dict, sort: str, default: str):
+    """Look up a keyset sort order, falling back to the default order"""
+    return sorts.get(sort, sorts[default])
+
+
+def paginate(query, order, skip: int, limit: int, cursor: Optional[str] = None):
+    """Apply a keyset order and either the cursor or the offset to a query"""
+    columns, descending = order
+    query = keyset_order(query, columns, descending)
+    if cursor:
+        return query.filter(keyset_filter(columns, cursor, descending)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def id_upper_bound(id_column):
+    """The highest id: bounds a table's row count without a scan, but overcounts by every deleted row"""
+    return select(func.max(id_column))
 
 class DataService:
     def __init__(self, db: Session):
         self.db = db
+
+    def _count_total(self, kind: str, filters: tuple, query, total_mode: str = "exact",
+                     estimate: Optional[Any] = None) -> Optional[int]:
+        """Total for a listing according to total_mode.
+
+        exact counts the filtered query once per TTL through the totals cache;
+        estimate returns a cached exact total if there is one and otherwise
+        runs the estimate statement, a maintained counter or an upper bound
+        from id_upper_bound (falling back to exact when the filter has
+        neither); none skips the count entirely.
+        """
+        if total_mode not in TOTAL_MODES:
+            raise ValueError(f"Invalid total_mode: {total_mode}")
+        if total_mode == "none":
+            return None
+        database = database_key(self.db.get_bind().url)
+        if total_mode == "estimate" and estimate is not None:
+            cached = totals_cache.peek(database, kind, filters)
+            if cached is not None:
+                return cached
+            return self.db.execute(estimate).scalar() or 0
+        return totals_cache.get_or_compute(database, kind, filters, query.count)
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get user by ID"""
         return self.db.query(User).filter(User.id == user_id).first()
     
-    def get_users(self, page: int = 1, limit: int = 20, search: Optional[str] = None) -> PaginatedResponse:
-        """Get paginated list of users with optional search"""
+    def get_users(self, page: int = 1, limit: int = 20, search: Optional[str] = None, cursor: Optional[str] = None,
+                  total_mode: str = "exact") -> PaginatedResponse:
+        """Get paginated list of users with optional search; cursor overrides page"""
         query = self.db.query(User)
         
         if search:
@@ -29,14 +112,17 @@ class DataService:
                 (User.location.ilike(f"%{search}%"))
             )
         
-        total = query.count()
-        users = query.offset((page - 1) * limit).limit(limit).all()
+        # Unfiltered, the estimate is an upper bound that counts deleted users
+        estimate = None if search else id_upper_bound(User.id)
+        total = self._count_total("users", (search,), query, total_mode, estimate)
+        users = paginate(query, USER_SORT, (page - 1) * limit, limit, cursor).all()
         
         return PaginatedResponse(
             items=users,
             total=total,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=next_cursor(users, USER_SORT[0], limit)
         )
     
     def get_question_by_id(self, question_id: int) -> Optional[Dict]:
@@ -48,48 +134,113 @@ class DataService:
             return question
         return None
     
-    def get_questions(self, skip: int = 0, limit: int = 10, sort: str = "newest") -> List[DBQuestion]:
-        """Get a list of questions with pagination"""
+    def get_questions(self, skip: int = 0, limit: int = 10, sort: str = "newest", cursor: Optional[str] = None) -> List[DBQuestion]:
+        """Get a list of questions with pagination; cursor overrides skip"""
         query = self.db.query(DBQuestion).options(
             joinedload(DBQuestion.author),
-            joinedload(DBQuestion.tags),
-            joinedload(DBQuestion.answers)
+            selectinload(DBQuestion.tags)
         )
         
-        if sort == "newest":
-            query = query.order_by(DBQuestion.created_at.desc())
-        elif sort == "votes":
-            query = query.order_by(DBQuestion.votes.desc())
-        elif sort == "active":
-            query = query.order_by(DBQuestion.updated_at.desc())
-        
-        return query.offset(skip).limit(limit).all()
-    
-    def get_total_questions(self) -> int:
-        """Get total number of questions"""
-        return self.db.query(DBQuestion).count()
+        order = get_sort(QUESTION_SORTS, sort, "newest")
+        return paginate(query, order, skip, limit, cursor).all()
+
+    def get_question_summaries(self, skip: int = 0, limit: int = 15, sort: str = "newest",
+                               tag: Optional[str] = None, user_id: Optional[int] = None,
+                               cursor: Optional[str] = None) -> List[Any]:
+        """Get one page of listing rows without loading full Question objects.
+
+        Only the columns a QuestionSummary needs are selected: the body is cut
+        to an excerpt by SQL substr, tag names are aggregated per question in
+        a correlated subquery and the answer count comes from the
+        denormalized column, so no join fans out rows before the LIMIT.
+        """
+        tag_names = (
+            select(func.group_concat(Tag.name, TAG_SEPARATOR))
+            .select_from(question_tags)
+            .join(Tag, Tag.id == question_tags.c.tag_id)
+            .where(question_tags.c.question_id == DBQuestion.id)
+            .correlate(DBQuestion)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                DBQuestion.id,
+                DBQuestion.title,
+                func.substr(DBQuestion.body, 1, EXCERPT_LENGTH).label("excerpt"),
+                (func.length(DBQuestion.body) > EXCERPT_LENGTH).label("truncated"),
+                DBQuestion.votes,
+                DBQuestion.views,
+                DBQuestion.answer_count,
+                DBQuestion.created_at,
+                DBQuestion.updated_at,
+                tag_names.label("tag_names"),
+                User.name.label("author_name"),
+                User.email.label("author_email"),
+                User.reputation.label("author_reputation"),
+                User.location.label("author_location"),
+                User.website.label("author_website"),
+                User.is_active.label("author_is_active"),
+                User.profile.label("author_profile"),
+            )
+            .outerjoin(User, User.id == DBQuestion.author_id)
+        )
+
+        if tag:
+            db_tag = self.get_tag_by_name(tag)
+            if not db_tag:
+                return []
+            query = query.join(question_tags, question_tags.c.question_id == DBQuestion.id).where(
+                question_tags.c.tag_id == db_tag.id
+            )
+        if user_id:
+            query = query.where(DBQuestion.author_id == user_id)
+
+        order = get_sort(QUESTION_SORTS, sort, "newest")
+        return self.db.execute(paginate(query, order, skip, limit, cursor)).all()
+
+    def get_total_questions(self, tag: Optional[str] = None, user_id: Optional[int] = None,
+                            total_mode: str = "exact") -> Optional[int]:
+        """Get total number of questions matching the listing filters"""
+        query = self.db.query(DBQuestion)
+        if tag:
+            db_tag = self.get_tag_by_name(tag)
+            if not db_tag:
+                return 0
+            query = query.join(question_tags, question_tags.c.question_id == DBQuestion.id).filter(
+                question_tags.c.tag_id == db_tag.id
+            )
+            estimate = select(Tag.count).where(Tag.id == db_tag.id)
+        else:
+            # An upper bound that counts deleted questions; Tag.count above is exact
+            estimate = id_upper_bound(DBQuestion.id)
+        if user_id:
+            query = query.filter(DBQuestion.author_id == user_id)
+            estimate = None
+        return self._count_total("questions", (tag and tag.lower(), user_id), query, total_mode, estimate)
     
-    def get_questions_by_user(self, user_id: int, page: int = 1, limit: int = 15) -> PaginatedResponse:
-        """Get questions by user with pagination"""
+    def get_questions_by_user(self, user_id: int, page: int = 1, limit: int = 15, cursor: Optional[str] = None,
+                              total_mode: str = "exact") -> PaginatedResponse:
+        """Get questions by user with pagination; cursor overrides page"""
         query = self.db.query(DBQuestion).options(
             joinedload(DBQuestion.author),
-            joinedload(DBQuestion.tags),
-            joinedload(DBQuestion.answers)
+            selectinload(DBQuestion.tags)
         ).filter(DBQuestion.author_id == user_id)
-        total = query.count()
-        questions = query.offset((page - 1) * limit).limit(limit).all()
+        total = self._count_total("questions", (None, user_id), query, total_mode)
+        order = QUESTION_SORTS["newest"]
+        questions = paginate(query, order, (page - 1) * limit, limit, cursor).all()
         
         return PaginatedResponse(
             items=questions,
             total=total,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=next_cursor(questions, order[0], limit)
         )
     
-    def get_answers_by_user(self, user_id: int, page: int = 1, limit: int = 15) -> PaginatedResponse:
+    def get_answers_by_user(self, user_id: int, page: int = 1, limit: int = 15, total_mode: str = "exact") -> PaginatedResponse:
         """Get answers by user with pagination"""
         query = self.db.query(DBAnswer).filter(DBAnswer.author_id == user_id)
-        total = query.count()
+        total = self._count_total("answers", (user_id,), query, total_mode)
         answers = query.offset((page - 1) * limit).limit(limit).all()
         
         return PaginatedResponse(
@@ -122,35 +273,31 @@ class DataService:
     
     def get_tag_by_name(self, tag_name: str) -> Optional[Tag]:
         """Get tag by name"""
-        return self.db.query(Tag).filter(Tag.name.ilike(tag_name)).first()
+        return self.db.query(Tag).filter(func.lower(Tag.name) == tag_name.lower()).first()
     
-    def get_questions_by_tag(self, tag_name: str, page: int = 1, limit: int = 15, sort: str = "newest") -> PaginatedResponse:
-        """Get questions filtered by tag with pagination"""
+    def get_questions_by_tag(self, tag_name: str, page: int = 1, limit: int = 15, sort: str = "newest", cursor: Optional[str] = None,
+                             total_mode: str = "exact") -> PaginatedResponse:
+        """Get questions filtered by tag with pagination; cursor overrides page"""
         tag = self.get_tag_by_name(tag_name)
         if not tag:
             return PaginatedResponse(items=[], total=0, page=page, limit=limit)
         
         query = self.db.query(DBQuestion).options(
             joinedload(DBQuestion.author),
-            joinedload(DBQuestion.tags),
-            joinedload(DBQuestion.answers)
-        ).filter(DBQuestion.tags.contains([tag_name]))
-        
-        if sort == "newest":
-            query = query.order_by(DBQuestion.created_at.desc())
-        elif sort == "votes":
-            query = query.order_by(DBQuestion.votes.desc())
-        elif sort == "active":
-            query = query.order_by(DBQuestion.updated_at.desc())
+            selectinload(DBQuestion.tags)
+        ).join(question_tags, question_tags.c.question_id == DBQuestion.id).filter(question_tags.c.tag_id == tag.id)
         
-        total = query.count()
-        questions = query.offset((page - 1) * limit).limit(limit).all()
+        estimate = select(Tag.count).where(Tag.id == tag.id)
+        total = self._count_total("questions", (tag_name.lower(), None), query, total_mode, estimate)
+        order = get_sort(QUESTION_SORTS, sort, "newest")
+        questions = paginate(query, order, (page - 1) * limit, limit, cursor).all()
         
         return PaginatedResponse(
             items=questions,
             total=total,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=next_cursor(questions, order[0], limit)
         )
     
     def get_popular_tags(self, limit: int = 20) -> List[Tag]:
@@ -162,26 +309,37 @@ class DataService:
         return self.get_popular_tags(limit)
     
     def search_questions(self, query: str, tags: Optional[List[str]] = None, skip: int = 0, limit: int = 20, sort: str = "relevance") -> tuple[List[Dict], int]:
-        """Search questions by title or content"""
-        search_query = self.db.query(DBQuestion).filter(
-            (DBQuestion.title.ilike(f"%{query}%")) | (DBQuestion.body.ilike(f"%{query}%"))
-        )
-        
-        if tags:
-            # Join with tags table and filter by tag names
-            search_query = search_query.join(DBQuestion.tags).filter(Tag.name.in_(tags))
-        
-        if sort == "relevance":
-            # For now, just sort by newest
-            search_query = search_query.order_by(DBQuestion.created_at.desc())
-        elif sort == "newest":
-            search_query = search_query.order_by(DBQuestion.created_at.desc())
-        elif sort == "votes":
-            search_query = search_query.order_by(DBQuestion.votes.desc())
-        
-        total = search_query.count()
-        questions = search_query.offset(skip).limit(limit).all()
-        
+        """Search questions by title or content.
+
+        Uses the questions_fts index where it exists: every word must match,
+        relevance is BM25 with title hits weighted above body hits, and the
+        tag filter (case-insensitive) runs in the same statement. Without the
+        index this falls back to a substring scan. The ids and total of a page
+        are cached in search_cache; the rows are always read fresh.
+        """
+        fts = has_question_fts(self.db.connection())
+        normalized = match_expression(query) if fts else query
+        if fts and not normalized:
+            return [], 0
+        tag_names = normalize_tags(tags)
+        key = (database_key(self.db.get_bind().url), fts, normalized, tag_names, sort, skip, limit)
+
+        cached = search_cache.get(key, tag_names)
+        if cached is not None:
+            ids, total = cached
+            rows = (
+                self.db.query(DBQuestion)
+                .filter(DBQuestion.id.in_(ids))
+                .options(joinedload(DBQuestion.author), selectinload(DBQuestion.tags))
+                .all()
+            )
+            by_id = {q.id: q for q in rows}
+            questions = [by_id[question_id] for question_id in ids if question_id in by_id]
+        else:
+            generations = search_cache.snapshot(tag_names)
+            questions, total = self._search_questions(fts, normalized, tag_names, skip, limit, sort)
+            search_cache.put(key, generations, [q.id for q in questions], total)
+
         # Convert to dictionary format
         result = []
         for q in questions:
@@ -193,11 +351,220 @@ class DataService:
                 "tags": [t.name for t in q.tags],
                 "votes": q.votes,
                 "views": q.views,
-                "answer_count": len(q.answers),
+                "answer_count": q.answer_count,
                 "asked": q.created_at
             })
         
         return result, total
+
+    def search_questions_with_fallback(self, query: str, tags: Optional[List[str]] = None, skip: int = 0,
+                                       limit: int = 20, sort: str = "relevance") -> tuple[List[Dict], int, Optional[str]]:
+        """search_questions, retried with misspellings corrected when it finds few matches.
+
+        Returns (results, total, corrected query), the corrected query being
+        None unless the corrected search found more questions and was used.
+        """
+        results, total = self.search_questions(query, tags, skip, limit, sort)
+        if total >= FUZZY_MIN_RESULTS:
+            return results, total, None
+        corrected = correct_query(self.db, query)
+        if corrected is None:
+            return results, total, None
+        corrected_results, corrected_total = self.search_questions(corrected, tags, skip, limit, sort)
+        if corrected_total <= total:
+            return results, total, None
+        return corrected_results, corrected_total, corrected
+
+    def suggest_search(self, query: str, limit: int = 5) -> Dict[str, Any]:
+        """'Did you mean' suggestions: the corrected query and tags named like its words"""
+        tags = trigram_vocabulary.get(self.db, "tags")
+        similar: Dict[str, float] = {}
+        for word in dict.fromkeys(tokenize(query)):
+            for name, score in tags.similar(word, limit):
+                similar[name] = max(score, similar.get(name, 0))
+        ranked = sorted(similar.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return {
+            "query": correct_query(self.db, query),
+            "tags": [{"name": name, "similarity": score} for name, score in ranked],
+        }
+
+    def search_question_facets(self, query: str, tags: Optional[List[str]] = None,
+                               top_tags: int = 10) -> Dict[str, Any]:
+        """Tag, answered and vote bucket counts over every question a search matches.
+
+        The matches and their tag links are read in one statement and counted
+        in a single pass, instead of one COUNT per facet value. Cached in
+        search_cache like result pages.
+        """
+        fts = has_question_fts(self.db.connection())
+        normalized = match_expression(query) if fts else query
+        tag_names = normalize_tags(tags)
+        key = (database_key(self.db.get_bind().url), fts, normalized, tag_names, "facets", top_tags)
+        cached = search_cache.get(key, tag_names)
+        if cached is not None:
+            return cached[0]
+        generations = search_cache.snapshot(tag_names)
+
+        total, answered = 0, 0
+        tag_counts: Dict[int, int] = {}
+        vote_counts = [0] * len(VOTE_BUCKETS)
+        if not fts or normalized:
+            matches, _ = self._search_question_query(fts, normalized, tag_names)
+            matches = matches.with_entities(DBQuestion.id).subquery()
+            rows = self.db.execute(
+                select(DBQuestion.id, DBQuestion.votes, DBQuestion.answer_count, question_tags.c.tag_id)
+                .join(matches, matches.c.id == DBQuestion.id)
+                .outerjoin(question_tags, question_tags.c.question_id == DBQuestion.id)
+                .order_by(DBQuestion.id)
+            )
+            previous = None
+            for question_id, votes, answer_count, tag_id in rows:
+                if question_id != previous:
+                    previous = question_id
+                    total += 1
+                    answered += (answer_count or 0) > 0
+                    vote_counts[bisect.bisect_right(VOTE_BUCKET_BOUNDS, votes or 0)] += 1
+                if tag_id is not None:
+                    tag_counts[tag_id] = tag_counts.get(tag_id, 0) + 1
+
+        top = heapq.nsmallest(top_tags, tag_counts.items(), key=lambda item: (-item[1], item[0]))
+        names = {}
+        if top:
+            names = dict(self.db.execute(select(Tag.id, Tag.name).where(Tag.id.in_([tag_id for tag_id, _ in top]))).all())
+        facets = {
+            "total": total,
+            "tags": [{"value": names[tag_id], "count": count} for tag_id, count in top if tag_id in names],
+            "answered": [{"value": "answered", "count": answered}, {"value": "unanswered", "count": total - answered}],
+            "votes": [{"value": label, "count": count} for label, count in zip(VOTE_BUCKETS, vote_counts)],
+        }
+        search_cache.put(key, generations, facets, total)
+        return facets
+
+    def _search_question_query(self, fts: bool, query: str, tags: tuple):
+        """Filtered (unordered) search query and its relevance order"""
+        tag_filter = None
+        if tags:
+            tag_filter = (
+                select(question_tags.c.question_id)
+                .join(Tag, Tag.id == question_tags.c.tag_id)
+                .where(question_tags.c.question_id == DBQuestion.id, func.lower(Tag.name).in_(tags))
+                .exists()
+            )
+
+        if fts:
+            search_query = (
+                self.db.query(DBQuestion)
+                .join(questions_fts, questions_fts.c.rowid == DBQuestion.id)
+                .filter(fts_match(query))
+            )
+            relevance = (fts_rank(), DBQuestion.id.desc())
+        else:
+            search_query = self.db.query(DBQuestion).filter(
+                (DBQuestion.title.ilike(f"%{query}%")) | (DBQuestion.body.ilike(f"%{query}%"))
+            )
+            relevance = (DBQuestion.created_at.desc(), DBQuestion.id.desc())
+
+        if tag_filter is not None:
+            search_query = search_query.filter(tag_filter)
+        return search_query, relevance
+
+    def _search_questions(self, fts: bool, query: str, tags: tuple, skip: int, limit: int,
+                          sort: str) -> tuple[List[DBQuestion], int]:
+        """Run an uncached search: one page of questions and the total"""
+        search_query, relevance = self._search_question_query(fts, query, tags)
+        if sort in QUESTION_SORTS:
+            search_query = keyset_order(search_query, *QUESTION_SORTS[sort])
+        else:
+            search_query = search_query.order_by(*relevance)
+        
+        total = self._count_total("questions", ("search", query, tags), search_query)
+        questions = (
+            search_query.options(joinedload(DBQuestion.author), selectinload(DBQuestion.tags))
+            .offset(skip).limit(limit).all()
+        )
+        return questions, total
+    
+    def get_related_questions(self, question_id: int, limit: int = 10) -> Optional[List[Dict]]:
+        """Questions most similar to one by title, body and tags, or None if it does not exist"""
+        if self.get_question(question_id) is None:
+            return None
+        related = related_questions.related(self.db, question_id, limit)
+        rows = (
+            self.db.query(DBQuestion)
+            .filter(DBQuestion.id.in_([other for other, _ in related]))
+            .options(joinedload(DBQuestion.author), selectinload(DBQuestion.tags))
+            .all()
+        ) if related else []
+        by_id = {q.id: q for q in rows}
+        return [
+            {
+                "id": q.id,
+                "title": q.title,
+                "content": q.body,
+                "author": q.author,
+                "tags": [t.name for t in q.tags],
+                "votes": q.votes,
+                "views": q.views,
+                "answer_count": q.answer_count,
+                "asked": q.created_at,
+                "score": score,
+            }
+            for q, score in ((by_id.get(other), score) for other, score in related)
+            if q is not None
+        ]
+
+    def find_duplicate_questions(self, title: str, body: str, limit: int = 5,
+                                 exclude: Optional[int] = None) -> List[Dict]:
+        """Existing questions that are near duplicates of a title and body, most similar first"""
+        matches = duplicate_detector.find(self.db, title, body, limit, exclude)
+        if not matches:
+            return []
+        titles = dict(self.db.execute(
+            select(DBQuestion.id, DBQuestion.title).where(DBQuestion.id.in_([question_id for question_id, _ in matches]))
+        ).all())
+        return [
+            {"id": question_id, "title": titles[question_id], "similarity": score}
+            for question_id, score in matches
+            if question_id in titles
+        ]
+
+    def search_entities(self, kind: str, query: str, page: int = 1, limit: int = 20,
+                        sort: str = "relevance") -> PaginatedResponse:
+        """Search questions, answers, users or tags through the in-process index.
+
+        Every query word must match; relevance is TF-IDF boosted by votes,
+        reputation or usage, and the other sorts are listed in SEARCH_SORTS.
+        """
+        found = search_engine.search(self.db, kind, query, (page - 1) * limit, limit, sort)
+        if found is None:
+            # The index is still building in the background
+            found = self._search_entities_without_index(kind, query, (page - 1) * limit, limit, sort)
+        ids, total = found
+        model = ENTITIES[kind].model
+        rows = {row.id: row for row in self.db.query(model).filter(model.id.in_(ids))} if ids else {}
+        return PaginatedResponse(
+            items=[rows[doc_id] for doc_id in ids if doc_id in rows],
+            total=total,
+            page=page,
+            limit=limit
+        )
+    
+    def _search_entities_without_index(self, kind: str, query: str, skip: int, limit: int,
+                                       sort: str) -> tuple[List[int], int]:
+        """Every query word as a substring of an indexed field, by signal or creation time"""
+        entity = ENTITIES[kind]
+        model = entity.model
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return [], 0
+        fields = [getattr(model, name) for name, _ in entity.fields]
+        matches = self.db.query(model.id).filter(
+            *(or_(*(field.ilike(f"%{word}%") for field in fields)) for word in words)
+        )
+        newest = SEARCH_SORTS[kind].get(sort) == "newest"
+        order = getattr(model, entity.created if newest else entity.signal)
+        ids = [doc_id for (doc_id,) in matches.order_by(order.desc(), model.id.desc()).offset(skip).limit(limit)]
+        return ids, matches.count()
     
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
@@ -254,6 +621,7 @@ class DataService:
         
         # Process tags
         if question.tags:
+            linked_tag_ids = []
             for tag_name in question.tags:
                 # Check if tag exists, create if not
                 tag = self.db.query(Tag).filter(Tag.name == tag_name).first()
@@ -266,14 +634,19 @@ class DataService:
                 # Add tag to question via many-to-many relationship
                 if tag not in db_question.tags:
                     db_question.tags.append(tag)
+                    linked_tag_ids.append(tag.id)
             
+            if linked_tag_ids:
+                self.db.query(Tag).filter(Tag.id.in_(linked_tag_ids)).update(
+                    {Tag.count: func.coalesce(Tag.count, 0) + 1}
+                )
             self.db.commit()
             self.db.refresh(db_question)
         
         return db_question
     
-    def get_answers(self, question_id: Optional[int] = None, user_id: Optional[int] = None, page: int = 1, limit: int = 20, sort: str = "votes"):
-        """Get answers with optional filtering and pagination"""
+    def get_answers(self, question_id: Optional[int] = None, user_id: Optional[int] = None, page: int = 1, limit: int = 20, sort: str = "votes", cursor: Optional[str] = None):
+        """Get answers with optional filtering and pagination; cursor overrides page"""
         query = self.db.query(DBAnswer)
         
         if question_id is not None:
@@ -282,16 +655,9 @@ class DataService:
         if user_id is not None:
             query = query.filter(DBAnswer.author_id == user_id)
         
-        if sort == "votes":
-            query = query.order_by(DBAnswer.votes.desc())
-        elif sort == "newest":
-            query = query.order_by(DBAnswer.created_at.desc())
-        elif sort == "oldest":
-            query = query.order_by(DBAnswer.created_at.asc())
-        
         # Apply pagination
-        offset = (page - 1) * limit
-        return query.offset(offset).limit(limit).all()
+        order = get_sort(ANSWER_SORTS, sort, "votes")
+        return paginate(query, order, (page - 1) * limit, limit, cursor).all()
     
     def create_answer(self, question_id: int, user_id: int, content: str):
         """Create a new answer"""
@@ -303,6 +669,9 @@ class DataService:
             updated_at=datetime.utcnow()
         )
         self.db.add(db_answer)
+        self.db.query(DBQuestion).filter(DBQuestion.id == question_id).update({
+            DBQuestion.answer_count: DBQuestion.answer_count + 1
+        })
         self.db.commit()
         self.db.refresh(db_answer)
         return db_answer
@@ -411,7 +780,168 @@ class DataService:
         if question:
             self.db.query(DBQuestion).filter(DBQuestion.id == question_id).update({DBQuestion.views: DBQuestion.views + 1})
             self.db.commit()
+
+    def add_question_views(self, counts: Dict[int, int], batch_size: int = 500) -> int:
+        """Apply aggregated view increments as batched UPDATE ... CASE statements.
+
+        One statement per batch of question ids, all in a single transaction;
+        returns the number of question rows updated.
+        """
+        ids = list(counts)
+        updated = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            result = self.db.execute(
+                update(DBQuestion)
+                .where(DBQuestion.id.in_(batch))
+                .values(views=func.coalesce(DBQuestion.views, 0) + case({qid: counts[qid] for qid in batch}, value=DBQuestion.id, else_=0))
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+        self.db.commit()
+        return updated
     
+    def get_viewer_sketch(self, question_id: int) -> Optional[bytes]:
+        """Persisted HyperLogLog registers of a question's viewers, if any"""
+        return self.db.query(QuestionViewerSketch.registers).filter(
+            QuestionViewerSketch.question_id == question_id
+        ).scalar()
+
+    def save_viewer_sketches(self, sketches: Dict[int, bytes]) -> Dict[int, int]:
+        """Merge viewer sketches into the stored ones and refresh unique_viewers.
+
+        Registers are merged by maximum, so sketches flushed by several
+        processes combine instead of overwriting each other. Returns the new
+        estimate per question; sketches of deleted questions are skipped.
+        """
+        existing_ids = set(self.db.execute(
+            select(DBQuestion.id).where(DBQuestion.id.in_(list(sketches)))
+        ).scalars())
+        stored = {
+            row.question_id: row
+            for row in self.db.query(QuestionViewerSketch).filter(QuestionViewerSketch.question_id.in_(existing_ids))
+        }
+        estimates = {}
+        for question_id in existing_ids:
+            sketch = HyperLogLog(registers=sketches[question_id])
+            row = stored.get(question_id)
+            if row is None:
+                self.db.add(QuestionViewerSketch(question_id=question_id, registers=sketch.to_bytes()))
+            else:
+                sketch.merge(row.registers)
+                row.registers = sketch.to_bytes()
+            estimates[question_id] = sketch.estimate()
+        if estimates:
+            self.db.execute(
+                update(DBQuestion)
+                .where(DBQuestion.id.in_(list(estimates)))
+                .values(unique_viewers=case(estimates, value=DBQuestion.id, else_=DBQuestion.unique_viewers))
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+        return estimates
+
+    def add_analytics_logs(self, rows: List[Dict[str, Any]], batch_size: int = 500) -> int:
+        """Insert analytics log rows as multi-row INSERT ... VALUES statements.
+
+        One statement per batch of rows, all in a single transaction; returns
+        the number of rows written.
+        """
+        for start in range(0, len(rows), batch_size):
+            self.db.execute(insert(AnalyticsLog).values(rows[start:start + batch_size]))
+        self.db.commit()
+        return len(rows)
+
+    def get_session_logs(self, session_id: str, limit: int = 100, before: Optional[str] = None,
+                         after: Optional[str] = None, event_type: Optional[str] = None) -> Dict[str, Any]:
+        """A page of a session's logs, newest first, optionally of one event type.
+
+        before pages back to older logs from next_cursor; after reads the
+        logs newer than prev_cursor, the newest of a page, for polling.
+        Either way the page is one index range read, however many logs the
+        session holds.
+        """
+        if before and after:
+            raise ValueError("Pass either before or after, not both")
+        columns, descending = LOG_SORT
+        query = self.db.query(AnalyticsLog).filter(AnalyticsLog.session_id == session_id)
+        if event_type is not None:
+            query = query.filter(AnalyticsLog.event_type == event_type)
+        if after:
+            # Read the logs just after the cursor oldest first, then flip the page
+            query = keyset_order(query, columns, not descending)
+            logs = query.filter(keyset_filter(columns, after, not descending)).limit(limit).all()[::-1]
+        else:
+            logs = paginate(query, LOG_SORT, 0, limit, before).all()
+
+        # A page read with after ends at the cursor, so older logs always follow it
+        has_older = bool(logs) and (bool(after) or len(logs) == limit)
+        return {
+            "logs": [
+                {
+                    "id": log.id,
+                    "event_type": log.event_type,
+                    "session_id": log.session_id,
+                    "event_data": log.event_data,
+                    "timestamp": log.timestamp.isoformat() if log.timestamp else None
+                }
+                for log in logs
+            ],
+            "next_cursor": encode_cursor([logs[-1].timestamp, logs[-1].id]) if has_older else None,
+            "prev_cursor": encode_cursor([logs[0].timestamp, logs[0].id]) if logs else after,
+        }
+
+    def get_hourly_analytics(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             event_type: Optional[str] = None, page_url: Optional[str] = None,
+                             limit: int = 1000) -> Dict[str, Any]:
+        """Event counts per hour, event type and page from the rollup table, oldest hour first.
+
+        start and end bound the hours (end exclusive); nothing is read from
+        analytics_logs, so counts cover logs up to the high-water mark.
+        """
+        rollup = AnalyticsHourlyRollup
+        query = self.db.query(rollup)
+        if start is not None:
+            query = query.filter(rollup.hour >= hour_of(start))
+        if end is not None:
+            query = query.filter(rollup.hour < hour_of(end))
+        if event_type is not None:
+            query = query.filter(rollup.event_type == event_type)
+        if page_url is not None:
+            query = query.filter(rollup.page_url == page_url)
+        rows = query.order_by(rollup.hour, rollup.event_type, rollup.page_url).limit(limit).all()
+        return {
+            "high_water_mark": get_high_water_mark(self.db.connection()),
+            "rows": [
+                {"hour": row.hour, "event_type": row.event_type, "page_url": row.page_url, "count": row.count}
+                for row in rows
+            ],
+        }
+
+    def get_session_analytics(self, day: Optional[str] = None, session_id: Optional[str] = None,
+                              limit: int = 100) -> Dict[str, Any]:
+        """Event counts per day and session from the rollup table, busiest first"""
+        rollup = AnalyticsSessionRollup
+        query = self.db.query(rollup)
+        if day is not None:
+            query = query.filter(rollup.day == day)
+        if session_id is not None:
+            query = query.filter(rollup.session_id == session_id)
+        rows = query.order_by(rollup.count.desc(), rollup.day.desc(), rollup.session_id).limit(limit).all()
+        return {
+            "high_water_mark": get_high_water_mark(self.db.connection()),
+            "rows": [
+                {
+                    "day": row.day,
+                    "session_id": row.session_id,
+                    "count": row.count,
+                    "first_event_at": row.first_event_at,
+                    "last_event_at": row.last_event_at,
+                }
+                for row in rows
+            ],
+        }
+
     def get_site_stats(self) -> Dict[str, int]:
         """Get site statistics"""
         return {
@@ -428,18 +958,22 @@ class DataService:
     def update_question(self, question_id: int, question: QuestionCreate):
         db_question = self.get_question(question_id)
         if db_question:
-            self.db.query(DBQuestion).filter(DBQuestion.id == question_id).update({
-                DBQuestion.title: question.title,
-                DBQuestion.body: question.body,
-                DBQuestion.updated_at: datetime.utcnow()
-            })
+            # Through the ORM, so the search, cache and related-question hooks see the edit
+            db_question.title = question.title
+            db_question.body = question.body
+            db_question.updated_at = datetime.utcnow()
             self.db.commit()
-            db_question = self.get_question(question_id)  # Refresh the object
+            self.db.refresh(db_question)
         return db_question
 
     def delete_question(self, question_id: int) -> bool:
         db_question = self.get_question(question_id)
         if db_question:
+            tag_ids = [tag.id for tag in db_question.tags]
+            if tag_ids:
+                self.db.query(Tag).filter(Tag.id.in_(tag_ids)).update(
+                    {Tag.count: Tag.count - 1}
+                )
             self.db.delete(db_question)
             self.db.commit()
             return True
@@ -451,21 +985,27 @@ class DataService:
     def update_answer(self, answer_id: int, answer: AnswerCreate):
         db_answer = self.get_answer(answer_id)
         if db_answer:
-            self.db.query(DBAnswer).filter(DBAnswer.id == answer_id).update({DBAnswer.body: answer.body})
+            # Through the ORM, so the search hooks re-index the new text
+            db_answer.body = answer.body
+            db_answer.updated_at = datetime.utcnow()
             self.db.commit()
-            db_answer = self.get_answer(answer_id)  # Refresh the object
+            self.db.refresh(db_answer)
         return db_answer
 
     def delete_answer(self, answer_id: int) -> bool:
         db_answer = self.get_answer(answer_id)
         if db_answer:
+            self.db.query(DBQuestion).filter(DBQuestion.id == db_answer.question_id).update({
+                DBQuestion.answer_count: DBQuestion.answer_count - 1
+            })
             self.db.delete(db_answer)
             self.db.commit()
             return True
         return False
 
-    def get_tags(self, page: int = 1, limit: int = 20, search: Optional[str] = None, sort: str = "popular") -> PaginatedResponse:
-        """Get paginated list of tags with optional search and sorting"""
+    def get_tags(self, page: int = 1, limit: int = 20, search: Optional[str] = None, sort: str = "popular", cursor: Optional[str] = None,
+                 total_mode: str = "exact") -> PaginatedResponse:
+        """Get paginated list of tags with optional search and sorting; cursor overrides page"""
         # Print out the parameters for debugging
         print(f"DataService.get_tags called with: page={page}, limit={limit}, search={search}, sort={sort}")
         
@@ -475,30 +1015,39 @@ class DataService:
         if search:
             query = query.filter(Tag.name.ilike(f"%{search}%"))
         
+        # Every tag appears once whatever the order, so count before sorting
+        # Unfiltered, the estimate is an upper bound that counts deleted tags
+        estimate = None if search else id_upper_bound(Tag.id)
+        total = self._count_total("tags", (search,), query, total_mode, estimate)
+        
         # Apply sorting
         if sort == "popular":
-            # Sort by popularity (number of questions using this tag)
-            query = query.outerjoin(question_tags).group_by(Tag.id).order_by(func.count(question_tags.c.question_id).desc())
-        elif sort == "name":
-            # Sort alphabetically by name
-            query = query.order_by(Tag.name)
-        elif sort == "newest":
-            # Sort by creation date, newest first
-            query = query.order_by(Tag.created_at.desc())
-        
-        # Calculate pagination values
-        total = query.count()
-        total_pages = math.ceil(total / limit)
-        skip = (page - 1) * limit
-        
-        # Get the paginated results
-        items = query.offset(skip).limit(limit).all()
+            # Sort by popularity (number of questions using this tag); the
+            # aggregate is selected so it can be carried in the cursor
+            question_count = func.count(question_tags.c.question_id).label("question_count")
+            query = query.add_columns(question_count).outerjoin(question_tags).group_by(Tag.id)
+            columns = (question_count, Tag.id)
+            query = keyset_order(query, columns, descending=True)
+            if cursor:
+                query = query.having(keyset_filter(columns, cursor, descending=True))
+            else:
+                query = query.offset((page - 1) * limit)
+            rows = query.limit(limit).all()
+            items = [tag for tag, _ in rows]
+            last = rows[-1] if len(rows) == limit else None
+            cursor_for_next = encode_cursor([last.question_count, last.Tag.id]) if last else None
+        else:
+            # Sort alphabetically by name or by creation date, newest first
+            order = get_sort(TAG_SORTS, sort, "name")
+            items = paginate(query, order, (page - 1) * limit, limit, cursor).all()
+            cursor_for_next = next_cursor(items, order[0], limit)
         
         result = PaginatedResponse(
             items=items,
             total=total,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=cursor_for_next
         )
         print(f"DataService.get_tags returning PaginatedResponse with {len(items)} items")
         return result
@@ -506,6 +1055,13 @@ class DataService:
     def get_tag(self, tag_id: int) -> Optional[Tag]:
         return self.db.query(Tag).filter(Tag.id == tag_id).first()
 
+    def autocomplete_tags(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most used tags whose name starts with prefix, from the in-memory array"""
+        return [
+            {"id": tag_id, "name": name, "count": count}
+            for tag_id, name, count in tag_autocomplete.complete(self.db, prefix, limit)
+        ]
+
     def create_tag(self, tag: TagCreate) -> Tag:
         db_tag = Tag(name=tag.name)
         self.db.add(db_tag)
@@ -516,9 +1072,10 @@ class DataService:
     def update_tag(self, tag_id: int, tag: TagCreate):
         db_tag = self.get_tag(tag_id)
         if db_tag:
-            self.db.query(Tag).filter(Tag.id == tag_id).update({Tag.name: tag.name})
+            # Assigned through the ORM so the rename reaches the autocomplete index
+            db_tag.name = tag.name
             self.db.commit()
-            db_tag = self.get_tag(tag_id)  # Refresh the object
+            self.db.refresh(db_tag)
         return db_tag
 
     def delete_tag(self, tag_id: int) -> bool:
@@ -535,6 +1092,7 @@ class DataService:
         if question and tag:
             stmt = insert(question_tags).values(question_id=question_id, tag_id=tag_id)
             self.db.execute(stmt)
+            self.db.query(Tag).filter(Tag.id == tag_id).update({Tag.count: func.coalesce(Tag.count, 0) + 1})
             self.db.commit()
             return True
         return False
@@ -545,6 +1103,8 @@ class DataService:
             question_tags.c.tag_id == tag_id
         )
         result = self.db.execute(stmt)
+        if result.rowcount:
+            self.db.query(Tag).filter(Tag.id == tag_id).update({Tag.count: Tag.count - result.rowcount})
         self.db.commit()
         return result.rowcount > 0
 
@@ -613,6 +1173,17 @@ class DataService:
         )
         
         self.db.add(comment)
+        
+        # Keep the target's comment counter in the same transaction
+        if question_id:
+            self.db.query(DBQuestion).filter(DBQuestion.id == question_id).update({
+                DBQuestion.comment_count: DBQuestion.comment_count + 1
+            })
+        else:
+            self.db.query(DBAnswer).filter(DBAnswer.id == answer_id).update({
+                DBAnswer.comment_count: DBAnswer.comment_count + 1
+            })
+        
         self.db.commit()
         self.db.refresh(comment)
         
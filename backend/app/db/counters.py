@@ -0,0 +1,40 @@
+"""
+Bulk reconciliation of the denormalized counters.
+
+DataService keeps Question.answer_count, Question.comment_count,
+Answer.comment_count and Tag.count current in the same transaction as each
+write; this recomputes them from the source tables after imports, restores
+or bugs.
+"""
+from sqlalchemy import select, update, func
+from . import models
+
+
+def _count(column, parent_id):
+    return select(func.count()).where(column == parent_id).scalar_subquery()
+
+
+def reconcile_counters(connection) -> dict:
+    """Recompute every counter that drifted and return rows fixed per counter"""
+    questions = models.Question.__table__
+    answers = models.Answer.__table__
+    comments = models.Comment.__table__
+    tags = models.Tag.__table__
+    question_tags = models.question_tags
+
+    targets = {
+        "questions.answer_count": (questions, questions.c.answer_count, _count(answers.c.question_id, questions.c.id)),
+        "questions.comment_count": (questions, questions.c.comment_count, _count(comments.c.question_id, questions.c.id)),
+        "answers.comment_count": (answers, answers.c.comment_count, _count(comments.c.answer_id, answers.c.id)),
+        "tags.count": (tags, tags.c.count, _count(question_tags.c.tag_id, tags.c.id)),
+    }
+
+    fixed = {}
+    for name, (table, column, actual) in targets.items():
+        result = connection.execute(
+            update(table)
+            .where(func.coalesce(column, -1) != actual)
+            .values({column.name: actual})
+        )
+        fixed[name] = result.rowcount
+    return fixed
@@ -1,11 +1,15 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from faker import Faker
 import random
 from datetime import datetime, timedelta
 import os
 from .base import Base
+from .migrations import run_migrations
+from .counters import reconcile_counters
+from .fts import clear_fts_cache
 from .models import User, Question, Answer, Tag, Vote, Badge, UserBadge, AnalyticsLog
 
 # Create data directory if it doesn't exist
@@ -17,12 +21,200 @@ db_path = os.path.join(data_dir, "sql_app.db")
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{db_path}")
 print(f"Using database at: {db_path}")
 
-# Create engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# SQLite connection profiles, applied to every new DBAPI connection.
+# "legacy" keeps the driver defaults (rollback journal, default page cache).
+ENGINE_PROFILES = {
+    "legacy": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative = KiB, so 64 MiB
+        "temp_store": "MEMORY",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "busy_timeout": 10000,
+        "synchronous": "FULL",
+        "cache_size": -16 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "tuned")
+
+
+def get_engine_profile(name: str) -> dict:
+    """Look up a named engine profile, failing loudly on typos"""
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE {name!r}, expected one of {sorted(ENGINE_PROFILES)}")
+    return ENGINE_PROFILES[name]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict):
+    """Run the PRAGMA statements of a profile on a raw DBAPI connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, profile: str = DB_ENGINE_PROFILE, read_only: bool = False):
+    """Attach the profile's PRAGMAs to every connection the engine opens"""
+    pragmas = dict(get_engine_profile(profile))
+    if read_only:
+        # The journal mode is owned by the writer; readers just refuse writes
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = "ON"
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return engine
+
+
+def create_app_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DB_ENGINE_PROFILE, **kwargs):
+    """Create a sync engine for the given URL with the named profile applied"""
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return configure_engine(create_engine(url, connect_args=connect_args, **kwargs), profile)
+
+
+# Sync drivers mapped to their async counterparts
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Rewrite a sync database URL to use the matching async driver"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def to_read_only_url(url: str) -> str:
+    """Derive a read-only URI for a file-backed SQLite URL, None if there is none"""
+    scheme, sep, path = url.partition(":///")
+    if not scheme.startswith("sqlite") or not path or path == ":memory:" or path.startswith("file:"):
+        return None
+    return f"{scheme}{sep}file:{path}?mode=ro&uri=true"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
+
+# Readers use an explicit replica when configured, otherwise read-only
+# connections to the same SQLite file; without either they share the writer
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or to_read_only_url(ASYNC_DATABASE_URL)
+
+# Pool sizing per role. SQLite only ever has one active writer, so the writer
+# pool stays small while readers get enough connections for list endpoints.
+DB_WRITER_POOL_SIZE = int(os.getenv("DB_WRITER_POOL_SIZE", "4"))
+DB_WRITER_MAX_OVERFLOW = int(os.getenv("DB_WRITER_MAX_OVERFLOW", "4"))
+DB_READER_POOL_SIZE = int(os.getenv("DB_READER_POOL_SIZE", "10"))
+DB_READER_MAX_OVERFLOW = int(os.getenv("DB_READER_MAX_OVERFLOW", "20"))
+
+
+def create_async_app_engine(url: str = ASYNC_DATABASE_URL, profile: str = DB_ENGINE_PROFILE, read_only: bool = False, **kwargs):
+    """Create an async engine; the profile is attached to its sync core"""
+    async_engine = create_async_engine(url, **kwargs)
+    configure_engine(async_engine.sync_engine, profile, read_only=read_only)
+    return async_engine
+
+
+# Per-role connection counters, filled by pool and cursor events
+pool_metrics = {}
+
+
+def track_pool_metrics(engine, role: str):
+    """Count connects, checkouts, checkins and statements for one engine role"""
+    counters = pool_metrics.setdefault(role, {"connects": 0, "checkouts": 0, "checkins": 0, "statements": 0})
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        counters["connects"] += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        counters["checkins"] += 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        counters["statements"] += 1
+
+    return engine
+
+
+def _pool_kwargs(url: str, pool_size: int, max_overflow: int) -> dict:
+    # In-memory SQLite uses a single static connection that cannot be sized
+    if url.startswith("sqlite") and ":memory:" in url:
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+# Create engines: the sync one serves startup, scripts and migrations,
+# the async ones serve request handlers
+engine = create_app_engine()
+async_engine = create_async_app_engine(
+    **_pool_kwargs(ASYNC_DATABASE_URL, DB_WRITER_POOL_SIZE, DB_WRITER_MAX_OVERFLOW)
+)
+track_pool_metrics(async_engine.sync_engine, "writer")
+
+if READ_DATABASE_URL:
+    async_reader_engine = create_async_app_engine(
+        READ_DATABASE_URL,
+        read_only=True,
+        **_pool_kwargs(READ_DATABASE_URL, DB_READER_POOL_SIZE, DB_READER_MAX_OVERFLOW)
+    )
+    track_pool_metrics(async_reader_engine.sync_engine, "reader")
+else:
+    async_reader_engine = async_engine
+
+
+class RoutingSession(Session):
+    """Session that sends read-only work to the reader pool.
+
+    AsyncDataService flags read-only methods through ``session.info``; every
+    other statement, and anything issued while flushing, goes to the writer.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("read_only") and not self._flushing:
+            return async_reader_engine.sync_engine
+        return async_engine.sync_engine
+
+
+def get_pool_metrics() -> dict:
+    """Snapshot pool occupancy and counters for the writer and reader engines"""
+    engines = {"writer": async_engine, "reader": async_reader_engine}
+    metrics = {}
+    for role, role_engine in engines.items():
+        pool = role_engine.pool
+        metrics[role] = {
+            "url": role_engine.url.render_as_string(hide_password=True),
+            "pool_size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            **pool_metrics.get(role, pool_metrics.get("writer", {})),
+        }
+    return metrics
+
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Objects must stay readable after commit without lazy IO on the event loop
+AsyncSessionLocal = async_sessionmaker(sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False)
+
 # Initialize Faker
 fake = Faker()
 
@@ -33,13 +225,25 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engines():
+    """Close pooled connections of the writer and reader engines"""
+    await async_engine.dispose()
+    if async_reader_engine is not async_engine:
+        await async_reader_engine.dispose()
+
 def drop_db():
     """Drop all tables in the database"""
     Base.metadata.drop_all(bind=engine)
+    clear_fts_cache()
 
 def init_db():
-    """Initialize the database by creating all tables"""
+    """Initialize the database by creating all tables and applying migrations"""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 def is_database_empty(db):
     """Check if the database is empty by querying users table"""
@@ -186,4 +390,8 @@ def populate_database(db):
     
     # Commit all changes
     db.commit()
+    
+    # Sample rows were linked through relationships, so derive the counters
+    reconcile_counters(db.connection())
+    db.commit()
     print("Database populated successfully!") 
\ No newline at end of file
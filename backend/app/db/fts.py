@@ -0,0 +1,103 @@
+"""
+SQLite FTS5 full-text index over question titles and bodies.
+
+questions_fts is an external-content FTS5 table: it stores only the inverted
+index and reads title/body back from questions by rowid, so the text is not
+duplicated. Triggers on questions keep it in sync inside the writing
+transaction; the update trigger fires only when title or body change, so view,
+vote and counter updates never touch the index.
+
+Databases without FTS5 (or other dialects) skip the index, and
+DataService.search_questions falls back to substring matching.
+"""
+import re
+from sqlalchemy import Table, Column, Integer, Text, MetaData, inspect, literal_column, func
+
+FTS_TABLE = "questions_fts"
+# bm25() column weights: a title hit counts as much as ten body hits
+FTS_WEIGHTS = {"title": 10.0, "body": 1.0}
+
+# Kept out of Base.metadata so create_all() never builds it as a plain table
+questions_fts = Table(
+    FTS_TABLE,
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("title", Text),
+    Column("body", Text),
+)
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, body, content='questions', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF title, body ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+# Engine URL -> whether questions_fts exists there
+_available = {}
+
+
+def fts5_supported(connection) -> bool:
+    """Whether the connection is SQLite with the FTS5 extension compiled in"""
+    if connection.dialect.name != "sqlite":
+        return False
+    options = connection.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in options
+
+
+def create_question_fts(connection) -> bool:
+    """Create the index and its triggers and (re)build it; False if unsupported"""
+    if not fts5_supported(connection):
+        return False
+    for statement in _DDL:
+        connection.exec_driver_sql(statement)
+    rebuild_question_fts(connection)
+    return True
+
+
+def rebuild_question_fts(connection):
+    """Re-read every question into the index, e.g. after a bulk import"""
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def has_question_fts(connection) -> bool:
+    """Whether questions_fts exists on this connection's database (cached per engine)"""
+    key = str(connection.engine.url)
+    if key not in _available:
+        _available[key] = connection.dialect.name == "sqlite" and inspect(connection).has_table(FTS_TABLE)
+    return _available[key]
+
+
+def clear_fts_cache():
+    """Forget which databases have questions_fts, after migrations or a reset may have changed that"""
+    _available.clear()
+
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query in which every word must match.
+
+    Words are quoted, so user input can never inject FTS5 operators or column
+    filters; the porter tokenizer still stems them. Returns "" when the text
+    contains no searchable words.
+    """
+    words = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{word}"' for word in words)
+
+
+def fts_match(expression: str):
+    """WHERE clause matching questions_fts against an FTS5 query"""
+    return literal_column(FTS_TABLE).op("MATCH")(expression)
+
+
+def fts_rank():
+    """BM25 score of the current match with title-weighted columns; lower is better"""
+    return func.bm25(literal_column(FTS_TABLE), *FTS_WEIGHTS.values())
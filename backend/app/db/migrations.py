@@ -0,0 +1,156 @@
+"""
+Versioned schema migrations.
+
+create_all() only creates missing tables, so changes to tables that already
+exist (new indexes, columns, virtual tables) are applied here. Migrations run
+in version order, each in its own transaction, and are recorded in the
+schema_migrations table so they are applied exactly once per database.
+Every migration must be idempotent, because on a fresh database create_all()
+has usually created the objects already. Run them with migrate.py.
+"""
+from datetime import datetime
+from sqlalchemy import Table, Column, Integer, String, DateTime, inspect, select, insert, text
+from sqlalchemy.schema import CreateIndex
+from .base import Base
+from . import models
+from .counters import reconcile_counters
+from .fts import clear_fts_cache, create_question_fts
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+# (version, description, function(connection))
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    """Register a migration function under a unique version number"""
+    def register(fn):
+        if any(existing == version for existing, _, _ in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def create_indexes(connection, table: Table, *names: str):
+    """Create the named indexes declared on a table unless they already exist"""
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        connection.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+
+def add_column(connection, table: Table, column_name: str) -> bool:
+    """Add a column declared on the model to an existing table; True if added"""
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    if column_name in existing:
+        return False
+    column = table.c[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column_name} {column_type}"
+    if column.default is not None and column.default.is_scalar:
+        default = column.default.arg
+        ddl += f" DEFAULT {int(default) if isinstance(default, bool) else default!r}"
+    connection.execute(text(ddl))
+    return True
+
+
+@migration(1, "Composite indexes for hot query predicates")
+def add_hot_path_indexes(connection):
+    create_indexes(
+        connection, models.Question.__table__,
+        "ix_questions_created_at", "ix_questions_votes", "ix_questions_updated_at", "ix_questions_author_created",
+    )
+    create_indexes(
+        connection, models.Answer.__table__,
+        "ix_answers_question_votes", "ix_answers_question_created", "ix_answers_author",
+    )
+    create_indexes(connection, models.Tag.__table__, "ix_tags_name_lower", "ix_tags_count", "ix_tags_created_at")
+    create_indexes(connection, models.question_tags, "ix_question_tags_tag_question")
+    create_indexes(connection, models.Vote.__table__, "ix_votes_user_question", "ix_votes_user_answer")
+    create_indexes(connection, models.Comment.__table__, "ix_comments_question_created", "ix_comments_answer_created")
+    create_indexes(connection, models.CommentVote.__table__, "ix_comment_votes_user_comment")
+    create_indexes(connection, models.AnalyticsLog.__table__, "ix_analytics_logs_session_timestamp")
+
+
+@migration(2, "Denormalized answer and comment counters")
+def add_denormalized_counters(connection):
+    add_column(connection, models.Question.__table__, "answer_count")
+    add_column(connection, models.Question.__table__, "comment_count")
+    add_column(connection, models.Answer.__table__, "comment_count")
+    reconcile_counters(connection)
+
+
+@migration(3, "Maintained tag usage counts")
+def backfill_tag_counts(connection):
+    # Tag.count used to be written only at creation; recompute it once now that
+    # DataService keeps it current
+    reconcile_counters(connection)
+
+
+@migration(4, "Unique viewer sketches")
+def add_unique_viewer_sketches(connection):
+    add_column(connection, models.Question.__table__, "unique_viewers")
+    models.QuestionViewerSketch.__table__.create(connection, checkfirst=True)
+
+
+@migration(5, "Full-text search index on questions")
+def add_question_fts(connection):
+    # No-op where SQLite lacks FTS5; search then keeps its substring fallback
+    create_question_fts(connection)
+
+
+@migration(6, "Analytics rollup tables")
+def add_analytics_rollups(connection):
+    # Filled from existing logs by the first roll_up_analytics() run
+    models.AnalyticsHourlyRollup.__table__.create(connection, checkfirst=True)
+    models.AnalyticsSessionRollup.__table__.create(connection, checkfirst=True)
+    models.AnalyticsRollupState.__table__.create(connection, checkfirst=True)
+
+
+@migration(7, "Analytics log timestamp index")
+def add_analytics_timestamp_index(connection):
+    # Exports read a time range in (timestamp, id) order straight off this index
+    create_indexes(connection, models.AnalyticsLog.__table__, "ix_analytics_logs_timestamp")
+
+
+@migration(8, "Session log index by event type")
+def add_session_event_index(connection):
+    # Session log pages filtered by event type read this index instead of
+    # skipping the session's other events
+    create_indexes(connection, models.AnalyticsLog.__table__, "ix_analytics_logs_session_event_timestamp")
+
+
+def get_applied_versions(connection) -> set:
+    """Versions already recorded in schema_migrations"""
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine) -> list:
+    """Apply all pending migrations in order and return their versions"""
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        applied = get_applied_versions(connection)
+
+    newly_applied = []
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with engine.begin() as connection:
+            fn(connection)
+            connection.execute(insert(schema_migrations).values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow(),
+            ))
+        print(f"Applied migration {version}: {description}")
+        newly_applied.append(version)
+    # A migration may have created questions_fts where it was cached as missing
+    clear_fts_cache()
+    return newly_applied
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Table, JSON, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Table, JSON, CheckConstraint, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -68,14 +68,28 @@ class Question(Base):
     votes = Column(Integer, default=0)
     views = Column(Integer, default=0)
     is_answered = Column(Boolean, default=False)
+    # Denormalized counters, maintained by DataService writes
+    answer_count = Column(Integer, default=0)
+    comment_count = Column(Integer, default=0)
+    # Estimated distinct viewers, refreshed when the viewer sketch is persisted
+    unique_viewers = Column(Integer, default=0)
+    
+    # Indexes backing the list sort orders and per-user listings
+    __table_args__ = (
+        Index("ix_questions_created_at", "created_at"),
+        Index("ix_questions_votes", "votes"),
+        Index("ix_questions_updated_at", "updated_at"),
+        Index("ix_questions_author_created", "author_id", "created_at"),
+    )
     
     # Relationships
     author = relationship("User", back_populates="questions")
     answers = relationship("Answer", back_populates="question")
     tags = relationship("Tag", secondary="question_tags", back_populates="questions")
     question_votes = relationship("Vote", back_populates="question")
-    comments = relationship("Comment", back_populates="question")
-    comments = relationship("Comment", back_populates="question")
+    # A comment cannot outlive its target (see comment_target_constraint)
+    comments = relationship("Comment", back_populates="question", cascade="all, delete-orphan")
+    viewer_sketch = relationship("QuestionViewerSketch", uselist=False, cascade="all, delete-orphan")
 
 class Answer(Base):
     __tablename__ = "answers"
@@ -88,13 +102,20 @@ class Answer(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     votes = Column(Integer, default=0)
     is_accepted = Column(Boolean, default=False)
+    comment_count = Column(Integer, default=0)
+    
+    # Answers are listed per question (by votes or date) and per author
+    __table_args__ = (
+        Index("ix_answers_question_votes", "question_id", "votes"),
+        Index("ix_answers_question_created", "question_id", "created_at"),
+        Index("ix_answers_author", "author_id"),
+    )
     
     # Relationships
     author = relationship("User", back_populates="answers")
     question = relationship("Question", back_populates="answers")
     answer_votes = relationship("Vote", back_populates="answer")
-    comments = relationship("Comment", back_populates="answer")
-    comments = relationship("Comment", back_populates="answer")
+    comments = relationship("Comment", back_populates="answer", cascade="all, delete-orphan")
 
 class Tag(Base):
     __tablename__ = "tags"
@@ -105,6 +126,13 @@ class Tag(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     count = Column(Integer, default=0)
     
+    __table_args__ = (
+        # Tag lookups by name are case-insensitive
+        Index("ix_tags_name_lower", func.lower(name)),
+        Index("ix_tags_count", "count"),
+        Index("ix_tags_created_at", "created_at"),
+    )
+    
     # Relationships
     questions = relationship("Question", secondary="question_tags", back_populates="tags")
 
@@ -113,7 +141,9 @@ question_tags = Table(
     "question_tags",
     Base.metadata,
     Column("question_id", Integer, ForeignKey("questions.id"), primary_key=True),
-    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True)
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # The primary key covers question -> tags; this covers tag -> questions
+    Index("ix_question_tags_tag_question", "tag_id", "question_id")
 )
 
 class Vote(Base):
@@ -126,6 +156,12 @@ class Vote(Base):
     vote_type = Column(String)  # "up" or "down"
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Every vote lookup is "has this user voted on this target"
+    __table_args__ = (
+        Index("ix_votes_user_question", "user_id", "question_id"),
+        Index("ix_votes_user_answer", "user_id", "answer_id"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="votes")
     question = relationship("Question", back_populates="question_votes")
@@ -165,9 +201,57 @@ class AnalyticsLog(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
+    __table_args__ = (
+        Index("ix_analytics_logs_session_timestamp", "session_id", "timestamp"),
+        Index("ix_analytics_logs_timestamp", "timestamp"),
+        Index("ix_analytics_logs_session_event_timestamp", "session_id", "event_type", "timestamp"),
+    )
+    
     # Relationships
     user = relationship("User")
 
+class AnalyticsHourlyRollup(Base):
+    """Events per hour, event type and page, maintained from analytics_logs by db/rollups.py"""
+    __tablename__ = "analytics_hourly_rollups"
+    
+    # UTC hour as "YYYY-MM-DDTHH:00", so ranges compare as text
+    hour = Column(String(16), primary_key=True)
+    event_type = Column(String, primary_key=True)
+    # Without query string or fragment; "" for events without a page
+    page_url = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class AnalyticsSessionRollup(Base):
+    """Events per day and session, maintained from analytics_logs by db/rollups.py"""
+    __tablename__ = "analytics_session_rollups"
+    
+    # UTC day as "YYYY-MM-DD"
+    day = Column(String(10), primary_key=True)
+    session_id = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    first_event_at = Column(DateTime)
+    last_event_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_analytics_session_rollups_session_day", "session_id", "day"),
+    )
+
+class AnalyticsRollupState(Base):
+    """High-water mark of the analytics_logs ids already rolled up"""
+    __tablename__ = "analytics_rollup_state"
+    
+    name = Column(String, primary_key=True)
+    last_log_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class QuestionViewerSketch(Base):
+    """HyperLogLog registers of the distinct viewers of one question"""
+    __tablename__ = "question_viewer_sketches"
+    
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    registers = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Comment(Base):
     __tablename__ = "comments"
     
@@ -186,6 +270,8 @@ class Comment(Base):
             '(question_id IS NOT NULL AND answer_id IS NULL) OR (question_id IS NULL AND answer_id IS NOT NULL)',
             name='comment_target_constraint'
         ),
+        Index("ix_comments_question_created", "question_id", "created_at"),
+        Index("ix_comments_answer_created", "answer_id", "created_at"),
     )
     
     # Relationships
@@ -202,6 +288,10 @@ class CommentVote(Base):
     comment_id = Column(Integer, ForeignKey("comments.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_comment_votes_user_comment", "user_id", "comment_id"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="comment_votes")
     comment = relationship("Comment", back_populates="comment_votes")
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Incremental rollups of analytics_logs.
+
+analytics_hourly_rollups counts events per (hour, event type, page) and
+analytics_session_rollups counts them per (day, session), so reports read a
+few aggregate rows instead of scanning raw logs and parsing event_data.
+
+roll_up_analytics() advances from a high-water mark in
+analytics_rollup_state: it reads the logs with ids above the mark in chunks,
+parses each event once, and adds the chunk's counts to the rollups in the
+same transaction that moves the mark. The mark is moved with a
+compare-and-set, so two runs racing over the same chunk cannot count it
+twice; the loser rolls back and the next run continues from the new mark.
+SQLite commits writers one at a time, so log ids become visible in order and
+no row is skipped behind the mark.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from sqlalchemy import String, case, select, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from . import models
+
+ROLLUP_NAME = "analytics_logs"
+ROLLUP_CHUNK = 10000
+MAX_PAGE_URL_LENGTH = 500
+
+
+def page_url_of(event_data: Optional[str]) -> str:
+    """payload.page_url of a stored event without query string or fragment, or "" if it has none"""
+    data: Any = event_data
+    # log_event stores the event JSON-encoded inside the JSON column, so the
+    # raw value is decoded up to twice before reaching the event object
+    for _ in range(2):
+        if not isinstance(data, str):
+            break
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return ""
+    payload = data.get("payload") if isinstance(data, dict) else None
+    url = payload.get("page_url") if isinstance(payload, dict) else None
+    if not isinstance(url, str):
+        return ""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))[:MAX_PAGE_URL_LENGTH]
+
+
+def hour_of(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m-%dT%H:00")
+
+
+def day_of(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m-%d")
+
+
+def _insert(connection, table):
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+def get_high_water_mark(connection) -> int:
+    """Id of the last analytics log included in the rollups"""
+    state = models.AnalyticsRollupState.__table__
+    mark = connection.execute(select(state.c.last_log_id).where(state.c.name == ROLLUP_NAME)).scalar()
+    return mark or 0
+
+
+def _aggregate(rows) -> Tuple[Dict[Tuple, int], Dict[Tuple, list]]:
+    hourly: Dict[Tuple, int] = {}
+    sessions: Dict[Tuple, list] = {}
+    for _, session_id, event_type, event_data, timestamp in rows:
+        if timestamp is None:
+            continue
+        key = (hour_of(timestamp), event_type or "", page_url_of(event_data))
+        hourly[key] = hourly.get(key, 0) + 1
+        key = (day_of(timestamp), session_id or "")
+        entry = sessions.get(key)
+        if entry is None:
+            sessions[key] = [1, timestamp, timestamp]
+        else:
+            entry[0] += 1
+            entry[1] = min(entry[1], timestamp)
+            entry[2] = max(entry[2], timestamp)
+    return hourly, sessions
+
+
+def _roll_up_chunk(connection, chunk: int) -> int:
+    """Add the next chunk of logs to the rollups; returns logs rolled up (0 when caught up or raced)"""
+    logs = models.AnalyticsLog.__table__
+    state = models.AnalyticsRollupState.__table__
+    hourly_table = models.AnalyticsHourlyRollup.__table__
+    session_table = models.AnalyticsSessionRollup.__table__
+
+    mark = get_high_water_mark(connection)
+    rows = connection.execute(
+        # Raw event_data text: the JSON type would fail on a malformed row
+        select(logs.c.id, logs.c.session_id, logs.c.event_type, type_coerce(logs.c.event_data, String), logs.c.timestamp)
+        .where(logs.c.id > mark)
+        .order_by(logs.c.id)
+        .limit(chunk)
+    ).all()
+    if not rows:
+        return 0
+
+    moved = connection.execute(
+        update(state)
+        .where(state.c.name == ROLLUP_NAME, state.c.last_log_id == mark)
+        .values(last_log_id=rows[-1][0], updated_at=datetime.utcnow())
+    ).rowcount
+    if not moved and mark:
+        return 0
+    if not moved:
+        # First run: create the state row, unless a racing first run just did
+        created = connection.execute(_insert(connection, state).values(
+            name=ROLLUP_NAME, last_log_id=rows[-1][0], updated_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=[state.c.name])).rowcount
+        if not created:
+            return 0
+
+    hourly, sessions = _aggregate(rows)
+    if hourly:
+        statement = _insert(connection, hourly_table)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[hourly_table.c.hour, hourly_table.c.event_type, hourly_table.c.page_url],
+                set_={"count": hourly_table.c.count + statement.excluded.count},
+            ),
+            [{"hour": hour, "event_type": event_type, "page_url": page_url, "count": count}
+             for (hour, event_type, page_url), count in hourly.items()],
+        )
+    if sessions:
+        statement = _insert(connection, session_table)
+        excluded = statement.excluded
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[session_table.c.day, session_table.c.session_id],
+                set_={
+                    "count": session_table.c.count + excluded.count,
+                    "first_event_at": case((excluded.first_event_at < session_table.c.first_event_at, excluded.first_event_at),
+                                           else_=session_table.c.first_event_at),
+                    "last_event_at": case((excluded.last_event_at > session_table.c.last_event_at, excluded.last_event_at),
+                                          else_=session_table.c.last_event_at),
+                },
+            ),
+            [{"day": day, "session_id": session_id, "count": count, "first_event_at": first, "last_event_at": last}
+             for (day, session_id), (count, first, last) in sessions.items()],
+        )
+    return len(rows)
+
+
+def roll_up_analytics(engine, chunk: int = ROLLUP_CHUNK, max_chunks: Optional[int] = None) -> Dict[str, int]:
+    """Roll up every log above the high-water mark, one transaction per chunk.
+
+    Returns the logs rolled up and the new mark.
+    """
+    rolled_up = chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        with engine.begin() as connection:
+            count = _roll_up_chunk(connection, chunk)
+        if not count:
+            break
+        rolled_up += count
+        chunks += 1
+    with engine.connect() as connection:
+        mark = get_high_water_mark(connection)
+    return {"rolled_up": rolled_up, "chunks": chunks, "high_water_mark": mark}
@@ -117,6 +117,7 @@ class Answer(AnswerBase):
     updated_at: datetime
     votes: int = 0
     is_accepted: bool = False
+    comment_count: int = 0
     
     class Config:
         from_attributes = True
@@ -141,6 +142,10 @@ class Question(QuestionBase):
     votes: int = 0
     views: int = 0
     is_answered: bool = False
+    answer_count: int = 0
+    comment_count: int = 0
+    # Estimated number of distinct viewers (HyperLogLog, ~3% error)
+    unique_viewers: int = 0
 
     class Config:
         from_attributes = True
@@ -183,6 +188,10 @@ class Tag(TagBase):
     class Config:
         from_attributes = True
 
+class TagCompletion(Tag):
+    """A tag name suggested for a prefix, with its usage count"""
+    count: int = 0
+
 # Search models
 class SearchParams(BaseModel):
     q: str = Field(..., description="Search query")
@@ -199,6 +208,41 @@ class SearchResult(BaseModel):
     limit: int
     total_pages: int
 
+class SearchHit(QuestionSummary):
+    """A search result; content is the best matching excerpt of the body"""
+    title_highlights: List[List[int]] = []
+    content_highlights: List[List[int]] = []
+
+class RelatedQuestion(QuestionSummary):
+    """A question similar to another one, with its cosine similarity"""
+    score: float
+
+class DuplicateCandidate(BaseModel):
+    """An existing question that looks like a near duplicate"""
+    id: int
+    title: str
+    similarity: float
+
+class TagSuggestion(BaseModel):
+    name: str
+    similarity: float
+
+class SearchSuggestions(BaseModel):
+    """'Did you mean' suggestions for a search"""
+    query: Optional[str] = None
+    tags: List[TagSuggestion]
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class SearchFacets(BaseModel):
+    """Refinement counts over every question matching a search"""
+    total: int
+    tags: List[FacetCount]
+    answered: List[FacetCount]
+    votes: List[FacetCount]
+
 # Statistics models
 class UserStats(BaseModel):
     total_questions: int
@@ -223,9 +267,12 @@ T = TypeVar('T')
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    # None when the caller asked for total_mode=none
+    total: Optional[int]
     page: int
     limit: int
+    # Opaque keyset cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
     
 class SearchRequest(BaseModel):
     query: str
@@ -0,0 +1,63 @@
+"""
+Opaque keyset (cursor) pagination.
+
+A cursor encodes the (sort_key, id) of the last item on a page. The next page
+is read with a row-value comparison against that tuple, which SQLite answers
+from the (sort_key) index (secondary indexes carry the rowid, so they are
+(sort_key, id) indexes already) instead of walking and discarding OFFSET rows.
+Inserts between requests no longer shift items across pages.
+
+Cursors are base64url-encoded JSON and carry no meaning for clients; a cursor
+that cannot be decoded raises ValueError.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+from sqlalchemy import DateTime, tuple_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key values of the last item on a page"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> list:
+    """Decode a cursor into values typed for the given key columns"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if value is not None and isinstance(getattr(column, "type", None), DateTime) else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_order(query, columns: Sequence[Any], descending: bool):
+    """Order a query by the key columns, all in the same direction"""
+    return query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+
+def keyset_filter(columns: Sequence[Any], cursor: str, descending: bool):
+    """Build the 'strictly after the cursor' predicate for a key"""
+    values = decode_cursor(cursor, columns)
+    key = tuple_(*columns)
+    return key < tuple_(*values) if descending else key > tuple_(*values)
+
+
+def next_cursor(items: Sequence[Any], columns: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor for the page after items, or None when this was the last page.
+
+    Key values are read from the last item by column key, so ORM objects and
+    result rows selecting the key columns unlabeled both work.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column in columns])
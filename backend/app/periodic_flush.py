@@ -0,0 +1,118 @@
+"""
+Periodic flusher shared by the write-behind buffers.
+
+The view counter, the unique viewer sketches and the analytics queue all
+collect writes in memory and hand them to the database from a background
+task: every `interval` seconds, as soon as the buffer sets `_wakeup`, and
+once more on shutdown. This class owns that loop. A subclass keeps its own
+buffer under `_lock` and implements the drain and write steps:
+
+    _drain()          take everything pending, emptying the buffer
+    _write(batch)     write a drained batch; returns how many items it wrote
+    _restore(batch)   put back a batch whose write failed
+
+A write that fails with an exception, or is cancelled, restores the batch
+to be retried by the next flush. A write that finishes part of its batch
+before failing may remove those items from the batch first, so that only
+the rest is restored.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class PeriodicFlusher:
+    name = "Flush"
+
+    def __init__(self, session_factory: Callable[[], Any], interval: float):
+        self._session_factory = session_factory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.last_flush_at: Optional[float] = None
+        self.last_flush_ms: Optional[float] = None
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _drain(self) -> Any:
+        raise NotImplementedError
+
+    async def _write(self, batch: Any) -> int:
+        raise NotImplementedError
+
+    def _restore(self, batch: Any):
+        raise NotImplementedError
+
+    async def flush(self) -> int:
+        """Write everything pending; returns items written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch = self._drain()
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                written = await self._write(batch)
+            except Exception as e:
+                self._restore(batch)
+                self.failed_flushes += 1
+                print(f"{self.name} failed, will retry: {e}")
+                return 0
+            except BaseException:
+                # Cancelled mid-write: keep the batch for the shutdown flush
+                self._restore(batch)
+                raise
+            if not written:
+                return 0
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed += written
+            self.last_flush_at = time.time()
+            self.last_flush_ms = round(elapsed_ms, 3)
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return written
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def mean_flush_ms(self) -> Optional[float]:
+        return round(self._total_flush_ms / self.flushes, 3) if self.flushes else None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the periodic flusher on the running event loop"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        if self._task is not None:
+            # Let the flusher finish its current write instead of cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        self._wakeup = None
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from ..db.db import get_db
-from ..data_service import DataService
+from ..db.db import get_async_db
+from ..async_data_service import AsyncDataService
+from ..data_service import ANSWER_SORTS, get_sort
+from ..pagination import next_cursor
 from ..models import Answer, AnswerCreate, AnswerUpdate
 
 router = APIRouter(
@@ -12,29 +14,41 @@ router = APIRouter(
 
 @router.get("/", response_model=List[Answer])
 async def get_answers(
+    response: Response,
     question_id: Optional[int] = None,
     user_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     sort: Optional[str] = Query("votes", description="Sort by: votes, newest, oldest"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; overrides page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.get_answers(
-        question_id=question_id,
-        user_id=user_id,
-        page=page,
-        limit=limit,
-        sort=sort or "votes"
-    )
+    data_service = AsyncDataService(db)
+    try:
+        answers = await data_service.get_answers(
+            question_id=question_id,
+            user_id=user_id,
+            page=page,
+            limit=limit,
+            sort=sort or "votes",
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # The body stays a plain list, so the next page cursor travels in a header
+    cursor_for_next = next_cursor(answers, get_sort(ANSWER_SORTS, sort or "votes", "votes")[0], limit)
+    if cursor_for_next:
+        response.headers["X-Next-Cursor"] = cursor_for_next
+    return answers
 
 @router.get("/{answer_id}", response_model=Answer)
 async def get_answer(
     answer_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    answer = data_service.get_answer(answer_id)
+    data_service = AsyncDataService(db)
+    answer = await data_service.get_answer(answer_id)
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     return answer
@@ -42,10 +56,10 @@ async def get_answer(
 @router.post("/", response_model=Answer)
 async def create_answer(
     answer: AnswerCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.create_answer(
+    data_service = AsyncDataService(db)
+    return await data_service.create_answer(
         question_id=answer.question_id,
         user_id=answer.user_id,
         content=answer.body
@@ -55,10 +69,10 @@ async def create_answer(
 async def update_answer(
     answer_id: int,
     answer_update: AnswerUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    answer = data_service.get_answer(answer_id)
+    data_service = AsyncDataService(db)
+    answer = await data_service.get_answer(answer_id)
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     
@@ -66,22 +80,21 @@ async def update_answer(
     for field, value in answer_update.dict(exclude_unset=True).items():
         setattr(answer, field, value)
     
-    db.commit()
-    db.refresh(answer)
+    await db.commit()
+    await db.refresh(answer)
     return answer
 
 @router.delete("/{answer_id}")
 async def delete_answer(
     answer_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    answer = data_service.get_answer(answer_id)
+    data_service = AsyncDataService(db)
+    answer = await data_service.get_answer(answer_id)
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     
-    db.delete(answer)
-    db.commit()
+    await data_service.delete_answer(answer_id)
     return {"message": "Answer deleted successfully"}
 
 @router.post("/{answer_id}/vote")
@@ -90,10 +103,10 @@ async def vote_answer(
     user_id: int,
     vote_type: str = Query(..., description="Vote type: up or down"),
     undo: bool = Query(False, description="Remove the vote instead of adding it"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    answer = data_service.get_answer(answer_id)
+    data_service = AsyncDataService(db)
+    answer = await data_service.get_answer(answer_id)
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     
@@ -101,24 +114,24 @@ async def vote_answer(
         raise HTTPException(status_code=400, detail="Invalid vote type")
     
     if undo:
-        data_service.remove_answer_vote(answer_id, user_id, vote_type)
+        await data_service.remove_answer_vote(answer_id, user_id, vote_type)
         return {"message": "Vote removed successfully"}
     else:
-        data_service.vote_answer(answer_id, user_id, vote_type)
+        await data_service.vote_answer(answer_id, user_id, vote_type)
         return {"message": "Vote recorded successfully"}
 
 @router.get("/{answer_id}/user_vote")
 async def get_user_vote_on_answer(
     answer_id: int,
     user_id: int = Query(..., description="User ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's vote on an answer"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    answer = data_service.get_answer(answer_id)
+    answer = await data_service.get_answer(answer_id)
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     
-    vote = data_service.get_user_vote_on_answer(answer_id, user_id)
+    vote = await data_service.get_user_vote_on_answer(answer_id, user_id)
     return {"vote": vote}
\ No newline at end of file
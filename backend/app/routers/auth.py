@@ -5,11 +5,11 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 from ..models import UserAuth, UserLogin, Token, User as PydanticUser
-from ..db.db import get_db
+from ..db.db import get_async_db
 from ..db.models import User as DBUser
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from ..data_service import DataService
+from ..async_data_service import AsyncDataService
 
 router = APIRouter(
     prefix="/auth",
@@ -40,7 +40,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> DBUser:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> DBUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,19 +54,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    data_service = DataService(db)
-    user = data_service.get_user_by_username(username)
+    data_service = AsyncDataService(db)
+    user = await data_service.get_user_by_username(username)
     if user is None:
         raise credentials_exception
     return user
 
 @router.post("/register", response_model=PydanticUser)
-async def register(user_data: UserAuth, db: Session = Depends(get_db)):
-    data_service = DataService(db)
+async def register(user_data: UserAuth, db: AsyncSession = Depends(get_async_db)):
+    data_service = AsyncDataService(db)
     
     try:
         # Check if username already exists
-        if data_service.get_user_by_username(user_data.username):
+        if await data_service.get_user_by_username(user_data.username):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={
@@ -77,7 +77,7 @@ async def register(user_data: UserAuth, db: Session = Depends(get_db)):
             )
         
         # Check if email already exists
-        if data_service.get_user_by_email(user_data.email):
+        if await data_service.get_user_by_email(user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={
@@ -89,7 +89,7 @@ async def register(user_data: UserAuth, db: Session = Depends(get_db)):
         
         # Create new user
         hashed_password = get_password_hash(user_data.password)
-        user = data_service.create_user(
+        user = await data_service.create_user(
             name=user_data.username,
             email=user_data.email,
             hashed_password=hashed_password
@@ -111,11 +111,11 @@ async def register(user_data: UserAuth, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    data_service = DataService(db)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    data_service = AsyncDataService(db)
     print(f"Attempting login for username: {form_data.username}")
     
-    user = data_service.get_user_by_username(form_data.username)
+    user = await data_service.get_user_by_username(form_data.username)
     print(f"User found: {user is not None}")
     
     if not user:
@@ -0,0 +1,64 @@
+from fastapi import APIRouter
+from ..db.db import get_pool_metrics
+from ..totals_cache import get_totals_cache_stats
+from ..view_counter import get_view_buffer_stats
+from ..analytics_queue import get_analytics_queue_stats
+from ..unique_viewers import get_unique_viewer_stats
+from ..search import get_search_stats, get_tag_autocomplete_stats, get_search_cache_stats, get_related_stats, get_duplicate_stats, get_trigram_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/db")
+async def get_db_metrics():
+    """Connection pool occupancy and counters for the writer and reader engines"""
+    return get_pool_metrics()
+
+@router.get("/totals")
+async def get_totals_metrics():
+    """Hit/miss counters for the paginated totals cache"""
+    return get_totals_cache_stats()
+
+@router.get("/views")
+async def get_view_buffer_metrics():
+    """Pending and flushed counts for the write-behind view counter"""
+    return get_view_buffer_stats()
+
+@router.get("/analytics-queue")
+async def get_analytics_queue_metrics():
+    """Depth, flush latency and drop counts of the analytics write-behind queue"""
+    return get_analytics_queue_stats()
+
+@router.get("/unique-viewers")
+async def get_unique_viewer_metrics():
+    """Dedupe and sketch persistence counters for unique viewer counting"""
+    return get_unique_viewer_stats()
+
+@router.get("/search")
+async def get_search_metrics():
+    """Document and term counts of the in-process search indexes"""
+    return get_search_stats()
+
+@router.get("/tag-autocomplete")
+async def get_tag_autocomplete_metrics():
+    """Array sizes and build/lookup counters for tag autocomplete"""
+    return get_tag_autocomplete_stats()
+
+@router.get("/search-cache")
+async def get_search_cache_metrics():
+    """Hit/miss/eviction counters of the question search result cache"""
+    return get_search_cache_stats()
+
+@router.get("/related")
+async def get_related_metrics():
+    """Vector counts and build/lookup counters of the related-questions index"""
+    return get_related_stats()
+
+@router.get("/duplicates")
+async def get_duplicate_metrics():
+    """Signature counts and build/lookup counters of near-duplicate detection"""
+    return get_duplicate_stats()
+
+@router.get("/trigrams")
+async def get_trigram_metrics():
+    """Vocabulary sizes and build/lookup counters of typo-tolerant search"""
+    return get_trigram_stats()
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, cast, Any
-from ..db.db import get_db
-from ..db import models as db_models
+from ..db.db import get_async_db
 from ..db.models import Question as DBQuestion, User as DBUser
-from ..data_service import DataService
-from ..models import Question, QuestionSummary, QuestionCreate, QuestionUpdate, MessageResponse, PaginatedResponse, UserBase
+from ..async_data_service import AsyncDataService
+from ..data_service import TAG_SEPARATOR, QUESTION_SORTS, get_sort
+from ..models import Question, QuestionBase, QuestionSummary, QuestionCreate, DuplicateCandidate, QuestionUpdate, MessageResponse, PaginatedResponse, RelatedQuestion, SearchFacets, SearchHit, SearchSuggestions, UserBase
+from ..pagination import next_cursor
+from ..search import highlight, snippet, tokenize
+from ..view_counter import view_buffer
+from ..unique_viewers import viewer_tracker, viewer_key
 import math
 
 router = APIRouter(
@@ -43,6 +47,34 @@ def convert_user_to_userbase(db_user: DBUser) -> UserBase:
         profile=cast(Any, db_user.profile)
     )
 
+def convert_row_to_summary(row: Any) -> QuestionSummary:
+    """Build a QuestionSummary from a DataService.get_question_summaries row"""
+    if row.author_name is None:
+        author = convert_user_to_userbase(cast(DBUser, None))
+    else:
+        author = UserBase(
+            name=row.author_name,
+            email=row.author_email,
+            reputation=row.author_reputation,
+            avatar="",
+            location=row.author_location or None,
+            website=row.author_website or None,
+            is_active=row.author_is_active,
+            profile=row.author_profile
+        )
+    
+    return QuestionSummary(
+        id=row.id,
+        title=row.title,
+        content=row.excerpt + "..." if row.truncated else row.excerpt,
+        author=author,
+        tags=row.tag_names.split(TAG_SEPARATOR) if row.tag_names else [],
+        votes=row.votes,
+        views=row.views,
+        answer_count=row.answer_count or 0,
+        asked=row.created_at
+    )
+
 @router.get("/", response_model=PaginatedResponse)
 async def get_questions(
     skip: int = Query(0, ge=0, description="Number of questions to skip"),
@@ -50,122 +82,147 @@ async def get_questions(
     sort: str = Query("newest", description="Sort by: newest, votes, active"),
     tag: Optional[str] = Query(None, description="Filter by tag"),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; overrides skip"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$", description="exact, estimate (cached total, counter or upper bound; no scan) or none"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a list of questions with optional filtering and sorting"""
     
-    data_service = DataService(db)
-    
-    # Convert skip to page for data service calls
-    page = (skip // limit) + 1 if limit > 0 else 1
-    
-    if tag:
-        paginated_result = data_service.get_questions_by_tag(tag, page=page, limit=limit)
-        questions_data = paginated_result.items
-    elif user_id:
-        paginated_result = data_service.get_questions_by_user(user_id, page=page, limit=limit)
-        questions_data = paginated_result.items
-    else:
-        questions_data = data_service.get_questions(skip=skip, limit=limit, sort=sort)
-    
-    total = db.query(db_models.Question).count()
+    data_service = AsyncDataService(db)
     
-    questions = []
-    for q_data in questions_data:
-        # Cast q_data to DBQuestion to help type checker
-        db_question: DBQuestion = q_data
-        question = QuestionSummary(
-            id=cast(int, db_question.id),
-            title=cast(str, db_question.title),
-            content=cast(str, db_question.body)[:200] + "..." if len(cast(str, db_question.body)) > 200 else cast(str, db_question.body),
-            author=convert_user_to_userbase(cast(DBUser, db_question.author)),
-            tags=[t.name for t in db_question.tags] if hasattr(db_question, 'tags') and db_question.tags else [],
-            votes=cast(int, db_question.votes),
-            views=cast(int, db_question.views),
-            answer_count=len(db_question.answers) if hasattr(db_question, 'answers') and db_question.answers else 0,
-            asked=cast(Any, db_question.created_at)
+    try:
+        rows = await data_service.get_question_summaries(
+            skip=skip, limit=limit, sort=sort, tag=tag, user_id=user_id, cursor=cursor
         )
-        questions.append(question)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await data_service.get_total_questions(tag=tag, user_id=user_id, total_mode=total_mode)
+    
+    questions = [convert_row_to_summary(row) for row in rows]
     
     return {
         "items": questions,
         "total": total,
         "page": skip // limit + 1,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor(rows, get_sort(QUESTION_SORTS, sort, "newest")[0], limit)
     }
 
-@router.get("/search", response_model=List[QuestionSummary])
+@router.get("/search", response_model=List[SearchHit])
 async def search_questions(
+    response: Response,
     q: str = Query(..., description="Search query"),
     tags: Optional[List[str]] = Query(None, description="Filter by tags"), 
     skip: int = Query(0, ge=0),
     limit: int = Query(15, ge=1, le=100),
     sort: str = Query("relevance", description="Sort by: relevance, newest, votes, active"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Search questions"""
+    """Search questions; few matches are retried with misspelled words corrected"""
     
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    questions_data, total = data_service.search_questions(
+    questions_data, total, corrected = await data_service.search_questions_with_fallback(
         query=q,
         tags=tags or [],
         skip=skip,
         limit=limit,
         sort=sort
     )
+    # The body stays a plain list, so the query actually used travels in a header
+    if corrected is not None:
+        response.headers["X-Corrected-Query"] = corrected
     
+    # Excerpts centre on the words that matched, with [start, end] highlight offsets
+    terms = tokenize(corrected or q)
     questions = []
     for q_data in questions_data:
-        question = QuestionSummary(
+        content, content_highlights = snippet(q_data["content"], terms)
+        question = SearchHit(
             id=q_data["id"],
             title=q_data["title"],
-            content=q_data["content"][:200] + "..." if len(q_data["content"]) > 200 else q_data["content"],
+            content=content,
             author=q_data["author"],
             tags=q_data["tags"],
             votes=q_data["votes"],
             views=q_data["views"],
             answer_count=q_data.get("answer_count", 0),
-            asked=q_data["asked"]
+            asked=q_data["asked"],
+            title_highlights=highlight(q_data["title"], terms),
+            content_highlights=content_highlights
         )
         questions.append(question)
     
     return questions
 
+@router.get("/search/suggest", response_model=SearchSuggestions)
+async def get_search_suggestions(
+    q: str = Query(..., description="Search query"),
+    limit: int = Query(5, ge=1, le=20, description="Number of tag suggestions to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """'Did you mean' suggestions: the query with misspellings corrected, and similar tag names"""
+    data_service = AsyncDataService(db)
+    return await data_service.suggest_search(q, limit)
+
+@router.get("/search/facets", response_model=SearchFacets)
+async def get_search_facets(
+    q: str = Query(..., description="Search query"),
+    tags: Optional[List[str]] = Query(None, description="Filter by tags"),
+    top_tags: int = Query(10, ge=1, le=50, description="Number of tag counts to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Tag, answered and vote counts over all questions matching a search"""
+    data_service = AsyncDataService(db)
+    return await data_service.search_question_facets(query=q, tags=tags or [], top_tags=top_tags)
+
 @router.get("/{question_id}", response_model=Question)
 async def get_question(
     question_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    session_id: Optional[str] = Query(None, description="Analytics session id used to deduplicate views"),
+    session_cookie: Optional[str] = Cookie(None, alias="session_id"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific question with its answers"""
     
-    data_service = DataService(db)
-    
-    # Increment view count
-    data_service.increment_question_views(question_id)
+    data_service = AsyncDataService(db)
     
-    question_data = data_service.get_question_by_id(question_id)
+    question_data = await data_service.get_question_by_id(question_id)
     
     if not question_data:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    # Return the question object directly since get_question_by_id returns a Question object
-    return question_data
+    # Repeat views by the same viewer within the dedupe window are not counted;
+    # counted views are buffered and written in batches, so report them
+    # including the ones not flushed yet
+    viewer = viewer_key(session_id or session_cookie, request.client.host if request.client else None,
+                        request.headers.get("user-agent"))
+    if await viewer_tracker.observe(data_service, question_id, viewer):
+        view_buffer.record(question_id)
+    question = Question.model_validate(question_data)
+    question.views += view_buffer.pending(question_id)
+    unique_viewers = viewer_tracker.estimate(question_id)
+    if unique_viewers is not None:
+        question.unique_viewers = unique_viewers
+    return question
 
 @router.post("/", response_model=None)  # Remove response_model constraint for debugging
 async def create_question(
     question: QuestionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new question"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
     # Verify user exists
-    user_data = data_service.get_user_by_id(question.author_id)
+    user_data = await data_service.get_user_by_id(question.author_id)
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
     
-    db_question = data_service.create_question(question, question.author_id)
+    # Checked before creating, so the new question is not its own duplicate
+    possible_duplicates = await data_service.find_duplicate_questions(question.title, question.body)
+    db_question = await data_service.create_question(question, question.author_id)
     # Convert to a dict and manually select fields that match the Pydantic model
     return {
         "id": db_question.id,
@@ -176,47 +233,58 @@ async def create_question(
         "updated_at": db_question.updated_at,
         "votes": db_question.votes,
         "views": db_question.views,
-        "is_answered": db_question.is_answered
+        "is_answered": db_question.is_answered,
+        "possible_duplicates": possible_duplicates
     }
 
+@router.post("/check-duplicates", response_model=List[DuplicateCandidate])
+async def check_duplicates(
+    question: QuestionBase,
+    limit: int = Query(5, ge=1, le=20, description="Number of candidates to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Existing questions that look like near duplicates of a draft"""
+    data_service = AsyncDataService(db)
+    return await data_service.find_duplicate_questions(question.title, question.body, limit)
+
 @router.put("/{question_id}", response_model=Question)
 async def update_question(
     question_id: int,
     question_update: QuestionUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a question (mock implementation)"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    question_data = data_service.get_question_by_id(question_id)
+    question_data = await data_service.get_question_by_id(question_id)
     
     if not question_data:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    question = data_service.get_question(question_id)
+    question = await data_service.get_question(question_id)
     
     # Update question fields
     for field, value in question_update.dict(exclude_unset=True).items():
         setattr(question, field, value)
     
-    db.commit()
-    db.refresh(question)
+    await db.commit()
+    await db.refresh(question)
     return question
 
 @router.delete("/{question_id}", response_model=MessageResponse)
 async def delete_question(
     question_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a question (mock implementation)"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    question_data = data_service.get_question_by_id(question_id)
+    question_data = await data_service.get_question_by_id(question_id)
     
     if not question_data:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    data_service.delete_question(question_id)
+    await data_service.delete_question(question_id)
     
     return MessageResponse(
         message=f"Question {question_id} would be deleted",
@@ -229,12 +297,12 @@ async def vote_question(
     user_id: int,
     vote_type: str = Query(..., description="Vote type: up or down"),
     undo: bool = Query(False, description="Remove the vote instead of adding it"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Vote on a question"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    question_data = data_service.get_question_by_id(question_id)
+    question_data = await data_service.get_question_by_id(question_id)
     
     if not question_data:
         raise HTTPException(status_code=404, detail="Question not found")
@@ -243,80 +311,89 @@ async def vote_question(
         raise HTTPException(status_code=400, detail="Invalid vote type")
     
     if undo:
-        data_service.remove_question_vote(question_id, user_id, vote_type)
+        await data_service.remove_question_vote(question_id, user_id, vote_type)
         return {"message": "Vote removed successfully"}
     else:
-        data_service.vote_question(question_id, user_id, vote_type)
+        await data_service.vote_question(question_id, user_id, vote_type)
         return {"message": "Vote recorded successfully"}
 
 @router.get("/tagged/{tag}", response_model=List[QuestionSummary])
 async def get_questions_tagged(
     tag: str,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of questions to skip"),
     limit: int = Query(15, ge=1, le=100, description="Number of questions to return"),
     sort: str = Query("newest", description="Sort by: newest, votes, active"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; overrides skip"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get questions filtered by a specific tag"""
     
-    data_service = DataService(db)
-    
-    # Convert skip to page for data service calls
-    page = (skip // limit) + 1 if limit > 0 else 1
+    data_service = AsyncDataService(db)
     
-    paginated_result = data_service.get_questions_by_tag(tag, page=page, limit=limit)
-    questions_data = paginated_result.items
+    try:
+        rows = await data_service.get_question_summaries(skip=skip, limit=limit, sort=sort, tag=tag, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    questions = []
-    for q_data in questions_data:
-        # Cast q_data to DBQuestion to help type checker
-        db_question: DBQuestion = q_data
-        question = QuestionSummary(
-            id=cast(int, db_question.id),
-            title=cast(str, db_question.title),
-            content=cast(str, db_question.body)[:200] + "..." if len(cast(str, db_question.body)) > 200 else cast(str, db_question.body),
-            author=convert_user_to_userbase(cast(DBUser, db_question.author)),
-            tags=[t.name for t in db_question.tags] if hasattr(db_question, 'tags') and db_question.tags else [],
-            votes=cast(int, db_question.votes),
-            views=cast(int, db_question.views),
-            answer_count=len(db_question.answers) if hasattr(db_question, 'answers') and db_question.answers else 0,
-            asked=cast(Any, db_question.created_at)
+    # The body stays a plain list, so the next page cursor travels in a header
+    cursor_for_next = next_cursor(rows, get_sort(QUESTION_SORTS, sort, "newest")[0], limit)
+    if cursor_for_next:
+        response.headers["X-Next-Cursor"] = cursor_for_next
+    return [convert_row_to_summary(row) for row in rows]
+
+@router.get("/{question_id}/related", response_model=List[RelatedQuestion])
+async def get_related_questions(
+    question_id: int,
+    limit: int = Query(10, ge=1, le=50, description="Number of related questions to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Questions similar to a question by title, body and tags"""
+    data_service = AsyncDataService(db)
+
+    related = await data_service.get_related_questions(question_id, limit)
+    if related is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    return [
+        RelatedQuestion(
+            **{key: value for key, value in q_data.items() if key != "content"},
+            content=q_data["content"][:200] + "..." if len(q_data["content"]) > 200 else q_data["content"],
         )
-        questions.append(question)
-    
-    return questions
+        for q_data in related
+    ]
 
 @router.get("/{question_id}/user_vote")
 async def get_user_vote_on_question(
     question_id: int,
     user_id: int = Query(..., description="User ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's vote on a question"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    question_data = data_service.get_question_by_id(question_id)
+    question_data = await data_service.get_question_by_id(question_id)
     if not question_data:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    vote = data_service.get_user_vote_on_question(question_id, user_id)
+    vote = await data_service.get_user_vote_on_question(question_id, user_id)
     return {"vote": vote}
 
 @router.get("/{question_id}/user_votes")
 async def get_user_votes_on_question(
     question_id: int,
     user_id: int = Query(..., description="User ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's votes on question and all its answers"""
-    data_service = DataService(db)
+    data_service = AsyncDataService(db)
     
-    question_data = data_service.get_question_by_id(question_id)
+    question_data = await data_service.get_question_by_id(question_id)
     if not question_data:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    question_vote = data_service.get_user_vote_on_question(question_id, user_id)
-    answer_votes = data_service.get_user_votes_on_question_answers(question_id, user_id)
+    question_vote = await data_service.get_user_vote_on_question(question_id, user_id)
+    answer_votes = await data_service.get_user_votes_on_question_answers(question_id, user_id)
     
     return {
         "question_vote": question_vote,
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import Optional, List
-from ..db.db import get_db
-from ..data_service import DataService
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ..db.db import get_async_db
+from ..async_data_service import AsyncDataService
 from ..models import Question, Answer, User, Tag
 
 router = APIRouter(
@@ -10,66 +10,56 @@ router = APIRouter(
     tags=["search"]
 )
 
+async def search_index(response: Response, db: AsyncSession, kind: str, query: str, page: int, limit: int, sort: str):
+    data_service = AsyncDataService(db)
+    try:
+        results = await data_service.search_entities(kind, query, page=page, limit=limit, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The body stays a plain list, so the match count travels in a header
+    response.headers["X-Total-Count"] = str(results.total)
+    return results.items
+
 @router.get("/questions", response_model=List[Question])
 async def search_questions(
+    response: Response,
     query: str,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    sort: Optional[str] = Query("relevance", description="Sort by: relevance, newest, votes"),
-    db: Session = Depends(get_db)
+    sort: str = Query("relevance", pattern="^(relevance|newest|votes)$", description="Sort by: relevance, newest, votes"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.search_questions(
-        query=query,
-        page=page,
-        limit=limit,
-        sort=sort or "relevance"
-    )
+    return await search_index(response, db, "questions", query, page, limit, sort)
 
 @router.get("/answers", response_model=List[Answer])
 async def search_answers(
+    response: Response,
     query: str,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    sort: Optional[str] = Query("relevance", description="Sort by: relevance, newest, votes"),
-    db: Session = Depends(get_db)
+    sort: str = Query("relevance", pattern="^(relevance|newest|votes)$", description="Sort by: relevance, newest, votes"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.search_answers(
-        query=query,
-        page=page,
-        limit=limit,
-        sort=sort or "relevance"
-    )
+    return await search_index(response, db, "answers", query, page, limit, sort)
 
 @router.get("/users", response_model=List[User])
 async def search_users(
+    response: Response,
     query: str,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    sort: Optional[str] = Query("relevance", description="Sort by: relevance, reputation, newest"),
-    db: Session = Depends(get_db)
+    sort: str = Query("relevance", pattern="^(relevance|reputation|newest)$", description="Sort by: relevance, reputation, newest"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.search_users(
-        query=query,
-        page=page,
-        limit=limit,
-        sort=sort or "relevance"
-    )
+    return await search_index(response, db, "users", query, page, limit, sort)
 
 @router.get("/tags", response_model=List[Tag])
 async def search_tags(
+    response: Response,
     query: str,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    sort: Optional[str] = Query("relevance", description="Sort by: relevance, popular, newest"),
-    db: Session = Depends(get_db)
+    sort: str = Query("relevance", pattern="^(relevance|popular|newest)$", description="Sort by: relevance, popular, newest"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.search_tags(
-        query=query,
-        page=page,
-        limit=limit,
-        sort=sort or "relevance"
-    )
+    return await search_index(response, db, "tags", query, page, limit, sort)
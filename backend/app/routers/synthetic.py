@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request, Response, Cookie, Depends
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, Cookie, Depends
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict, Any
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 import json
-from ..db.db import get_db, populate_database
-from ..db.models import AnalyticsLog
-from sqlalchemy.orm import Session
+from ..db.db import get_async_db, populate_database
+from ..db.fts import clear_fts_cache
+from ..analytics_queue import analytics_queue
+from ..analytics_export import export_statement, stream_ndjson
+from ..async_data_service import AsyncDataService
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.middleware.sessions import SessionMiddleware
 
 router = APIRouter(prefix="/_synthetic", tags=["synthetic"])
@@ -13,6 +17,23 @@ router = APIRouter(prefix="/_synthetic", tags=["synthetic"])
 # In-memory storage for sessions
 sessions: Dict[str, Dict[str, Any]] = {}
 
+# Limits for batched event logging
+MAX_EVENT_BATCH = 500
+MAX_EVENT_BYTES = 16384
+MAX_ACTION_TYPE_LENGTH = 64
+
+
+def validate_event(event: Any) -> Optional[str]:
+    """Why an event cannot be logged, or None if it is valid"""
+    if not isinstance(event, dict):
+        return "Event must be an object"
+    action_type = event.get("actionType", "CUSTOM")
+    if not isinstance(action_type, str) or not action_type or len(action_type) > MAX_ACTION_TYPE_LENGTH:
+        return f"actionType must be a non-empty string of at most {MAX_ACTION_TYPE_LENGTH} characters"
+    if not isinstance(event.get("payload", {}), dict):
+        return "payload must be an object"
+    return None
+
 @router.post("/new_session")
 async def new_session(seed: Optional[int] = None, response: Response = None):
     """Create a new session with optional seed for reproducible data"""
@@ -37,55 +58,107 @@ async def new_session(seed: Optional[int] = None, response: Response = None):
 async def log_event(
     request: Request,
     event: Dict[str, Any],
-    session_id: Optional[str] = None,  # Accept as query parameter
-    db: Session = Depends(get_db)
+    session_id: Optional[str] = None  # Accept as query parameter
 ):
-    """Log a custom event"""
-    try:
-        # Get session_id from query parameter (now auth token for logged users)
-        if not session_id:
-            session_id = request.query_params.get("session_id")
-        
-        # If still no session_id, create a new anonymous one
-        if not session_id:
-            session_id = f"anonymous_{uuid.uuid4()}"
-        
-        # Parse the event data properly
-        # The frontend sends: {"actionType": "scroll", "payload": {...}}
+    """Log a custom event; it is queued and written by the analytics flusher"""
+    # Get session_id from query parameter (now auth token for logged users)
+    if not session_id:
+        session_id = request.query_params.get("session_id")
+
+    # If still no session_id, create a new anonymous one
+    if not session_id:
+        session_id = f"anonymous_{uuid.uuid4()}"
+
+    # Parse the event data properly
+    # The frontend sends: {"actionType": "scroll", "payload": {...}}
+    error = validate_event(event)
+    event_data = json.dumps(event)
+    if error is None and len(event_data) > MAX_EVENT_BYTES:
+        error = f"Event is larger than {MAX_EVENT_BYTES} bytes"
+    if error is not None:
+        raise HTTPException(status_code=422, detail=error)
+    action_type = event.get("actionType", "CUSTOM")
+
+    # Determine if this is an authenticated user (session_id is a JWT token)
+    is_authenticated = not session_id.startswith("anonymous_")
+
+    queued = await analytics_queue.put([{
+        "session_id": session_id,
+        "event_type": action_type,  # Use actionType from the parsed event
+        "event_data": event_data,
+        "timestamp": datetime.utcnow()
+    }])
+
+    return {
+        "status": "success" if queued else "dropped",
+        "session_id": session_id,
+        "logged_action": action_type,
+        "is_authenticated": is_authenticated
+    }
+
+@router.post("/log_events")
+async def log_events(
+    request: Request,
+    events: List[Any] = Body(...),
+    session_id: Optional[str] = None  # Accept as query parameter
+):
+    """Queue a batch of events for the analytics flusher, reporting which were accepted"""
+    if len(events) > MAX_EVENT_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EVENT_BATCH} events per batch")
+
+    if not session_id:
+        session_id = request.query_params.get("session_id")
+    if not session_id:
+        session_id = f"anonymous_{uuid.uuid4()}"
+    is_authenticated = not session_id.startswith("anonymous_")
+
+    # One timestamp per batch; ids keep the order of events within it
+    now = datetime.utcnow()
+    rows, results = [], []
+    for index, event in enumerate(events):
+        error = validate_event(event)
+        if error is None:
+            event_data = json.dumps(event)
+            if len(event_data) > MAX_EVENT_BYTES:
+                error = f"Event is larger than {MAX_EVENT_BYTES} bytes"
+        if error is not None:
+            results.append({"index": index, "accepted": False, "error": error})
+            continue
         action_type = event.get("actionType", "CUSTOM")
-        payload_data = event.get("payload", {})
-        
-        # Determine if this is an authenticated user (session_id is a JWT token)
-        is_authenticated = not session_id.startswith("anonymous_")
-        
-        # Create analytics log
-        log = AnalyticsLog(
-            session_id=session_id,
-            event_type=action_type,  # Use actionType from the parsed event
-            event_data=json.dumps(event),
-            timestamp=datetime.utcnow()
-        )
-        
-        # Save to database
-        db.add(log)
-        db.commit()
-        
-        return {
-            "status": "success", 
-            "session_id": session_id,
-            "logged_action": action_type,
-            "is_authenticated": is_authenticated
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        rows.append({"session_id": session_id, "event_type": action_type, "event_data": event_data, "timestamp": now})
+        results.append({"index": index, "accepted": True, "logged_action": action_type})
+
+    # The queue takes a prefix of the rows when it is full
+    queued = await analytics_queue.put(rows) if rows else 0
+    valid = [result for result in results if result["accepted"]]
+    for result in valid[queued:]:
+        result.update(accepted=False, error="Analytics queue is full")
+
+    return {
+        "status": "success",
+        "session_id": session_id,
+        "is_authenticated": is_authenticated,
+        "accepted": queued,
+        "rejected": len(events) - queued,
+        "results": results
+    }
 
 @router.get("/logs")
 async def get_logs(
     request: Request,
     session_id: Optional[str] = None,  # Accept as query parameter
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[str] = Query(None, description="next_cursor of a page; returns older logs"),
+    after: Optional[str] = Query(None, description="prev_cursor of a page; returns newer logs"),
+    event_type: Optional[str] = None,
+    flush: bool = Query(False, description="write queued events first instead of waiting for the flusher"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get logs for a session"""
+    """Get a page of logs for a session, newest first.
+
+    Events are written by the analytics flusher, so logs can lag behind
+    log_event by up to one ANALYTICS_FLUSH_INTERVAL unless flush is set.
+    """
     # Get session_id from query parameter (now auth token for logged users)
     if not session_id:
         session_id = request.query_params.get("session_id")
@@ -93,46 +166,94 @@ async def get_logs(
     if not session_id:
         raise HTTPException(status_code=400, detail="No session ID provided")
     
-    logs = db.query(AnalyticsLog).filter(
-        AnalyticsLog.session_id == session_id
-    ).order_by(AnalyticsLog.timestamp.desc()).all()
+    if flush and len(analytics_queue):
+        await analytics_queue.flush()
     
-    return {
-        "logs": [
-            {
-                "id": log.id,
-                "event_type": log.event_type,  # Use the correct field name
-                "session_id": log.session_id,
-                "event_data": log.event_data,
-                "timestamp": log.timestamp.isoformat() if log.timestamp else None
-            }
-            for log in logs
-        ]
-    }
+    try:
+        return await AsyncDataService(db).get_session_logs(session_id, limit, before, after, event_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/logs/export")
+async def export_logs(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    compress: bool = False,
+    flush: bool = Query(False, description="write queued events first instead of waiting for the flusher"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream logs from start (inclusive) to end (exclusive) as NDJSON, oldest first.
+
+    Like GET /logs, the export can lag log_event by up to one
+    ANALYTICS_FLUSH_INTERVAL unless flush is set.
+    """
+    try:
+        statement = export_statement(start, end, session_id, event_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if flush and len(analytics_queue):
+        await analytics_queue.flush()
+
+    # A long export reads from the reader pool rather than holding a writer connection
+    db.info["read_only"] = True
+
+    filename = "analytics_logs.ndjson.gz" if compress else "analytics_logs.ndjson"
+    return StreamingResponse(
+        stream_ndjson(db, statement, compress),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/analytics/hourly")
+async def get_hourly_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    page_url: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Event counts per hour, event type and page, from the analytics rollups only"""
+    return await AsyncDataService(db).get_hourly_analytics(start, end, event_type, page_url, limit)
+
+@router.get("/analytics/sessions")
+async def get_session_analytics(
+    day: Optional[date] = None,
+    session_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Event counts per day and session, busiest first, from the analytics rollups only"""
+    return await AsyncDataService(db).get_session_analytics(day.isoformat() if day else None, session_id, limit)
 
 @router.post("/reset")
 async def reset_environment(
     seed: Optional[int] = None,
     session_id: str = Cookie(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Reset the environment and optionally reseed"""
+    """Reset the environment: record the session's seed and populate an empty database"""
     if session_id:
         sessions[session_id] = {
             "created_at": datetime.utcnow(),
             "seed": seed
         }
     
-    # Reset database with new seed
-    populate_database(db, seed)
+    # The sample data is fixed; the seed is only recorded for the session
+    await db.run_sync(populate_database)
+    # The database may have been recreated since questions_fts was last looked up
+    clear_fts_cache()
     
     return {"status": "ok", "seed": seed}
 
 @router.get("/populate")
-async def populate_db(db: Session = Depends(get_db)):
+async def populate_db(db: AsyncSession = Depends(get_async_db)):
     """Populate database with sample data"""
     try:
-        populate_database(db)
+        await db.run_sync(populate_database)
         return {"status": "success", "message": "Database populated with sample data"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
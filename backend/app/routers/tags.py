@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from ..db.db import get_db
-from ..data_service import DataService
-from ..models import Tag, PaginatedResponse, TagCreate, TagUpdate
+from ..db.db import get_async_db
+from ..async_data_service import AsyncDataService
+from ..models import Tag, TagCompletion, PaginatedResponse, TagCreate, TagUpdate
 
 router = APIRouter(prefix="/api/tags", tags=["tags"])
 
@@ -13,21 +13,36 @@ async def get_tags(
     limit: int = Query(20, ge=1, le=100),
     search: Optional[str] = Query(None, description="Search tags by name or description"),
     sort: Optional[str] = Query("popular", description="Sort by: popular, name, newest"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; overrides page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$", description="exact, estimate (cached total, counter or upper bound; no scan) or none"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a paginated list of tags with optional search and sorting"""
-    data_service = DataService(db)
-    tags = data_service.get_tags(page=page, limit=limit, search=search, sort=sort or "popular")
+    data_service = AsyncDataService(db)
+    try:
+        tags = await data_service.get_tags(page=page, limit=limit, search=search, sort=sort or "popular", cursor=cursor, total_mode=total_mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return tags
 
+@router.get("/autocomplete", response_model=List[TagCompletion])
+async def autocomplete_tags(
+    prefix: str = Query(..., max_length=50, description="Start of the tag name, case-insensitive"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Most used tags whose name starts with the prefix, for the ask-question form"""
+    data_service = AsyncDataService(db)
+    return await data_service.autocomplete_tags(prefix, limit=limit)
+
 @router.get("/{tag_name}", response_model=Tag)
 async def get_tag(
     tag_name: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific tag by name"""
-    data_service = DataService(db)
-    tag = data_service.get_tag_by_name(tag_name)
+    data_service = AsyncDataService(db)
+    tag = await data_service.get_tag_by_name(tag_name)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     return tag
@@ -38,69 +53,63 @@ async def get_tag_questions(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     sort: Optional[str] = Query("newest", description="Sort by: newest, votes, activity"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; overrides page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$", description="exact, estimate (cached total, counter or upper bound; no scan) or none"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get questions tagged with a specific tag"""
     # Check if tag exists
-    data_service = DataService(db)
-    tag = data_service.get_tag_by_name(tag_name)
+    data_service = AsyncDataService(db)
+    tag = await data_service.get_tag_by_name(tag_name)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     
-    questions = data_service.get_questions_by_tag(tag_name, page=page, limit=limit, sort=sort or "newest")
+    try:
+        questions = await data_service.get_questions_by_tag(tag_name, page=page, limit=limit, sort=sort or "newest", cursor=cursor, total_mode=total_mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return questions
 
 @router.get("/stats/popular")
-async def get_popular_tags(limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+async def get_popular_tags(limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_async_db)):
     """Get most popular tags"""
-    data_service = DataService(db)
-    tags = data_service.get_popular_tags(limit=limit)
+    data_service = AsyncDataService(db)
+    tags = await data_service.get_popular_tags(limit=limit)
     return {"tags": tags}
 
 @router.get("/stats/trending")
-async def get_trending_tags(limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+async def get_trending_tags(limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_async_db)):
     """Get trending tags (most activity in recent period)"""
-    data_service = DataService(db)
-    tags = data_service.get_trending_tags(limit=limit)
+    data_service = AsyncDataService(db)
+    tags = await data_service.get_trending_tags(limit=limit)
     return {"tags": tags}
 
 @router.post("/", response_model=Tag)
 async def create_tag(
     tag: TagCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    return data_service.create_tag(tag)
+    data_service = AsyncDataService(db)
+    return await data_service.create_tag(tag)
 
 @router.put("/{tag_id}", response_model=Tag)
 async def update_tag(
     tag_id: int,
     tag_update: TagUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    tag = data_service.get_tag(tag_id)
+    data_service = AsyncDataService(db)
+    tag = await data_service.update_tag(tag_id, tag_update)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    
-    # Update tag fields
-    for field, value in tag_update.dict(exclude_unset=True).items():
-        setattr(tag, field, value)
-    
-    db.commit()
-    db.refresh(tag)
     return tag
 
 @router.delete("/{tag_id}")
 async def delete_tag(
     tag_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    data_service = DataService(db)
-    tag = data_service.get_tag(tag_id)
-    if not tag:
+    data_service = AsyncDataService(db)
+    if not await data_service.delete_tag(tag_id):
         raise HTTPException(status_code=404, detail="Tag not found")
-    
-    db.delete(tag)
-    db.commit()
     return {"message": "Tag deleted successfully"}
@@ -0,0 +1,11 @@
+"""
+In-process search over questions, answers, users and tags.
+"""
+from .index import InvertedIndex, tokenize
+from .engine import ENTITIES, SEARCH_SORTS, SearchEngine, database_key, search_engine, get_search_stats
+from .autocomplete import TagCompletions, tag_autocomplete, get_tag_autocomplete_stats
+from .result_cache import SearchResultCache, normalize_tags, search_cache, get_search_cache_stats
+from .related import RelatedIndex, question_vector, related_questions, rebuild_related, get_related_stats
+from .duplicates import DuplicateIndex, signature, duplicate_detector, get_duplicate_stats
+from .trigrams import TrigramIndex, trigrams, trigram_vocabulary, correct_query, get_trigram_stats
+from .snippets import highlight, snippet
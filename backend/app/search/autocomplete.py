@@ -0,0 +1,192 @@
+"""
+Prefix autocomplete for tag names.
+
+Tag names are held in a sorted array of (lowercased name, id) keys, so the
+tags starting with a prefix are one contiguous slice found by bisection;
+each carries its usage count as a precomputed popularity score and the top k
+of a slice are cached per prefix until the next change. The array is kept
+current from ORM flushes: tags created, renamed or deleted through the
+Session are applied once the transaction commits. Usage counts move with
+every tagged question, so they are reloaded in full every
+TAG_AUTOCOMPLETE_TTL seconds rather than tracked one by one.
+
+The API builds and reloads the array of its database on a background thread
+(see background.py): an expired array is served until its reload finishes,
+and nothing is suggested before the first build. Other databases are built
+and reloaded by the lookup that needs it.
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+from ..db.models import Tag
+from .background import BackgroundBuilds
+from .hooks import database_key, register
+
+TAG_AUTOCOMPLETE_TTL = float(os.getenv("TAG_AUTOCOMPLETE_TTL", "300"))
+# Distinct prefixes whose completions are cached per database
+TAG_AUTOCOMPLETE_CACHE_SIZE = 4096
+
+
+class TagCompletions:
+    """Sorted tag names of one database with their popularity"""
+
+    def __init__(self, tags: List[Tuple[int, str, int]] = ()):
+        self._keys: List[Tuple[str, int]] = sorted((name.lower(), tag_id) for tag_id, name, _ in tags)
+        # id -> (name, count)
+        self._tags: Dict[int, Tuple[str, int]] = {tag_id: (name, count or 0) for tag_id, name, count in tags}
+        self._cache: Dict[Tuple[str, int], List[Tuple[int, str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def upsert(self, tag_id: int, name: str, count: Optional[int] = None):
+        """Add a tag or apply a rename; count None keeps the known count"""
+        with self._lock:
+            old = self._tags.get(tag_id)
+            if old is not None:
+                self._remove_key(old[0], tag_id)
+            if count is None:
+                count = old[1] if old is not None else 0
+            self._tags[tag_id] = (name, count)
+            bisect.insort(self._keys, (name.lower(), tag_id))
+            self._cache.clear()
+
+    def remove(self, tag_id: int):
+        with self._lock:
+            old = self._tags.pop(tag_id, None)
+            if old is not None:
+                self._remove_key(old[0], tag_id)
+                self._cache.clear()
+
+    def _remove_key(self, name: str, tag_id: int):
+        key = (name.lower(), tag_id)
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[int, str, int]]:
+        """(id, name, count) of the most used tags starting with prefix"""
+        prefix = prefix.strip().lower()
+        with self._lock:
+            cached = self._cache.get((prefix, limit))
+            if cached is not None:
+                return cached
+            start = bisect.bisect_left(self._keys, (prefix,))
+            end = bisect.bisect_left(self._keys, (prefix + "\U0010ffff",), start)
+            # Most used first, older (lower id) tags first among equals
+            candidates = ((self._tags[tag_id][1], -tag_id) for _, tag_id in self._keys[start:end])
+            top = [(-negative_id, *self._tags[-negative_id]) for _, negative_id in heapq.nlargest(limit, candidates)]
+            if len(self._cache) >= TAG_AUTOCOMPLETE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[(prefix, limit)] = top
+            return top
+
+
+class TagAutocomplete:
+    def __init__(self, ttl: float = TAG_AUTOCOMPLETE_TTL):
+        self.ttl = ttl
+        # database key -> (built at, completions)
+        self._databases: Dict[str, Tuple[float, TagCompletions]] = {}
+        self._lock = threading.Lock()
+        # Bumped by every applied commit so a build that raced one is redone
+        self._generation = 0
+        self.background = BackgroundBuilds(
+            "tag_autocomplete", lambda session: self._build(session, database_key(session.get_bind().url)))
+        self.builds = 0
+        self.lookups = 0
+        self.unready = 0
+
+    def warm(self, session_factory):
+        """Build and reload the array of the factory's database in the background"""
+        self.background.start(self.background.register(session_factory))
+
+    def complete(self, session: Session, prefix: str, limit: int = 10) -> List[Tuple[int, str, int]]:
+        """Top completions for a prefix, building or refreshing the array as needed"""
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            entry = self._databases.get(key)
+        self.lookups += 1
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            if not self.background.start(key):
+                entry = self._build(session, key)
+            elif entry is None:
+                self.unready += 1
+                return []
+        return entry[1].complete(prefix, limit)
+
+    def _build(self, session: Session, key: str) -> Tuple[float, TagCompletions]:
+        with self._lock:
+            generation = self._generation
+        tags = session.execute(select(Tag.id, Tag.name, Tag.count).where(Tag.name.isnot(None))).all()
+        entry = (time.monotonic(), TagCompletions(tags))
+        with self._lock:
+            if generation != self._generation:
+                # Serve it once, but expire it so the next lookup sees the change
+                entry = (float("-inf"), entry[1])
+            self._databases[key] = entry
+            self.builds += 1
+        return entry
+
+    def apply(self, key: str, changes: List[Tuple]):
+        """Apply the tag changes of one committed transaction"""
+        with self._lock:
+            self._generation += 1
+            entry = self._databases.get(key)
+            if entry is None:
+                return
+            for action, tag_id, *values in changes:
+                if action == "rebuild":
+                    del self._databases[key]
+                    return
+                if action == "upsert":
+                    entry[1].upsert(tag_id, *values)
+                else:
+                    entry[1].remove(tag_id)
+
+    def clear(self):
+        with self._lock:
+            self._databases.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = {key: len(entry[1]) for key, entry in self._databases.items()}
+        return {"ttl_seconds": self.ttl, "tags": sizes, "builds": self.builds, "lookups": self.lookups,
+                "unready": self.unready, "background_failures": self.background.failures}
+
+
+tag_autocomplete = TagAutocomplete()
+
+
+def _collect_tag_changes(session: Session, changes: List[Tuple]):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Tag) and obj.name is not None:
+            if obj in session.new:
+                changes.append(("upsert", obj.id, obj.name, obj.count))
+            elif inspect(obj).attrs.name.history.has_changes():
+                changes.append(("upsert", obj.id, obj.name, None))
+    for obj in session.deleted:
+        if isinstance(obj, Tag):
+            changes.append(("remove", obj.id))
+
+
+def _collect_bulk_tag_changes(orm_execute_state, changes: List[Tuple]):
+    # Bulk count updates are left to the TTL; rows inserted or deleted
+    # without the ORM cannot be tracked, so the array is rebuilt
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is Tag.__table__:
+            changes.append(("rebuild", None))
+
+
+register("tag_autocomplete", tag_autocomplete.apply, _collect_tag_changes, _collect_bulk_tag_changes)
+
+
+def get_tag_autocomplete_stats() -> Dict[str, Any]:
+    """Snapshot array sizes and counters for the metrics endpoint"""
+    return tag_autocomplete.stats()
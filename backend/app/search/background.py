@@ -0,0 +1,76 @@
+"""
+Background builds of per-database indexes.
+
+An index whose full build reads every question should not be built by the
+first request that needs it. At startup the API registers a session factory
+for its database and starts the build on a thread; until it finishes,
+lookups on that database get no results instead of waiting. If the index is
+dropped later (a bulk insert or delete it cannot follow), the next lookup
+starts another background build.
+
+Databases without a registered factory, such as scratch databases in
+scripts and tests, are still built on first use by the caller.
+"""
+import threading
+from typing import Callable, Dict
+from sqlalchemy.orm import Session
+from .hooks import database_key
+
+
+class BackgroundBuilds:
+    def __init__(self, name: str, build: Callable[[Session], object]):
+        self.name = name
+        self._build = build
+        # database key -> session factory for that database
+        self._factories: Dict[str, Callable[[], Session]] = {}
+        # database key -> running build
+        self._threads: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self.failures = 0
+
+    def register(self, session_factory: Callable[[], Session]) -> str:
+        """Build the index of the factory's database in the background from now on; returns its key"""
+        session = session_factory()
+        try:
+            key = database_key(session.get_bind().url)
+        finally:
+            session.close()
+        with self._lock:
+            self._factories[key] = session_factory
+        return key
+
+    def start(self, key: str) -> bool:
+        """Start a build unless one is running; False if the database has no registered factory"""
+        with self._lock:
+            factory = self._factories.get(key)
+            if factory is None:
+                return False
+            thread = self._threads.get(key)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._run, args=(key, factory), name=f"{self.name}-build", daemon=True)
+                self._threads[key] = thread
+                thread.start()
+        return True
+
+    def running(self, key: str) -> bool:
+        with self._lock:
+            thread = self._threads.get(key)
+        return thread is not None and thread.is_alive()
+
+    def wait(self, key: str, timeout: float = None) -> bool:
+        """Wait for a running build; True once none is running"""
+        with self._lock:
+            thread = self._threads.get(key)
+        if thread is not None:
+            thread.join(timeout)
+        return not self.running(key)
+
+    def _run(self, key: str, factory: Callable[[], Session]):
+        session = factory()
+        try:
+            self._build(session)
+        except Exception as e:
+            self.failures += 1
+            print(f"Background {self.name} build failed: {e}")
+        finally:
+            session.close()
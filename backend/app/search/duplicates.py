@@ -0,0 +1,280 @@
+"""
+Near-duplicate questions by MinHash signatures and LSH banding.
+
+A question is reduced to the set of its word shingles (DUPLICATE_SHINGLE
+consecutive words of title and body) and summarised by a MinHash signature
+of SIGNATURE_SIZE values whose agreement estimates the Jaccard similarity of
+two shingle sets. Signatures use one-permutation hashing: each shingle is
+hashed once and the hash picks both a bin and the value competing for that
+bin's minimum, with empty bins filled from the next non-empty one, so a
+signature costs one hash per shingle rather than one per shingle and bin.
+
+Signatures are split into LSH_BANDS bands; questions sharing any band are
+candidates, which finds pairs above roughly (1 / bands) ** (1 / rows per
+band) similarity with high probability. A lookup reads at most
+DUPLICATE_MAX_CANDIDATES candidates, which bounds its cost independently of
+how many questions are indexed, and reports those whose estimated
+similarity reaches DUPLICATE_THRESHOLD.
+
+The API builds the signatures of its database at startup on a background
+thread (see background.py); lookups find no duplicates until the build
+finishes. Other databases are built on first lookup. Signatures are kept
+current from ORM flushes like the other in-process indexes.
+"""
+import os
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+from ..db.models import Question
+from .background import BackgroundBuilds
+from .hooks import BuildLog, database_key, register
+from .index import tokenize
+
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.5"))
+DUPLICATE_MAX_CANDIDATES = int(os.getenv("DUPLICATE_MAX_CANDIDATES", "500"))
+DUPLICATE_SHINGLE = 3
+
+SIGNATURE_SIZE = 64
+LSH_BANDS = 16
+BAND_ROWS = SIGNATURE_SIZE // LSH_BANDS
+# Signature values are kept to 16 bits; chance agreements (1 in 65536) barely
+# move the estimate and halve the memory of 32-bit values
+VALUE_BITS = 16
+VALUE_MASK = (1 << VALUE_BITS) - 1
+FIBONACCI = 0x9E3779B97F4A7C15
+MASK_64 = (1 << 64) - 1
+BIN_SHIFT = 64 - (SIGNATURE_SIZE - 1).bit_length()
+VALUE_SHIFT = BIN_SHIFT - VALUE_BITS
+
+BUILD_BATCH = 5000
+
+
+def shingles(title: Optional[str], body: Optional[str]) -> set:
+    """Word shingles of a question; texts shorter than one shingle give their words"""
+    words = tokenize(title) + tokenize(body)
+    if len(words) < DUPLICATE_SHINGLE:
+        return set(words)
+    return {" ".join(words[i:i + DUPLICATE_SHINGLE]) for i in range(len(words) - DUPLICATE_SHINGLE + 1)}
+
+
+def signature(title: Optional[str], body: Optional[str]) -> Optional[array]:
+    """One-permutation MinHash signature, or None for a question without words"""
+    mins = [None] * SIGNATURE_SIZE
+    for shingle in shingles(title, body):
+        # CRC32 spread over 64 bits by a Fibonacci multiplier: the top bits
+        # choose the bin and the next VALUE_BITS are its candidate minimum
+        value = (zlib.crc32(shingle.encode()) * FIBONACCI) & MASK_64
+        position, rest = value >> BIN_SHIFT, (value >> VALUE_SHIFT) & VALUE_MASK
+        if mins[position] is None or rest < mins[position]:
+            mins[position] = rest
+    if all(value is None for value in mins):
+        return None
+    # Densify: an empty bin borrows the value of the next filled bin, shifted
+    # by the distance, so two sets agree on it exactly when they agree there
+    result = array("H")
+    for position in range(SIGNATURE_SIZE):
+        offset = 0
+        while mins[(position + offset) % SIGNATURE_SIZE] is None:
+            offset += 1
+        value = mins[(position + offset) % SIGNATURE_SIZE]
+        result.append((value + offset * 0x9E37) & 0xFFFF)
+    return result
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_SIZE
+
+
+def band_keys(sig: array) -> List[int]:
+    """One key per band: the band's values packed into an integer"""
+    raw = sig.tobytes()
+    width = BAND_ROWS * 2
+    return [int.from_bytes(raw[band * width:(band + 1) * width], "little") for band in range(LSH_BANDS)]
+
+
+class DuplicateIndex:
+    def __init__(self):
+        # question id -> signature
+        self._signatures: Dict[int, array] = {}
+        # one table per band: band key -> question ids
+        self._bands: List[Dict[int, List[int]]] = [{} for _ in range(LSH_BANDS)]
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, question_id: int, sig: Optional[array]):
+        """Index a question's signature, replacing any previous one"""
+        with self._lock:
+            self._remove(question_id)
+            if sig is None:
+                return
+            self._signatures[question_id] = sig
+            for table, key in zip(self._bands, band_keys(sig)):
+                table.setdefault(key, []).append(question_id)
+
+    def remove(self, question_id: int):
+        with self._lock:
+            self._remove(question_id)
+
+    def _remove(self, question_id: int):
+        sig = self._signatures.pop(question_id, None)
+        if sig is None:
+            return
+        for table, key in zip(self._bands, band_keys(sig)):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.remove(question_id)
+                if not bucket:
+                    del table[key]
+
+    def candidates(self, sig: array, limit: int = 5, threshold: float = DUPLICATE_THRESHOLD,
+                   exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(id, estimated similarity) of indexed questions at or above threshold, best first"""
+        with self._lock:
+            seen = set()
+            budget = DUPLICATE_MAX_CANDIDATES
+            for table, key in zip(self._bands, band_keys(sig)):
+                # Newest questions of a bucket first
+                for question_id in reversed(table.get(key, ())):
+                    if budget <= 0:
+                        break
+                    if question_id != exclude and question_id not in seen:
+                        seen.add(question_id)
+                        budget -= 1
+            scored = [(similarity(sig, self._signatures[question_id]), question_id) for question_id in seen]
+        matches = sorted(((score, question_id) for score, question_id in scored if score >= threshold),
+                         key=lambda item: (-item[0], item[1]))
+        return [(question_id, score) for score, question_id in matches[:limit]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "questions": len(self._signatures),
+                "buckets": sum(len(table) for table in self._bands),
+            }
+
+
+class DuplicateDetector:
+    def __init__(self):
+        # database key -> index
+        self._indexes: Dict[str, DuplicateIndex] = {}
+        # Changes committed while an index was building, by database key
+        self._building = BuildLog()
+        self._lock = threading.Lock()
+        self.background = BackgroundBuilds(
+            "duplicate_index", lambda session: self._build(session, database_key(session.get_bind().url)))
+        self.builds = 0
+        self.lookups = 0
+        self.unready = 0
+
+    def warm(self, session_factory):
+        """Build the signatures of the factory's database in the background, now and whenever they are dropped"""
+        self.background.start(self.background.register(session_factory))
+
+    def find(self, session: Session, title: str, body: str, limit: int = 5,
+             exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Indexed questions that are near duplicates of a title and body"""
+        sig = signature(title, body)
+        if sig is None:
+            return []
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            index = self._indexes.get(key)
+        self.lookups += 1
+        if index is None:
+            if self.background.start(key):
+                # Building in the background; no duplicates until it finishes
+                self.unready += 1
+                return []
+            index = self._build(session, key)
+        return index.candidates(sig, limit, exclude=exclude)
+
+    def _build(self, session: Session, key: str) -> DuplicateIndex:
+        with self._lock:
+            self._building.start(key)
+        index = DuplicateIndex()
+        try:
+            rows = session.execute(
+                select(Question.id, Question.title, Question.body).execution_options(yield_per=BUILD_BATCH)
+            )
+            for question_id, title, body in rows:
+                index.add(question_id, signature(title, body))
+        except BaseException:
+            with self._lock:
+                self._building.finish(key)
+            raise
+        with self._lock:
+            for change in self._building.finish(key):
+                self._apply_one(index, change)
+            existing = self._indexes.get(key)
+            if existing is not None:
+                return existing
+            self._indexes[key] = index
+            self.builds += 1
+        return index
+
+    @staticmethod
+    def _apply_one(index: DuplicateIndex, change: Tuple):
+        action, question_id, *sig = change
+        if action == "add":
+            index.add(question_id, *sig)
+        elif action == "remove":
+            index.remove(question_id)
+
+    def apply(self, key: str, changes: List[Tuple]):
+        """Apply the question changes of one committed transaction"""
+        with self._lock:
+            self._building.record(key, changes)
+            index = self._indexes.get(key)
+            if index is None:
+                return
+            for change in changes:
+                if change[0] == "rebuild":
+                    del self._indexes[key]
+                    return
+                self._apply_one(index, change)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = {key: index.stats() for key, index in self._indexes.items()}
+        return {"indexes": indexes, "builds": self.builds, "lookups": self.lookups, "unready": self.unready,
+                "background_failures": self.background.failures}
+
+
+duplicate_detector = DuplicateDetector()
+
+
+def _collect_question_changes(session: Session, changes: List[Tuple]):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Question):
+            state = inspect(obj)
+            if obj in session.new or any(state.attrs[name].history.has_changes() for name in ("title", "body")):
+                changes.append(("add", obj.id, signature(obj.title, obj.body)))
+    for obj in session.deleted:
+        if isinstance(obj, Question):
+            changes.append(("remove", obj.id))
+
+
+def _collect_statement_changes(orm_execute_state, changes: List[Tuple]):
+    # Rows inserted or deleted without the ORM cannot be tracked
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is Question.__table__:
+            changes.append(("rebuild", None))
+
+
+register("duplicate_index", duplicate_detector.apply, _collect_question_changes, _collect_statement_changes)
+
+
+def get_duplicate_stats() -> Dict[str, Any]:
+    """Snapshot signature counts and counters for the metrics endpoint"""
+    return duplicate_detector.stats()
@@ -0,0 +1,347 @@
+"""
+Per-entity search indexes kept in step with committed writes.
+
+One InvertedIndex per entity type (questions, answers, users, tags) and per
+database, built by streaming the indexed columns, or for questions and
+answers loaded from a snapshot built offline (see snapshot.py). The API
+builds the indexes of its database on a background thread at startup and
+again after an index is dropped (see background.py); search() returns None
+for an entity whose index is still building, and callers fall back to a
+database query. Other databases are built on their first search. Afterwards nothing is rebuilt: ORM flushes record the text
+and boost signal of every new, edited or deleted row, and the batch is
+applied once the transaction commits (and dropped on rollback). Bulk UPDATE
+statements by id that may change a boost column (vote and tag count updates)
+mark the affected ids stale, and their signals are re-read on the next
+search; those that set an indexed text column have their documents re-read
+instead. Bulk statements whose rows cannot be identified drop that entity's
+index so it is rebuilt.
+
+The indexes are per process; other workers see a change once they rebuild.
+"""
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+from ..db.models import Question, Answer, User, Tag
+from .background import BackgroundBuilds
+from .hooks import BuildLog, database_key, register
+from .index import InvertedIndex, weighted_terms
+
+BUILD_BATCH = 5000
+
+
+class SearchEntity:
+    """How rows of one model become documents"""
+
+    def __init__(self, model, fields: Tuple[Tuple[str, float], ...], signal: str, created: str = "created_at"):
+        self.model = model
+        self.fields = fields
+        self.signal = signal
+        self.created = created
+
+    @property
+    def columns(self) -> List[Any]:
+        return [self.model.id] + [getattr(self.model, name) for name, _ in self.fields] + [
+            getattr(self.model, self.signal), getattr(self.model, self.created)
+        ]
+
+    def document(self, values) -> Tuple[int, Dict[str, float], float, float]:
+        """(id, terms, signal, created) from a row or object with the indexed attributes"""
+        terms = weighted_terms((getattr(values, name), weight) for name, weight in self.fields)
+        created = getattr(values, self.created)
+        return values.id, terms, getattr(values, self.signal) or 0, created.timestamp() if created else 0
+
+
+# Field weights favour the short, descriptive field of each entity
+ENTITIES = {
+    "questions": SearchEntity(Question, (("title", 3.0), ("body", 1.0)), "votes"),
+    "answers": SearchEntity(Answer, (("body", 1.0),), "votes"),
+    "users": SearchEntity(User, (("name", 3.0), ("location", 1.0), ("about", 1.0)), "reputation"),
+    "tags": SearchEntity(Tag, (("name", 3.0), ("description", 1.0)), "count"),
+}
+KINDS_BY_TABLE = {entity.model.__tablename__: kind for kind, entity in ENTITIES.items()}
+KINDS_BY_MODEL = {entity.model: kind for kind, entity in ENTITIES.items()}
+
+# Public sort names per entity, mapped to the index's sort modes
+SEARCH_SORTS = {
+    "questions": {"relevance": "relevance", "newest": "newest", "votes": "signal"},
+    "answers": {"relevance": "relevance", "newest": "newest", "votes": "signal"},
+    "users": {"relevance": "relevance", "newest": "newest", "reputation": "signal"},
+    "tags": {"relevance": "relevance", "newest": "newest", "popular": "signal"},
+}
+
+
+def _statement_ids(statement, id_column) -> Optional[List[int]]:
+    """Ids targeted by a WHERE id = x / id IN (...) statement, else None"""
+    clause = getattr(statement, "whereclause", None)
+    if not isinstance(clause, BinaryExpression) or not isinstance(clause.right, BindParameter):
+        return None
+    left = clause.left
+    if getattr(left, "key", None) != id_column.key or getattr(left, "table", None) is not id_column.table:
+        return None
+    if clause.operator is operators.eq:
+        return [clause.right.value]
+    if clause.operator is operators.in_op:
+        return list(clause.right.value)
+    return None
+
+
+def _updated_columns(statement) -> Optional[set]:
+    """Names of the columns an UPDATE sets, or None if they cannot be told"""
+    values = getattr(statement, "_values", None)
+    if not values:
+        return None
+    return {getattr(column, "key", column) for column in values}
+
+
+class SearchEngine:
+    def __init__(self):
+        # database key -> kind -> index
+        self._indexes: Dict[str, Dict[str, InvertedIndex]] = {}
+        # database key -> kind -> ids whose signal must be re-read
+        self._stale: Dict[str, Dict[str, set]] = {}
+        # database key -> kind -> ids whose whole document must be re-read
+        self._reindex: Dict[str, Dict[str, set]] = {}
+        # Changes committed while an index was building, by (database key, kind)
+        self._building = BuildLog()
+        self._lock = threading.Lock()
+        self.background = BackgroundBuilds("search_index", self._build_missing)
+        self.builds = 0
+        self.loads = 0
+        self.searches = 0
+        self.unready = 0
+        self.applied_changes = 0
+
+    def warm(self, session_factory):
+        """Build the indexes of the factory's database in the background, now and whenever one is dropped"""
+        self.background.start(self.background.register(session_factory))
+
+    def search(self, session: Session, kind: str, query: str, offset: int = 0, limit: int = 20,
+               sort: str = "relevance") -> Optional[Tuple[List[int], int]]:
+        """Ids of one page of matching rows, best first, and the number of matches.
+
+        None while the entity's index is building in the background.
+        """
+        if kind not in ENTITIES:
+            raise ValueError(f"Unknown search type: {kind}")
+        sorts = SEARCH_SORTS[kind]
+        index = self._get_index(session, kind)
+        if index is None:
+            self.unready += 1
+            return None
+        self.searches += 1
+        return index.search(query, offset, limit, sorts.get(sort, sorts["relevance"]))
+
+    def _get_index(self, session: Session, kind: str) -> Optional[InvertedIndex]:
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            index = self._indexes.get(key, {}).get(kind)
+            stale = self._stale.get(key, {}).pop(kind, None)
+            reindex = self._reindex.get(key, {}).pop(kind, None)
+        if index is None:
+            if self.background.start(key):
+                return None
+            return self._build(session, key, kind)
+        if stale:
+            self._refresh_signals(session, index, kind, stale)
+        if reindex:
+            self._reread(session, index, kind, reindex)
+        return index
+
+    def _build(self, session: Session, key: str, kind: str) -> InvertedIndex:
+        entity = ENTITIES[kind]
+        with self._lock:
+            self._building.start((key, kind))
+        index = InvertedIndex()
+        try:
+            rows = session.execute(select(*entity.columns).execution_options(yield_per=BUILD_BATCH))
+            for row in rows:
+                doc_id, terms, signal, created = entity.document(row)
+                index.add(doc_id, terms, signal, created)
+        except BaseException:
+            with self._lock:
+                self._building.finish((key, kind))
+            raise
+        with self._lock:
+            # Replay what committed meanwhile; adds and removes are idempotent
+            self._replay(key, kind, index)
+            existing = self._indexes.setdefault(key, {}).get(kind)
+            if existing is not None:
+                return existing
+            self._indexes[key][kind] = index
+            self._stale.get(key, {}).pop(kind, None)
+            self.builds += 1
+        return index
+
+    def _build_missing(self, session: Session):
+        """Build every index of the session's database that is not loaded"""
+        key = database_key(session.get_bind().url)
+        for kind in ENTITIES:
+            with self._lock:
+                loaded = kind in self._indexes.get(key, {})
+            if not loaded:
+                self._build(session, key, kind)
+
+    def install(self, session: Session, kind: str, index: InvertedIndex, since: datetime) -> InvertedIndex:
+        """Serve a prebuilt index once it has caught up with the rows written since it was built"""
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            self._building.start((key, kind))
+        try:
+            self._catch_up(session, index, kind, since)
+        except BaseException:
+            with self._lock:
+                self._building.finish((key, kind))
+            raise
+        with self._lock:
+            self._replay(key, kind, index)
+            self._indexes.setdefault(key, {})[kind] = index
+            self._stale.get(key, {}).pop(kind, None)
+            self.loads += 1
+        return index
+
+    def _catch_up(self, session: Session, index: InvertedIndex, kind: str, since: datetime):
+        """Re-read rows new or updated since a time, drop deleted ones and refresh every signal"""
+        entity = ENTITIES[kind]
+        model = entity.model
+        signal = getattr(model, entity.signal)
+        seen, changed = set(), []
+        rows = session.execute(select(model.id, signal, model.updated_at).execution_options(yield_per=BUILD_BATCH))
+        for doc_id, value, updated in rows:
+            seen.add(doc_id)
+            if doc_id not in index or (updated is not None and updated >= since):
+                changed.append(doc_id)
+            else:
+                index.set_signal(doc_id, value)
+        for doc_id in index.ids():
+            if doc_id not in seen:
+                index.remove(doc_id)
+        self._reread(session, index, kind, changed)
+
+    def _reread(self, session: Session, index: InvertedIndex, kind: str, ids):
+        """Re-index the current text of rows, dropping those that no longer exist"""
+        entity = ENTITIES[kind]
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            found = set()
+            for row in session.execute(select(*entity.columns).where(entity.model.id.in_(batch))):
+                found.add(row.id)
+                index.add(*entity.document(row))
+            for doc_id in batch:
+                if doc_id not in found:
+                    index.remove(doc_id)
+
+    def _refresh_signals(self, session: Session, index: InvertedIndex, kind: str, ids: set):
+        entity = ENTITIES[kind]
+        signal = getattr(entity.model, entity.signal)
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            for doc_id, value in session.execute(select(entity.model.id, signal).where(entity.model.id.in_(batch))):
+                index.set_signal(doc_id, value)
+
+    def _replay(self, key: str, kind: str, index: InvertedIndex):
+        """Apply the changes committed while an index was building; call with the lock held"""
+        for change in self._building.finish((key, kind)):
+            if change[0] == "reindex":
+                self._reindex.setdefault(key, {}).setdefault(kind, set()).update(change[2])
+            else:
+                self._apply_one(index, change)
+
+    @staticmethod
+    def _apply_one(index: InvertedIndex, change: Tuple):
+        action, _, doc_id, *document = change
+        if action == "add":
+            index.add(doc_id, *document)
+        elif action == "remove":
+            index.remove(doc_id)
+
+    def apply(self, key: str, changes: List[Tuple]):
+        """Apply the changes of one committed transaction"""
+        with self._lock:
+            indexes = self._indexes.get(key, {})
+            for change in changes:
+                action, kind = change[0], change[1]
+                self._building.record((key, kind), [change])
+                if action in ("stale", "reindex"):
+                    if kind in indexes:
+                        pending = self._stale if action == "stale" else self._reindex
+                        pending.setdefault(key, {}).setdefault(kind, set()).update(change[2])
+                elif action == "rebuild":
+                    indexes.pop(kind, None)
+                elif kind in indexes:
+                    self._apply_one(indexes[kind], change)
+                self.applied_changes += 1
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._stale.clear()
+            self._reindex.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = {
+                key: {kind: index.stats() for kind, index in kinds.items()}
+                for key, kinds in self._indexes.items()
+            }
+        return {
+            "indexes": indexes,
+            "builds": self.builds,
+            "loads": self.loads,
+            "searches": self.searches,
+            "unready": self.unready,
+            "background_failures": self.background.failures,
+            "applied_changes": self.applied_changes,
+        }
+
+
+search_engine = SearchEngine()
+
+
+def _changed(state, entity: SearchEntity) -> bool:
+    names = [name for name, _ in entity.fields] + [entity.signal]
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _collect_flushed_documents(session: Session, changes: List[Tuple]):
+    for obj in list(session.new) + list(session.dirty):
+        kind = KINDS_BY_MODEL.get(type(obj))
+        if kind is None:
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and not _changed(state, ENTITIES[kind]):
+            continue
+        changes.append(("add", kind, *ENTITIES[kind].document(obj)))
+    for obj in session.deleted:
+        kind = KINDS_BY_MODEL.get(type(obj))
+        if kind is not None:
+            changes.append(("remove", kind, obj.id))
+
+
+def _collect_statement_changes(orm_execute_state, changes: List[Tuple]):
+    table = getattr(orm_execute_state.statement, "table", None)
+    kind = KINDS_BY_TABLE.get(getattr(table, "name", None))
+    if kind is None:
+        return
+    ids = None if orm_execute_state.is_insert else _statement_ids(orm_execute_state.statement, table.c.id)
+    if ids is None:
+        changes.append(("rebuild", kind))
+    elif orm_execute_state.is_update:
+        columns = _updated_columns(orm_execute_state.statement)
+        text_columns = {name for name, _ in ENTITIES[kind].fields}
+        changes.append(("stale" if columns is not None and not columns & text_columns else "reindex", kind, ids))
+    else:
+        changes.extend(("remove", kind, doc_id) for doc_id in ids)
+
+
+register("search_index", search_engine.apply, _collect_flushed_documents, _collect_statement_changes)
+
+
+def get_search_stats() -> Dict[str, Any]:
+    """Snapshot index sizes and counters for the metrics endpoint"""
+    return search_engine.stats()
@@ -0,0 +1,106 @@
+"""
+Commit hooks shared by the in-process search indexes.
+
+Every index keeps itself current the same way: ORM flushes and bulk
+statements record changes in the session, the changes are handed to the
+index once the transaction commits, and they are dropped on rollback. One
+set of Session listeners does this for all of them; an index registers
+
+    flush(session, changes)         called after every flush
+    statement(state, changes)       called for every ORM INSERT, UPDATE or DELETE
+    apply(database key, changes)    called with the changes of each commit
+
+where changes is the list the index appends its own change tuples to,
+kept per database the session is bound to.
+
+An index built while other sessions commit keeps those commits in a
+BuildLog and replays them over the finished build.
+"""
+import os
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+PENDING_KEY = "search_pending_changes"
+
+# name -> (apply, flush, statement)
+HOOKS: Dict[str, Tuple[Callable, Optional[Callable], Optional[Callable]]] = {}
+
+
+def database_key(url) -> str:
+    """Identify a database independent of driver and read-only URI form"""
+    path = url.database or ""
+    if url.get_backend_name() == "sqlite" and path and path != ":memory:":
+        if path.startswith("file:"):
+            path = path[len("file:"):].split("?", 1)[0]
+        return os.path.realpath(path)
+    return url.set(drivername=url.get_backend_name()).render_as_string(hide_password=True)
+
+
+def register(name: str, apply: Callable[[str, List[Tuple]], None], flush: Optional[Callable] = None,
+             statement: Optional[Callable] = None):
+    """Register an index's change collectors and the function applying its committed changes"""
+    if name in HOOKS:
+        raise ValueError(f"Duplicate commit hook {name}")
+    HOOKS[name] = (apply, flush, statement)
+
+
+def _changes(session: Session) -> Dict[str, List[Tuple]]:
+    """This session's pending changes per hook, for the database it is bound to"""
+    key = database_key(session.get_bind().url)
+    pending = session.info.setdefault(PENDING_KEY, {})
+    return {name: pending.setdefault((name, key), []) for name in HOOKS}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(session, flush_context):
+    changes = _changes(session)
+    for name, (_, flush, _) in HOOKS.items():
+        if flush is not None:
+            flush(session, changes[name])
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_changes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    changes = _changes(orm_execute_state.session)
+    for name, (_, _, statement) in HOOKS.items():
+        if statement is not None:
+            statement(orm_execute_state, changes[name])
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    for (name, key), changes in session.info.pop(PENDING_KEY, {}).items():
+        if changes:
+            HOOKS[name][0](key, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+class BuildLog:
+    """Changes committed while indexes were building, keyed like the indexes.
+
+    Holds no lock of its own: callers use it under the lock that guards
+    their indexes.
+    """
+
+    def __init__(self):
+        self._changes: Dict[Hashable, List[Tuple]] = {}
+
+    def start(self, key: Hashable):
+        self._changes.setdefault(key, [])
+
+    def record(self, key: Hashable, changes: List[Tuple]):
+        """Keep committed changes if an index for key is building"""
+        log = self._changes.get(key)
+        if log is not None:
+            log.extend(changes)
+
+    def finish(self, key: Hashable) -> List[Tuple]:
+        """Stop logging for key; returns the changes committed since start"""
+        return self._changes.pop(key, [])
@@ -0,0 +1,152 @@
+"""
+In-memory inverted index with TF-IDF ranking.
+
+Each document is a set of weighted text fields plus two numbers kept beside
+the postings: a boost signal (votes, reputation, usage count) and a creation
+timestamp, so results can be ranked or sorted without touching the database.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Multiplier applied per log-unit of the boost signal; 0 disables boosts
+BOOST_WEIGHT = 0.1
+
+# Underscores split words, so "john_doe" matches "john"
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens of a text"""
+    return _WORD.findall(text.lower()) if text else []
+
+
+def weighted_terms(fields: Iterable[Tuple[Optional[str], float]]) -> Dict[str, float]:
+    """Term frequencies over several fields, each occurrence counting its field weight"""
+    terms: Dict[str, float] = Counter()
+    for text, weight in fields:
+        for token in tokenize(text):
+            terms[token] += weight
+    return terms
+
+
+class InvertedIndex:
+    def __init__(self, boost_weight: float = BOOST_WEIGHT):
+        self.boost_weight = boost_weight
+        # term -> {doc id: weighted term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # doc id -> (terms, length norm, signal, created timestamp)
+        self._docs: Dict[int, Tuple[Tuple[str, ...], float, float, float]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._docs
+
+    def add(self, doc_id: int, terms: Dict[str, float], signal: float = 0, created: float = 0):
+        """Index a document, replacing any previous version of it"""
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            norm = math.sqrt(sum(terms.values())) or 1.0
+            self._docs[doc_id] = (tuple(terms), norm, signal or 0, created or 0)
+
+    def merge(self, terms: List[str], doc_ids, norms, signals, created, doc_offsets, doc_terms,
+              term_offsets, posting_ids, posting_frequencies):
+        """Index documents stored column-wise, as in a search index snapshot.
+
+        Document i has terms[doc_terms[j]] for j in doc_offsets[i]:doc_offsets[i + 1];
+        term t has the postings posting_ids[k]: posting_frequencies[k] for k
+        in term_offsets[t]:term_offsets[t + 1].
+        """
+        with self._lock:
+            for position, doc_id in enumerate(doc_ids):
+                self._remove(doc_id)
+                span = doc_terms[doc_offsets[position]:doc_offsets[position + 1]]
+                self._docs[doc_id] = (tuple(map(terms.__getitem__, span)), norms[position],
+                                      signals[position], created[position])
+            for position, term in enumerate(terms):
+                start, end = term_offsets[position], term_offsets[position + 1]
+                self._postings.setdefault(term, {}).update(zip(posting_ids[start:end], posting_frequencies[start:end]))
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self._remove(doc_id)
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            return list(self._docs)
+
+    def _remove(self, doc_id: int):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for term in doc[0]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def set_signal(self, doc_id: int, signal: float):
+        """Update the boost signal of an indexed document"""
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            if doc is not None:
+                self._docs[doc_id] = (doc[0], doc[1], signal or 0, doc[3])
+
+    def boost(self, signal: float) -> float:
+        return 1.0 + self.boost_weight * math.log1p(max(signal, 0))
+
+    def search(self, query: str, offset: int = 0, limit: int = 20, sort: str = "relevance") -> Tuple[List[int], int]:
+        """Ids of one page of documents containing every query word, and the total.
+
+        relevance ranks by TF-IDF (log-scaled term frequency, length
+        normalised) times the boost; signal and newest sort every match by
+        the boost signal or creation time. Ties go to the higher id.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return [], 0
+            # Intersect starting from the rarest term
+            postings.sort(key=len)
+            matches = set(postings[0])
+            for other in postings[1:]:
+                matches.intersection_update(other)
+                if not matches:
+                    return [], 0
+
+            if sort == "signal":
+                keyed = ((self._docs[doc_id][2], doc_id) for doc_id in matches)
+            elif sort == "newest":
+                keyed = ((self._docs[doc_id][3], doc_id) for doc_id in matches)
+            else:
+                total_docs = len(self._docs)
+                idf = [math.log(1 + total_docs / len(p)) for p in postings]
+
+                def score(doc_id: int) -> float:
+                    _, norm, signal, _ = self._docs[doc_id]
+                    tf_idf = sum(math.log1p(p[doc_id]) * weight for p, weight in zip(postings, idf))
+                    return tf_idf / norm * self.boost(signal)
+
+                keyed = ((score(doc_id), doc_id) for doc_id in matches)
+            page = heapq.nlargest(offset + limit, keyed)
+        return [doc_id for _, doc_id in page[offset:]], len(matches)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+            }
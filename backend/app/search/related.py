@@ -0,0 +1,401 @@
+"""
+Related questions from sparse TF-IDF vectors.
+
+Each question is a sparse vector of log-scaled term frequencies over its
+title, body and tags (tags as "#name" terms, which no query word can
+produce). Related questions are found by approximate nearest-neighbour
+search: only the RELATED_QUERY_TERMS highest TF-IDF terms of a question are
+looked up, terms in more than RELATED_MAX_DF of all questions (and more
+than RELATED_MAX_POSTINGS) are skipped, and at most RELATED_MAX_POSTINGS
+candidates are read per term; the candidates are then ranked by cosine
+similarity.
+
+The API builds the vectors of its database at startup on a background
+thread, tokenizing across a process pool (see background.py); lookups return
+no related questions until the build finishes. Other databases are built on
+first lookup, or up front by rebuild_related(). Afterwards questions created,
+edited or deleted through the Session are applied once the transaction
+commits; an edited question whose tags are not loaded, or whose tag links
+were inserted or deleted directly, is re-read on the next lookup.
+"""
+import itertools
+import math
+import os
+import sys
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from ..db.models import Question, Tag, question_tags
+from .background import BackgroundBuilds
+from .hooks import BuildLog, database_key, register
+from .index import tokenize
+
+RELATED_QUERY_TERMS = int(os.getenv("RELATED_QUERY_TERMS", "16"))
+RELATED_MAX_POSTINGS = int(os.getenv("RELATED_MAX_POSTINGS", "5000"))
+RELATED_MAX_DF = 0.2
+# Processes tokenizing background builds; 0 for one per CPU
+RELATED_BUILD_WORKERS = int(os.getenv("RELATED_BUILD_WORKERS", "0"))
+
+# Field weights; a shared tag says more than a shared body word
+TITLE_WEIGHT = 3.0
+BODY_WEIGHT = 1.0
+TAG_WEIGHT = 4.0
+
+BUILD_BATCH = 5000
+TAG_SEPARATOR = "\x1f"
+
+
+def question_vector(title: Optional[str], body: Optional[str], tags: Iterable[str]) -> Dict[str, float]:
+    """Sparse vector of log-scaled weighted term frequencies"""
+    counts: Dict[str, float] = {}
+    for text, weight in ((title, TITLE_WEIGHT), (body, BODY_WEIGHT)):
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + weight
+    for tag in tags:
+        counts["#" + tag.lower()] = TAG_WEIGHT
+    return {term: 1 + math.log(count) for term, count in counts.items()}
+
+
+def build_vectors(rows: Sequence[Tuple[int, Optional[str], Optional[str], Optional[str]]]) -> Tuple:
+    """Vectors of (id, title, body, joined tag names) rows; runs in pool workers.
+
+    Returned column-wise as flat arrays, which pickle as raw bytes, so the
+    cost of shipping a batch back from a worker stays far below the cost of
+    tokenizing it: (terms, question ids, norms, per-question offsets into
+    the term indices, term indices, per-term offsets into the postings,
+    posting question ids, posting weights).
+    """
+    vocabulary: Dict[str, int] = {}
+    term_ids: List[List[int]] = []
+    term_weights: List[List[float]] = []
+    question_ids, norms = array("q"), array("d")
+    question_offsets, question_terms = array("q", [0]), array("I")
+    for question_id, title, body, tags in rows:
+        vector = question_vector(title, body, tags.split(TAG_SEPARATOR) if tags else ())
+        for term, weight in vector.items():
+            position = vocabulary.get(term)
+            if position is None:
+                position = vocabulary[term] = len(term_ids)
+                term_ids.append([question_id])
+                term_weights.append([weight])
+            else:
+                term_ids[position].append(question_id)
+                term_weights[position].append(weight)
+            question_terms.append(position)
+        question_ids.append(question_id)
+        norms.append(math.hypot(*vector.values()) or 1.0)
+        question_offsets.append(len(question_terms))
+    term_offsets, posting_ids, posting_weights = array("q", [0]), array("q"), array("d")
+    for ids, weights in zip(term_ids, term_weights):
+        posting_ids.extend(ids)
+        posting_weights.extend(weights)
+        term_offsets.append(len(posting_ids))
+    return (list(vocabulary), question_ids, norms, question_offsets, question_terms,
+            term_offsets, posting_ids, posting_weights)
+
+
+class RelatedIndex:
+    def __init__(self):
+        # question id -> (terms, norm)
+        self._questions: Dict[int, Tuple[Tuple[str, ...], float]] = {}
+        # term -> {question id: weight}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def add(self, question_id: int, vector: Dict[str, float]):
+        """Index a question, replacing any previous vector"""
+        with self._lock:
+            self._remove(question_id)
+            for term, weight in vector.items():
+                self._postings.setdefault(term, {})[question_id] = weight
+            self._questions[question_id] = (tuple(vector), math.hypot(*vector.values()) or 1.0)
+
+    def merge(self, batch: Tuple):
+        """Index a batch from build_vectors"""
+        (terms, question_ids, norms, question_offsets, question_terms,
+         term_offsets, posting_ids, posting_weights) = batch
+        terms = [sys.intern(term) for term in terms]
+        with self._lock:
+            for position, question_id in enumerate(question_ids):
+                self._remove(question_id)
+                span = question_terms[question_offsets[position]:question_offsets[position + 1]]
+                self._questions[question_id] = (tuple(map(terms.__getitem__, span)), norms[position])
+            for position, term in enumerate(terms):
+                start, end = term_offsets[position], term_offsets[position + 1]
+                self._postings.setdefault(term, {}).update(zip(posting_ids[start:end], posting_weights[start:end]))
+
+    def remove(self, question_id: int):
+        with self._lock:
+            self._remove(question_id)
+
+    def _remove(self, question_id: int):
+        entry = self._questions.pop(question_id, None)
+        if entry is None:
+            return
+        for term in entry[0]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(question_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def related(self, question_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """(id, cosine similarity) of the questions most similar to one, best first"""
+        with self._lock:
+            entry = self._questions.get(question_id)
+            if entry is None or limit <= 0:
+                return []
+            total = len(self._questions)
+            # Very common terms are skipped once their lists are long enough to cost time
+            max_df = max(RELATED_MAX_DF * total, RELATED_MAX_POSTINGS)
+            weighted = []
+            for term in entry[0]:
+                postings = self._postings[term]
+                if 1 < len(postings) <= max_df:
+                    weighted.append((postings[question_id] * math.log(1 + total / len(postings)), term))
+            weighted = sorted(weighted, reverse=True)[:RELATED_QUERY_TERMS]
+            if not weighted:
+                return []
+
+            scores: Dict[int, float] = {}
+            for query_weight, term in weighted:
+                idf = math.log(1 + total / len(self._postings[term]))
+                for other, weight in itertools.islice(self._postings[term].items(), RELATED_MAX_POSTINGS):
+                    if other != question_id:
+                        scores[other] = scores.get(other, 0) + query_weight * weight * idf
+            # Cosine over the looked-up terms, with the other question's idf-free norm
+            query_norm = math.sqrt(sum(w * w for w, _ in weighted))
+            ranked = sorted(
+                ((score / (query_norm * self._questions[other][1]), other) for other, score in scores.items()),
+                key=lambda item: (-item[0], item[1]),
+            )
+        return [(other, round(score, 4)) for score, other in ranked[:limit]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "questions": len(self._questions),
+                "terms": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+            }
+
+
+def _question_columns() -> List[Any]:
+    """id, title, body and the joined tag names of a question"""
+    tag_names = (
+        select(func.group_concat(Tag.name, TAG_SEPARATOR))
+        .join(question_tags, question_tags.c.tag_id == Tag.id)
+        .where(question_tags.c.question_id == Question.id)
+        .scalar_subquery()
+    )
+    return [Question.id, Question.title, Question.body, tag_names]
+
+
+def _question_rows(session: Session) -> Iterator:
+    return iter(session.execute(select(*_question_columns()).execution_options(yield_per=BUILD_BATCH)))
+
+
+def _batches(rows: Iterator, size: int) -> Iterator[List[Tuple]]:
+    while True:
+        batch = [tuple(row) for row in itertools.islice(rows, size)]
+        if not batch:
+            return
+        yield batch
+
+
+class RelatedQuestions:
+    def __init__(self):
+        # database key -> index
+        self._indexes: Dict[str, RelatedIndex] = {}
+        # database key -> question ids to re-read
+        self._stale: Dict[str, set] = {}
+        # Changes committed while an index was building, by database key
+        self._building = BuildLog()
+        self._lock = threading.Lock()
+        self.background = BackgroundBuilds("related_questions", lambda session: self.rebuild(session, self._workers))
+        self._workers = 1
+        self.builds = 0
+        self.lookups = 0
+        self.unready = 0
+
+    def warm(self, session_factory, workers: Optional[int] = None):
+        """Build the vectors of the factory's database in the background, now and whenever they are dropped"""
+        self._workers = workers or RELATED_BUILD_WORKERS or os.cpu_count() or 1
+        self.background.start(self.background.register(session_factory))
+
+    def related(self, session: Session, question_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            index = self._indexes.get(key)
+            stale = self._stale.pop(key, None)
+        self.lookups += 1
+        if index is None:
+            if self.background.start(key):
+                # Building in the background; no related questions until it finishes
+                self.unready += 1
+                return []
+            index = self.rebuild(session)
+        elif stale:
+            self._refresh(session, index, stale)
+        return index.related(question_id, limit)
+
+    def rebuild(self, session: Session, workers: int = 1) -> RelatedIndex:
+        """Build the vectors of every question, tokenizing in a process pool when workers > 1"""
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            self._building.start(key)
+        index = RelatedIndex()
+        try:
+            batches = _batches(_question_rows(session), BUILD_BATCH)
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    for vectors in pool.map(build_vectors, batches):
+                        index.merge(vectors)
+            else:
+                # In-process, adding vectors directly beats packing them into arrays
+                for batch in batches:
+                    for question_id, title, body, tags in batch:
+                        index.add(question_id, question_vector(title, body, tags.split(TAG_SEPARATOR) if tags else ()))
+        except BaseException:
+            with self._lock:
+                self._building.finish(key)
+            raise
+        with self._lock:
+            for change in self._building.finish(key):
+                self._apply_one(index, change, self._stale.setdefault(key, set()))
+            self._indexes[key] = index
+            self.builds += 1
+        return index
+
+    def _refresh(self, session: Session, index: RelatedIndex, ids: set):
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            statement = select(*_question_columns()).where(Question.id.in_(batch))
+            vectors = build_vectors([tuple(row) for row in session.execute(statement)])
+            index.merge(vectors)
+            for question_id in set(batch) - set(vectors[1]):
+                index.remove(question_id)
+
+    @staticmethod
+    def _apply_one(index: RelatedIndex, change: Tuple, stale: set):
+        action, question_id, *vector = change
+        if action == "add":
+            index.add(question_id, *vector)
+        elif action == "remove":
+            index.remove(question_id)
+        elif action == "stale":
+            stale.add(question_id)
+
+    def apply(self, key: str, changes: List[Tuple]):
+        """Apply the question changes of one committed transaction"""
+        with self._lock:
+            self._building.record(key, changes)
+            index = self._indexes.get(key)
+            if index is None:
+                return
+            for change in changes:
+                if change[0] == "rebuild":
+                    del self._indexes[key]
+                    self._stale.pop(key, None)
+                    return
+                self._apply_one(index, change, self._stale.setdefault(key, set()))
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._stale.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = {key: index.stats() for key, index in self._indexes.items()}
+        return {"indexes": indexes, "builds": self.builds, "lookups": self.lookups, "unready": self.unready,
+                "background_failures": self.background.failures}
+
+
+related_questions = RelatedQuestions()
+
+
+def rebuild_related(session: Session, workers: Optional[int] = None) -> Dict[str, int]:
+    """Rebuild the related-question vectors of a database across a process pool"""
+    return related_questions.rebuild(session, workers or os.cpu_count() or 1).stats()
+
+
+def _change(obj: Question, new: bool) -> Tuple:
+    state = inspect(obj)
+    if "tags" in state.dict:
+        return ("add", obj.id, question_vector(obj.title, obj.body, [tag.name for tag in obj.tags if tag.name]))
+    if new:
+        return ("add", obj.id, question_vector(obj.title, obj.body, ()))
+    return ("stale", obj.id)
+
+
+def _collect_question_changes(session: Session, changes: List[Tuple]):
+    for obj in session.new:
+        if isinstance(obj, Question):
+            changes.append(_change(obj, True))
+    for obj in session.dirty:
+        if isinstance(obj, Question):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in ("title", "body", "tags")):
+                changes.append(_change(obj, False))
+    for obj in session.deleted:
+        if isinstance(obj, Question):
+            changes.append(("remove", obj.id))
+
+
+def _value(value) -> Any:
+    return getattr(value, "value", value)
+
+
+def _tag_link_question_ids(orm_execute_state) -> Optional[set]:
+    """Questions whose tag links a question_tags INSERT or DELETE changes, or None if unknown"""
+    statement = orm_execute_state.statement
+    if orm_execute_state.is_insert:
+        values = getattr(statement, "_values", None)
+        rows = [{getattr(k, "key", k): v for k, v in values.items()}] if values else orm_execute_state.parameters
+        if isinstance(rows, dict):
+            rows = [rows]
+        ids = {_value(row.get("question_id")) for row in rows or ()}
+        return ids if ids and None not in ids else None
+    # A DELETE is tracked when its WHERE clause requires question_id = x
+    where = getattr(statement, "whereclause", None)
+    if where is None:
+        return None
+    clauses = where.clauses if getattr(where, "operator", None) is operators.and_ else [where]
+    for clause in clauses:
+        if getattr(clause, "left", None) is question_tags.c.question_id and clause.operator is operators.eq:
+            question_id = _value(clause.right)
+            if question_id is not None:
+                return {question_id}
+    return None
+
+
+def _collect_statement_changes(orm_execute_state, changes: List[Tuple]):
+    # Counter updates do not touch the vectors; tag links inserted or
+    # deleted directly mark their questions stale, and other rows inserted
+    # or deleted without the ORM cannot be tracked, so the vectors are rebuilt
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is question_tags:
+            ids = _tag_link_question_ids(orm_execute_state)
+            if ids is not None:
+                changes.extend(("stale", question_id) for question_id in ids)
+                return
+        if table is Question.__table__ or table is question_tags:
+            changes.append(("rebuild", None))
+
+
+register("related_questions", related_questions.apply, _collect_question_changes, _collect_statement_changes)
+
+
+def get_related_stats() -> Dict[str, Any]:
+    """Snapshot vector counts and counters for the metrics endpoint"""
+    return related_questions.stats()
@@ -0,0 +1,197 @@
+"""
+LRU cache of question search result pages.
+
+GET /questions/search sees the same few queries over and over, and each one
+runs the full-text match plus a COUNT. Pages are cached as
+(database, normalized query, tags, sort, skip, limit) -> (question ids,
+total), facet counts as (database, query, tags) -> (facets, total), for at
+most SEARCH_CACHE_TTL seconds and SEARCH_CACHE_SIZE entries; page rows are
+re-read by id, so views and votes shown stay fresh.
+
+Invalidation never walks the cache. Each entry remembers the generation
+counters it was computed under: the global one, plus the counter of every
+tag it filters on (or the "untagged" counter when it has no tag filter). A
+committed create, delete, or title/body/tag edit of a question bumps the
+counters of that question's tags and the untagged counter; a change whose
+tags are unknown bumps the global counter. Stale entries are dropped when
+next looked up. Vote, view and answer updates do not invalidate; the
+orders and vote/answered facets they affect are refreshed by the TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import Session
+from ..db.models import Question, Tag, question_tags
+from .hooks import register
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "30"))
+
+# Pending markers: a change whose tags are unknown, and one to untagged queries
+ALL_TAGS = None
+UNTAGGED = ""
+
+
+class SearchResultCache:
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires at, generations, result, total)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Tuple, Any, int]]" = OrderedDict()
+        self._global_generation = 0
+        self._untagged_generation = 0
+        self._tag_generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    def _generations(self, tags: Sequence[str]) -> Tuple:
+        if not tags:
+            return (self._global_generation, self._untagged_generation)
+        return (self._global_generation,) + tuple(self._tag_generations.get(tag, 0) for tag in tags)
+
+    def snapshot(self, tags: Sequence[str]) -> Tuple:
+        """Generations to store with a result computed from now on"""
+        with self._lock:
+            return self._generations(tags)
+
+    def get(self, key: Tuple[Hashable, ...], tags: Sequence[str]) -> Optional[Tuple[Any, int]]:
+        """Cached (result, total) for a key, or None if missing, expired or invalidated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, generations, result, total = entry
+            if expires_at <= time.monotonic() or generations != self._generations(tags):
+                del self._entries[key]
+                if expires_at <= time.monotonic():
+                    self.expirations += 1
+                else:
+                    self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result, total
+
+    def put(self, key: Tuple[Hashable, ...], generations: Tuple, result: Any, total: int):
+        """Store a result (page ids or facets) computed under a generation snapshot"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, generations, result, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tags: Optional[Iterable[str]] = ALL_TAGS):
+        """Invalidate results that could include questions with these tags"""
+        with self._lock:
+            if tags is ALL_TAGS:
+                self._global_generation += 1
+            else:
+                self._untagged_generation += 1
+                for tag in tags:
+                    self._tag_generations[tag] = self._tag_generations.get(tag, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale": self.stale,
+                "invalidations": self.invalidations,
+            }
+
+
+search_cache = SearchResultCache()
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Canonical tag filter: lowercased, deduplicated and sorted"""
+    return tuple(sorted({tag.lower() for tag in tags or ()}))
+
+
+def _question_tags(state) -> Optional[set]:
+    # Tag names known without loading anything; None if the collection is unloaded
+    if "tags" not in state.dict:
+        return None
+    history = state.attrs.tags.history
+    tags = list(history.unchanged or ()) + list(history.added or ()) + list(history.deleted or ())
+    if any(tag.name is None for tag in tags):
+        return None
+    return {tag.name.lower() for tag in tags}
+
+
+def _mark(changes: List[Optional[str]], tags: Optional[set]):
+    if tags is None:
+        changes.append(ALL_TAGS)
+    else:
+        # Every question change affects the untagged queries, even with no tags
+        changes.extend(tags)
+        changes.append(UNTAGGED)
+
+
+def _collect_question_changes(session: Session, changes: List[Optional[str]]):
+    unloaded = []
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Question):
+            _mark(changes, _question_tags(inspect(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Question):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in ("title", "body", "tags")):
+                tags = _question_tags(state)
+                if tags is None and obj.id is not None:
+                    unloaded.append(obj.id)
+                else:
+                    _mark(changes, tags)
+    if unloaded:
+        # An edited title or body leaves the tag links as they are in the database
+        rows = session.connection().execute(
+            select(func.lower(Tag.name))
+            .join(question_tags, question_tags.c.tag_id == Tag.id)
+            .where(question_tags.c.question_id.in_(unloaded))
+        )
+        _mark(changes, {name for name, in rows})
+
+
+def _collect_statement_changes(orm_execute_state, changes: List[Optional[str]]):
+    # Bulk inserts/deletes of questions or tag links cannot be attributed to tags
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is Question.__table__ or table is question_tags:
+            _mark(changes, None)
+
+
+def _apply_invalidations(key: str, changes: List[Optional[str]]):
+    pending = set(changes)
+    if ALL_TAGS in pending:
+        search_cache.invalidate(ALL_TAGS)
+    else:
+        search_cache.invalidate(tag for tag in pending if tag != UNTAGGED)
+
+
+register("search_cache", _apply_invalidations, _collect_question_changes, _collect_statement_changes)
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """Snapshot hit/miss/eviction counters for the metrics endpoint"""
+    return search_cache.stats()
@@ -0,0 +1,287 @@
+"""
+On-disk snapshots of the question and answer search indexes, built offline.
+
+build_snapshot() streams the rows of each kind in id order, SNAPSHOT_CHUNK
+at a time, tokenizes the chunks across a process pool and appends every
+chunk to a work file as one segment of flat arrays. After each segment the
+progress file records the last id read per kind and the length of the work
+file, so an interrupted build resumes from there. The finished file is
+renamed over the snapshot, so the API never reads a partial one.
+
+Layout, little-endian:
+
+    MAGIC, format version (uint32)
+    segments: per chunk, the arrays of documents_of(), each 8-byte aligned
+    footer: JSON with the database key, build start time and segment table
+    footer offset (uint64), footer length (uint64), MAGIC
+
+load_snapshot() memory-maps the file and indexes the segments straight from
+the mapped arrays, without reading or tokenizing any text, then re-reads the
+rows written since the build started before the indexes are served.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..db.db import data_dir
+from .engine import ENTITIES, database_key, search_engine
+from .index import InvertedIndex
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH = os.getenv("SEARCH_INDEX_PATH", os.path.join(data_dir, f"search_index.v{SNAPSHOT_VERSION}.bin"))
+SNAPSHOT_CHUNK = 5000
+# Entities with an updated_at column, so a snapshot can catch up after loading
+SNAPSHOT_KINDS = ("questions", "answers")
+
+MAGIC = b"SOIDX\x00\x00\x00"
+HEADER = struct.Struct("<8sI")
+TRAILER = struct.Struct("<QQ8s")
+TERM_SEPARATOR = "\x00"
+# Rows updated this long before the build started are re-read as well, in
+# case their transaction committed after the chunk holding them was read
+CATCH_UP_MARGIN = timedelta(minutes=1)
+
+# Array name and typecode of each segment column, in file order
+SEGMENT_ARRAYS = (
+    ("terms", "B"),
+    ("doc_ids", "q"),
+    ("norms", "d"),
+    ("signals", "d"),
+    ("created", "d"),
+    ("doc_offsets", "q"),
+    ("doc_terms", "I"),
+    ("term_offsets", "q"),
+    ("posting_ids", "q"),
+    ("posting_frequencies", "d"),
+)
+
+
+@lru_cache(maxsize=None)
+def _row_type(kind: str):
+    return namedtuple(f"{kind}_row", [column.key for column in ENTITIES[kind].columns])
+
+
+def documents_of(kind: str, rows: Sequence[Tuple]) -> Dict[str, array]:
+    """Tokenized documents of a chunk of rows as the columns of InvertedIndex.merge; runs in pool workers.
+
+    Postings are stored term by term as well as the terms document by
+    document, so loading adds each term's postings in one dict update.
+    """
+    entity, row_type = ENTITIES[kind], _row_type(kind)
+    vocabulary: Dict[str, int] = {}
+    term_ids: List[List[int]] = []
+    term_frequencies: List[List[float]] = []
+    doc_ids, norms, signals, created = array("q"), array("d"), array("d"), array("d")
+    doc_offsets, doc_terms = array("q", [0]), array("I")
+    for row in rows:
+        doc_id, terms, signal, timestamp = entity.document(row_type(*row))
+        for term, frequency in terms.items():
+            position = vocabulary.get(term)
+            if position is None:
+                position = vocabulary[term] = len(term_ids)
+                term_ids.append([doc_id])
+                term_frequencies.append([frequency])
+            else:
+                term_ids[position].append(doc_id)
+                term_frequencies[position].append(frequency)
+            doc_terms.append(position)
+        doc_ids.append(doc_id)
+        norms.append(math.sqrt(sum(terms.values())) or 1.0)
+        signals.append(signal)
+        created.append(timestamp)
+        doc_offsets.append(len(doc_terms))
+    term_offsets, posting_ids, posting_frequencies = array("q", [0]), array("q"), array("d")
+    for ids, frequencies in zip(term_ids, term_frequencies):
+        posting_ids.extend(ids)
+        posting_frequencies.extend(frequencies)
+        term_offsets.append(len(posting_ids))
+    return {
+        "terms": array("B", TERM_SEPARATOR.join(vocabulary).encode()),
+        "doc_ids": doc_ids, "norms": norms, "signals": signals, "created": created,
+        "doc_offsets": doc_offsets, "doc_terms": doc_terms,
+        "term_offsets": term_offsets, "posting_ids": posting_ids, "posting_frequencies": posting_frequencies,
+    }
+
+
+def _chunks(session: Session, kind: str, after: int, size: int) -> Iterator[List[Tuple]]:
+    """Rows of one kind in id order, after an id, by keyset pagination"""
+    entity = ENTITIES[kind]
+    statement = select(*entity.columns).order_by(entity.model.id).limit(size)
+    while True:
+        rows = [tuple(row) for row in session.execute(statement.where(entity.model.id > after))]
+        # Each chunk reads in its own transaction, so a long build holds no snapshot open
+        session.commit()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield rows
+
+
+def _tokenized(kind: str, chunks: Iterator[List[Tuple]], pool: Optional[ProcessPoolExecutor],
+               window: int) -> Iterator[Tuple[int, int, Dict[str, array]]]:
+    """(last id, rows, documents) per chunk in order, with at most window chunks in flight"""
+    if pool is None:
+        for rows in chunks:
+            yield rows[-1][0], len(rows), documents_of(kind, rows)
+        return
+    pending = deque()
+    for rows in chunks:
+        pending.append((rows[-1][0], len(rows), pool.submit(documents_of, kind, rows)))
+        if len(pending) >= window:
+            last_id, count, future = pending.popleft()
+            yield last_id, count, future.result()
+    while pending:
+        last_id, count, future = pending.popleft()
+        yield last_id, count, future.result()
+
+
+def _write_segment(file, kind: str, rows: int, documents: Dict[str, array]) -> Dict[str, Any]:
+    arrays = {}
+    for name, _ in SEGMENT_ARRAYS:
+        file.write(b"\x00" * (-file.tell() % 8))
+        arrays[name] = [file.tell(), len(documents[name])]
+        documents[name].tofile(file)
+    return {"kind": kind, "rows": rows, "arrays": arrays}
+
+
+def _write_json(path: str, value: Dict[str, Any]):
+    with open(path + ".tmp", "w") as file:
+        json.dump(value, file)
+    os.replace(path + ".tmp", path)
+
+
+def _progress(session: Session, work: str, progress_path: str, resume: bool) -> Dict[str, Any]:
+    """The saved build state when resuming a build of this database, else a fresh one"""
+    key = database_key(session.get_bind().url)
+    if resume and os.path.exists(progress_path) and os.path.exists(work):
+        with open(progress_path) as file:
+            state = json.load(file)
+        if state["version"] != SNAPSHOT_VERSION or state["database"] != key:
+            raise ValueError(f"{progress_path} belongs to another database or snapshot version")
+        # Drop a segment written after the last checkpoint
+        with open(work, "r+b") as file:
+            file.truncate(state["size"])
+        return state
+    with open(work, "wb") as file:
+        file.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION))
+    return {
+        "version": SNAPSHOT_VERSION,
+        "database": key,
+        "built_at": datetime.utcnow().isoformat(),
+        "last_ids": {},
+        "segments": [],
+        "size": HEADER.size,
+    }
+
+
+def build_snapshot(session: Session, path: str = SNAPSHOT_PATH, kinds: Sequence[str] = SNAPSHOT_KINDS,
+                   workers: Optional[int] = None, chunk_size: int = SNAPSHOT_CHUNK, resume: bool = False,
+                   progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, Any]:
+    """Write the search index snapshot of a database, tokenizing across workers processes.
+
+    progress(kind, rows done, total rows) is called after every chunk. With
+    resume, a build interrupted before finishing continues after the last
+    chunk it wrote.
+    """
+    for kind in kinds:
+        if kind not in SNAPSHOT_KINDS:
+            raise ValueError(f"Unknown snapshot kind: {kind}")
+    workers = workers or os.cpu_count() or 1
+    work, progress_path = path + ".partial", path + ".progress"
+    state = _progress(session, work, progress_path, resume)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with open(work, "r+b") as file:
+            file.seek(state["size"])
+            for kind in kinds:
+                model = ENTITIES[kind].model
+                total = session.scalar(select(func.count(model.id)))
+                after = state["last_ids"].get(kind, 0)
+                done = session.scalar(select(func.count(model.id)).where(model.id <= after))
+                chunks = _chunks(session, kind, after, chunk_size)
+                for last_id, rows, documents in _tokenized(kind, chunks, pool, workers * 2):
+                    state["segments"].append(_write_segment(file, kind, rows, documents))
+                    file.flush()
+                    os.fsync(file.fileno())
+                    state["last_ids"][kind] = last_id
+                    state["size"] = file.tell()
+                    _write_json(progress_path, state)
+                    done += rows
+                    if progress:
+                        progress(kind, done, total)
+
+            footer = json.dumps({
+                "version": SNAPSHOT_VERSION,
+                "database": state["database"],
+                "built_at": state["built_at"],
+                "kinds": list(kinds),
+                "segments": state["segments"],
+            }).encode()
+            offset = file.tell()
+            file.write(footer)
+            file.write(TRAILER.pack(offset, len(footer), MAGIC))
+            file.truncate()
+            file.flush()
+            os.fsync(file.fileno())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    os.replace(work, path)
+    os.remove(progress_path)
+    documents: Dict[str, int] = {}
+    for segment in state["segments"]:
+        documents[segment["kind"]] = documents.get(segment["kind"], 0) + segment["rows"]
+    return {"path": path, "documents": documents, "segments": len(state["segments"]), "bytes": os.path.getsize(path)}
+
+
+def read_footer(mapped) -> Optional[Dict[str, Any]]:
+    """The footer of a mapped snapshot, or None if it is not a complete snapshot of this version"""
+    if len(mapped) < HEADER.size + TRAILER.size:
+        return None
+    magic, version = HEADER.unpack_from(mapped, 0)
+    offset, length, trailer_magic = TRAILER.unpack_from(mapped, len(mapped) - TRAILER.size)
+    if magic != MAGIC or trailer_magic != MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    return json.loads(mapped[offset:offset + length])
+
+
+def load_snapshot(session: Session, path: str = SNAPSHOT_PATH) -> Optional[Dict[str, int]]:
+    """Serve the search indexes of a snapshot of this database; None if there is no usable one.
+
+    Returns the number of documents loaded per kind.
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return None
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        footer = read_footer(mapped)
+        if footer is None or footer["database"] != database_key(session.get_bind().url):
+            return None
+        indexes = {kind: InvertedIndex() for kind in footer["kinds"]}
+        view = memoryview(mapped)
+        try:
+            for segment in footer["segments"]:
+                columns = {}
+                for name, typecode in SEGMENT_ARRAYS:
+                    offset, length = segment["arrays"][name]
+                    size = array(typecode).itemsize
+                    columns[name] = view[offset:offset + length * size].cast(typecode)
+                terms = bytes(columns.pop("terms")).decode().split(TERM_SEPARATOR)
+                indexes[segment["kind"]].merge(terms, **columns)
+                for column in columns.values():
+                    column.release()
+        finally:
+            view.release()
+
+    since = datetime.fromisoformat(footer["built_at"]) - CATCH_UP_MARGIN
+    return {kind: len(search_engine.install(session, kind, index, since)) for kind, index in indexes.items()}
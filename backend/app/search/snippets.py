@@ -0,0 +1,84 @@
+"""
+Search result snippets with highlight offsets.
+
+A snippet is the window of at most SNIPPET_LENGTH characters of a text that
+covers the most distinct query terms, found in one pass over the text: the
+words are tokenized and stemmed the way questions_fts indexes them, and a
+sliding window over the matching words keeps the best span. A word matches
+a query term when both have the same FTS term, so "running" highlights
+"runs" and "run" but not "runway", exactly as the full-text search matched
+them.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .stemmer import fts_term, fts_terms
+
+SNIPPET_LENGTH = 200
+ELLIPSIS = "..."
+
+
+def _terms(query_terms: Iterable[str]) -> Set[str]:
+    return {fts_term(term) for term in query_terms if term}
+
+
+def _matches(text: str, terms: Set[str]) -> List[Tuple[int, int, str]]:
+    """(start, end, term) of every word of text matching a query term"""
+    if not terms:
+        return []
+    return [(start, end, term) for start, end, term in fts_terms(text) if term in terms]
+
+
+def highlight(text: Optional[str], query_terms: Iterable[str]) -> List[List[int]]:
+    """[start, end] offsets of the words of text matching the query terms"""
+    if not text:
+        return []
+    return [[start, end] for start, end, _ in _matches(text, _terms(query_terms))]
+
+
+def snippet(text: Optional[str], query_terms: Iterable[str], length: int = SNIPPET_LENGTH) -> Tuple[str, List[List[int]]]:
+    """The best window of text for the query, and the highlight offsets within it"""
+    if not text:
+        return "", []
+    if len(text) <= length:
+        return text, highlight(text, query_terms)
+    matches = _matches(text, _terms(query_terms))
+
+    # Sliding window over the matches: the span of at most length characters
+    # holding the most distinct terms, then the most matches
+    best, best_key = (0, 0), (0, 0)
+    counts: Dict[str, int] = {}
+    left = 0
+    for right, (_, end, term) in enumerate(matches):
+        counts[term] = counts.get(term, 0) + 1
+        while left < right and end - matches[left][0] > length:
+            counts[matches[left][2]] -= 1
+            if not counts[matches[left][2]]:
+                del counts[matches[left][2]]
+            left += 1
+        key = (len(counts), right - left + 1)
+        if key > best_key:
+            best, best_key = (left, right), key
+
+    if not matches:
+        start = 0
+    else:
+        first, last = matches[best[0]][0], matches[best[1]][1]
+        if last - first > length:
+            # A single word longer than the window: show its start
+            start = first
+        else:
+            # Centre the matched span in the window, then skip a cut-off word
+            start = max(0, min(first - (length - (last - first)) // 2, len(text) - length))
+            while 0 < start < first and not text[start - 1].isspace():
+                start += 1
+    end = min(len(text), start + length)
+    if end < len(text):
+        boundary = text.rfind(" ", start, end)
+        if boundary > start + length // 2:
+            end = boundary
+
+    prefix = ELLIPSIS if start > 0 else ""
+    suffix = ELLIPSIS if end < len(text) else ""
+    shift = len(prefix) - start
+    # Matches cut by the window edges are highlighted up to the edge
+    highlights = [[max(s, start) + shift, min(e, end) + shift] for s, e, _ in matches if s < end and e > start]
+    return prefix + text[start:end] + suffix, highlights
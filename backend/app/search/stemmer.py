@@ -0,0 +1,173 @@
+"""
+The terms questions_fts indexes, computed in Python.
+
+questions_fts uses the 'porter unicode61' tokenizer: unicode61 splits text on
+anything that is not a letter or digit, lowercases it and strips diacritics,
+then porter reduces each token to its stem with Martin Porter's algorithm
+(the revised version SQLite implements). fts_term mirrors that pipeline so
+that code outside SQLite, such as snippet highlighting, treats the same
+words as equal that a MATCH does. It agrees with SQLite on Latin script;
+a few case pairs of other scripts are folded differently.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+
+# unicode61 token characters; the underscore is punctuation to it
+_TOKEN = re.compile(r"[^\W_]+")
+
+# SQLite leaves tokens shorter or longer than these (in UTF-8 bytes) unstemmed
+_MIN_STEM_LENGTH = 3
+_MAX_STEM_LENGTH = 64
+
+# Suffix rules per step; the first suffix a word ends with is the only one
+# tried, whether or not its condition holds
+_STEP2 = (
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"), ("izer", "ize"),
+    ("bli", "ble"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous"),
+    ("ization", "ize"), ("ation", "ate"), ("ator", "ate"), ("alism", "al"), ("iveness", "ive"),
+    ("fulness", "ful"), ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+    ("logi", "log"),
+)
+_STEP3 = (
+    ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"), ("ical", "ic"), ("ful", ""), ("ness", ""),
+)
+_STEP4 = (
+    "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment", "ent", "ion", "ou",
+    "ism", "ate", "iti", "ous", "ive", "ize",
+)
+
+
+def _consonant(word: str, i: int) -> bool:
+    c = word[i]
+    if c in "aeiou":
+        return False
+    if c == "y":
+        return i == 0 or not _consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Porter's m: the number of vowel-consonant sequences in the stem"""
+    m = 0
+    vowel = False
+    for i in range(len(stem)):
+        consonant = _consonant(stem, i)
+        if vowel and consonant:
+            m += 1
+        vowel = not consonant
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _consonant(stem, i) for i in range(len(stem)))
+
+
+def _double_consonant(word: str) -> bool:
+    return len(word) >= 2 and word[-1] == word[-2] and _consonant(word, len(word) - 1)
+
+
+def _cvc(word: str) -> bool:
+    """Ends consonant-vowel-consonant, the last not w, x or y"""
+    n = len(word)
+    return (n >= 3 and _consonant(word, n - 1) and not _consonant(word, n - 2)
+            and _consonant(word, n - 3) and word[-1] not in "wxy")
+
+
+def _ends(word: str, suffix: str) -> bool:
+    # SQLite only strips a suffix that leaves a non-empty stem
+    return len(word) > len(suffix) and word.endswith(suffix)
+
+
+def _replace(word: str, rules, minimum: int) -> str:
+    for suffix, replacement in rules:
+        if _ends(word, suffix):
+            stem = word[:-len(suffix)]
+            return stem + replacement if _measure(stem) > minimum else word
+    return word
+
+
+def porter_stem(word: str) -> str:
+    """Stem a lowercased word the way SQLite's porter tokenizer does"""
+    if not _MIN_STEM_LENGTH <= len(word.encode()) <= _MAX_STEM_LENGTH:
+        return word
+
+    # Step 1a: plurals
+    if _ends(word, "sses") or _ends(word, "ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    # Step 1b: past tenses and gerunds
+    if _ends(word, "eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if _ends(word, suffix):
+                if _has_vowel(word[:-len(suffix)]):
+                    word = word[:-len(suffix)]
+                    if word.endswith(("at", "bl", "iz")):
+                        word += "e"
+                    elif _double_consonant(word) and word[-1] not in "lsz":
+                        word = word[:-1]
+                    elif _measure(word) == 1 and _cvc(word):
+                        word += "e"
+                break
+
+    # Step 1c: a final y after a vowel becomes i
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+
+    word = _replace(word, _STEP2, 0)
+    word = _replace(word, _STEP3, 0)
+
+    # Step 4: drop a suffix from stems with m > 1
+    for suffix in _STEP4:
+        if _ends(word, suffix):
+            stem = word[:-len(suffix)]
+            if _measure(stem) > 1 and (suffix != "ion" or stem.endswith(("s", "t"))):
+                word = stem
+            break
+
+    # Step 5: a final e, and a final double l
+    if word.endswith("e"):
+        m = _measure(word[:-1])
+        if m > 1 or (m == 1 and not _cvc(word[:-1])):
+            word = word[:-1]
+    if word.endswith("ll") and _measure(word[:-1]) > 1:
+        word = word[:-1]
+    return word
+
+
+# Case pairs unicode61 folds that str.lower() leaves alone
+_EXTRA_FOLDS = {"µ": "μ", "ſ": "s", "ς": "σ"}
+
+
+def _fold_char(c: str) -> str:
+    folded = _EXTRA_FOLDS.get(c) or c.lower()
+    # Like remove_diacritics=1, only a single diacritic on a Latin letter is dropped
+    decomposed = unicodedata.normalize("NFD", folded)
+    if len(decomposed) == 2 and decomposed[0] < "\x80" and unicodedata.combining(decomposed[1]):
+        return decomposed[0]
+    return folded
+
+
+def _fold(token: str) -> str:
+    # unicode61 folding: case-insensitive and without diacritics
+    return "".join(map(_fold_char, token))
+
+
+@lru_cache(maxsize=65536)
+def fts_term(token: str) -> str:
+    """The term questions_fts indexes for a token"""
+    return porter_stem(_fold(token))
+
+
+def fts_terms(text: Optional[str]) -> Iterator[Tuple[int, int, str]]:
+    """(start, end, term) of every token of text, as questions_fts tokenizes it"""
+    if not text:
+        return
+    for match in _TOKEN.finditer(text):
+        yield match.start(), match.end(), fts_term(match.group())
@@ -0,0 +1,274 @@
+"""
+Typo-tolerant matching of words against question titles and tag names.
+
+The vocabulary (distinct words of question titles, and tag names) is kept
+with a trigram index: each term is split into padded three-letter grams, as
+PostgreSQL's pg_trgm does, and every trigram maps to the sorted array of
+term ids containing it. A misspelled word is matched by counting, over the
+posting arrays of its own trigrams, how many trigrams each term shares with
+it; similarity is shared / (|word trigrams| + |term trigrams| - shared),
+and terms below TRIGRAM_THRESHOLD are ignored.
+
+Term ids only grow, so appending a new term keeps every posting array
+sorted. Terms are reference counted by the titles or tags using them and a
+term whose count drops to zero is no longer suggested; it stays in the
+arrays until the next rebuild. The API builds the vocabulary of its
+database on a background thread (see background.py) and nothing is
+suggested until it is ready; other databases are built on first lookup.
+Vocabularies are kept current from ORM flushes like the other in-process
+indexes.
+"""
+import os
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+from ..db.models import Question, Tag
+from .background import BackgroundBuilds
+from .hooks import BuildLog, database_key, register
+from .index import tokenize
+
+TRIGRAM_THRESHOLD = float(os.getenv("TRIGRAM_THRESHOLD", "0.3"))
+# Shorter words have too few trigrams to correct reliably
+TRIGRAM_MIN_LENGTH = 4
+
+BUILD_BATCH = 5000
+
+
+def trigrams(term: str) -> set:
+    """Padded trigrams of a term: two spaces before and one after"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Reference-counted terms with sorted trigram posting arrays"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._counts = array("I")
+        # Trigram count of each term, for the similarity denominator
+        self._sizes = array("B")
+        self._postings: Dict[str, array] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(1 for count in self._counts if count)
+
+    def __contains__(self, term: str) -> bool:
+        term_id = self._ids.get(term)
+        return term_id is not None and self._counts[term_id] > 0
+
+    def add(self, terms: Iterable[str]):
+        with self._lock:
+            for term in terms:
+                term_id = self._ids.get(term)
+                if term_id is None:
+                    term_id = self._ids[term] = len(self._terms)
+                    self._terms.append(term)
+                    self._counts.append(0)
+                    grams = trigrams(term)
+                    self._sizes.append(min(len(grams), 255))
+                    for gram in grams:
+                        self._postings.setdefault(gram, array("I")).append(term_id)
+                self._counts[term_id] += 1
+
+    def remove(self, terms: Iterable[str]):
+        with self._lock:
+            for term in terms:
+                term_id = self._ids.get(term)
+                if term_id is not None and self._counts[term_id] > 0:
+                    self._counts[term_id] -= 1
+
+    def count(self, term: str) -> int:
+        term_id = self._ids.get(term)
+        return self._counts[term_id] if term_id is not None else 0
+
+    def similar(self, word: str, limit: int = 5, threshold: float = TRIGRAM_THRESHOLD) -> List[Tuple[str, float]]:
+        """(term, similarity) of the terms closest to a word, most similar then most used first"""
+        grams = trigrams(word)
+        with self._lock:
+            shared = Counter()
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    shared.update(postings)
+            scored = []
+            for term_id, common in shared.items():
+                if not self._counts[term_id]:
+                    continue
+                score = common / (len(grams) + self._sizes[term_id] - common)
+                if score >= threshold:
+                    scored.append((-score, -self._counts[term_id], self._terms[term_id], score))
+        scored.sort()
+        return [(term, round(score, 4)) for _, _, term, score in scored[:limit]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "terms": len(self._terms),
+                "live_terms": sum(1 for count in self._counts if count),
+                "trigrams": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+            }
+
+
+def title_terms(title: Optional[str]) -> set:
+    return set(tokenize(title))
+
+
+class TrigramVocabulary:
+    """Per-database trigram indexes of title words and tag names"""
+
+    KINDS = ("words", "tags")
+
+    def __init__(self):
+        # database key -> kind -> index
+        self._indexes: Dict[str, Dict[str, TrigramIndex]] = {}
+        # Changes committed while a database was building, by database key
+        self._building = BuildLog()
+        self._lock = threading.Lock()
+        self.background = BackgroundBuilds(
+            "trigram_vocabulary", lambda session: self._build(session, database_key(session.get_bind().url)))
+        self.builds = 0
+        self.lookups = 0
+        self.unready = 0
+
+    def warm(self, session_factory):
+        """Build the vocabulary of the factory's database in the background, now and whenever it is dropped"""
+        self.background.start(self.background.register(session_factory))
+
+    def get(self, session: Session, kind: str) -> TrigramIndex:
+        """The vocabulary of a kind; empty, so nothing is suggested, while it builds in the background"""
+        key = database_key(session.get_bind().url)
+        with self._lock:
+            indexes = self._indexes.get(key)
+        self.lookups += 1
+        if indexes is None:
+            if self.background.start(key):
+                self.unready += 1
+                return TrigramIndex()
+            indexes = self._build(session, key)
+        return indexes[kind]
+
+    def _build(self, session: Session, key: str) -> Dict[str, TrigramIndex]:
+        with self._lock:
+            self._building.start(key)
+        indexes = {kind: TrigramIndex() for kind in self.KINDS}
+        try:
+            titles = session.execute(select(Question.title).execution_options(yield_per=BUILD_BATCH))
+            for (title,) in titles:
+                indexes["words"].add(title_terms(title))
+            for (name,) in session.execute(select(Tag.name).where(Tag.name.isnot(None))):
+                indexes["tags"].add([name.lower()])
+        except BaseException:
+            with self._lock:
+                self._building.finish(key)
+            raise
+        with self._lock:
+            # Reference counts cannot be replayed safely over rows the build
+            # may already have read, so a build that raced a commit is served
+            # once and redone by the next lookup
+            raced = self._building.finish(key)
+            existing = self._indexes.get(key)
+            if existing is not None:
+                return existing
+            if not raced:
+                self._indexes[key] = indexes
+            self.builds += 1
+        return indexes
+
+    def apply(self, key: str, changes: List[Tuple]):
+        """Apply the vocabulary changes of one committed transaction"""
+        with self._lock:
+            self._building.record(key, changes)
+            indexes = self._indexes.get(key)
+            if indexes is None:
+                return
+            for change in changes:
+                action, kind, terms = change
+                if action == "rebuild":
+                    del self._indexes[key]
+                    return
+                if action == "add":
+                    indexes[kind].add(terms)
+                else:
+                    indexes[kind].remove(terms)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = {
+                key: {kind: index.stats() for kind, index in kinds.items()}
+                for key, kinds in self._indexes.items()
+            }
+        return {"indexes": indexes, "builds": self.builds, "lookups": self.lookups, "unready": self.unready,
+                "background_failures": self.background.failures}
+
+
+trigram_vocabulary = TrigramVocabulary()
+
+
+def correct_query(session: Session, query: str) -> Optional[str]:
+    """The query with misspelled words replaced by the closest title words, or None if nothing changed"""
+    words = trigram_vocabulary.get(session, "words")
+    corrected, changed = [], False
+    for word in tokenize(query):
+        if len(word) >= TRIGRAM_MIN_LENGTH and word not in words:
+            matches = words.similar(word, limit=1)
+            if matches:
+                corrected.append(matches[0][0])
+                changed = True
+                continue
+        corrected.append(word)
+    return " ".join(corrected) if changed else None
+
+
+def _terms(obj, value: Optional[str]) -> Tuple[str, List[str]]:
+    """(kind, terms) contributed by a question title or tag name"""
+    if isinstance(obj, Question):
+        return "words", sorted(title_terms(value))
+    return "tags", [value.lower()] if value else []
+
+
+def _value(obj) -> Optional[str]:
+    return obj.title if isinstance(obj, Question) else obj.name
+
+
+def _collect_vocabulary_changes(session: Session, changes: List[Tuple]):
+    for obj in session.new:
+        if isinstance(obj, (Question, Tag)):
+            changes.append(("add", *_terms(obj, _value(obj))))
+    for obj in session.dirty:
+        if isinstance(obj, (Question, Tag)):
+            history = inspect(obj).attrs["title" if isinstance(obj, Question) else "name"].history
+            if history.added:
+                for value in history.deleted or ():
+                    changes.append(("remove", *_terms(obj, value)))
+                for value in history.added:
+                    changes.append(("add", *_terms(obj, value)))
+    for obj in session.deleted:
+        if isinstance(obj, (Question, Tag)):
+            changes.append(("remove", *_terms(obj, _value(obj))))
+
+
+def _collect_statement_changes(orm_execute_state, changes: List[Tuple]):
+    # Rows inserted or deleted without the ORM cannot be tracked
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is Question.__table__ or table is Tag.__table__:
+            changes.append(("rebuild", None, None))
+
+
+register("trigram_vocabulary", trigram_vocabulary.apply, _collect_vocabulary_changes, _collect_statement_changes)
+
+
+def get_trigram_stats() -> Dict[str, Any]:
+    """Snapshot vocabulary sizes and counters for the metrics endpoint"""
+    return trigram_vocabulary.stats()
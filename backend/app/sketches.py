@@ -0,0 +1,105 @@
+"""
+Compact probabilistic structures for view counting.
+
+HyperLogLog estimates how many distinct viewers a question has in a fixed
+2**precision bytes (1 KiB at the default precision, ~3% standard error), and
+sketches from different processes merge losslessly by taking the register
+maximum. WindowedBloomFilter answers "was this (question, viewer) seen in the
+last window?" with two rotating generations of bits, so a repeat view is
+recognised for at least one and at most two windows without storing keys.
+"""
+import hashlib
+import math
+import time
+from typing import Optional
+
+HLL_PRECISION = 10
+
+
+def _hash64(data: bytes, person: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8, person=person).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, item: bytes) -> bool:
+        """Add an item; True if a register changed"""
+        value = _hash64(item, b"hll")
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, registers: bytes) -> bool:
+        """Merge another sketch's registers in place; True if anything changed"""
+        if len(registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(registers)}")
+        changed = False
+        for index, rank in enumerate(registers):
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+                changed = True
+        return changed
+
+    def estimate(self) -> int:
+        """Estimated number of distinct items added"""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            # Small-range correction: linear counting
+            return round(self.m * math.log(self.m / zeros))
+        return round(raw)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+class WindowedBloomFilter:
+    def __init__(self, window_seconds: float, capacity: int, error_rate: float = 0.01):
+        self.window = window_seconds
+        self.capacity = capacity
+        self.bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._current = bytearray((self.bits + 7) // 8)
+        self._previous = bytearray((self.bits + 7) // 8)
+        self._current_count = 0
+        self._rotated_at = time.monotonic()
+
+    def _positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16, person=b"bloom").digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _contains(bits: bytearray, positions) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def _maybe_rotate(self):
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window or self._current_count >= self.capacity:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._current_count = 0
+            self._rotated_at = now
+
+    def seen(self, key: bytes) -> bool:
+        """Record key; True if it was already seen within the window"""
+        self._maybe_rotate()
+        positions = self._positions(key)
+        if self._contains(self._current, positions):
+            return True
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._current_count += 1
+        return self._contains(self._previous, positions)
@@ -0,0 +1,142 @@
+"""
+Cached totals for paginated listings.
+
+COUNT(*) over a filtered listing costs more than fetching the page itself, so
+totals are cached per (database, kind, filters) for TOTALS_CACHE_TTL seconds.
+Entries are dropped as soon as a committed transaction inserted or deleted
+rows in a table the kind depends on: inserts, deletes and collection changes
+on secondary tables are collected from ORM flushes and from Core/bulk
+statements run through the Session, and applied after commit. Updates do not
+invalidate; the filters they could affect (title search, tag renames) are
+covered by the TTL.
+
+The cache is per process; other workers see a change after at most one TTL.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+TOTALS_CACHE_TTL = float(os.getenv("TOTALS_CACHE_TTL", "60"))
+
+# exact: cached COUNT(*); estimate: a cached exact total, a maintained counter
+# or an upper bound (the highest id), no scan; none: skip
+TOTAL_MODES = ("exact", "estimate", "none")
+
+# Which cached kinds go stale when rows are inserted into or deleted from a table
+TABLE_KINDS = {
+    "questions": {"questions"},
+    "question_tags": {"questions"},
+    "tags": {"tags", "questions"},
+    "users": {"users"},
+    "answers": {"answers"},
+}
+
+PENDING_KEY = "totals_cache_pending"
+
+
+class TotalsCache:
+    def __init__(self, ttl: float = TOTALS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a count that raced a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, database: str, kind: str, filters: Tuple[Hashable, ...], compute: Callable[[], int]) -> int:
+        """Return the cached total for a filter, computing it on a miss"""
+        key = (database, kind, filters)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        total = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, total)
+        return total
+
+    def peek(self, database: str, kind: str, filters: Tuple[Hashable, ...]) -> Optional[int]:
+        """Return the cached total for a filter if there is a fresh one, never computing it"""
+        with self._lock:
+            entry = self._entries.get((database, kind, filters))
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def invalidate(self, *kinds: str):
+        """Drop every cached total of the given kinds"""
+        with self._lock:
+            stale = [key for key in self._entries if key[1] in kinds]
+            for key in stale:
+                del self._entries[key]
+            self._generation += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+totals_cache = TotalsCache()
+
+
+def _mark(session: Session, table_name: Optional[str]):
+    kinds = TABLE_KINDS.get(table_name or "")
+    if kinds:
+        session.info.setdefault(PENDING_KEY, set()).update(kinds)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(session, flush_context):
+    for obj in list(session.new) + list(session.deleted):
+        _mark(session, inspect(obj).mapper.local_table.name)
+    for obj in session.dirty:
+        state = inspect(obj)
+        for relationship in state.mapper.relationships:
+            if relationship.secondary is not None and state.attrs[relationship.key].history.has_changes():
+                _mark(session, relationship.secondary.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_changes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        _mark(orm_execute_state.session, getattr(table, "name", None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    kinds: Set[str] = session.info.pop(PENDING_KEY, set())
+    if kinds:
+        totals_cache.invalidate(*kinds)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def get_totals_cache_stats() -> Dict[str, Any]:
+    """Snapshot hit/miss counters for the metrics endpoint"""
+    return totals_cache.stats()
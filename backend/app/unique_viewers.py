@@ -0,0 +1,142 @@
+"""
+Deduplicated view counting with per-question unique viewer sketches.
+
+Each GET /questions/{id} is attributed to a viewer: the analytics session id
+(which is the auth token for signed-in users) or, failing that, the client
+address and user agent. A WindowedBloomFilter drops repeat views of the same
+question by the same viewer within UNIQUE_VIEWER_WINDOW seconds, so refreshes
+and polling bots neither inflate Question.views nor cost a write. First views
+are added to the question's HyperLogLog sketch, whose estimate is reported as
+unique_viewers.
+
+Sketches are loaded lazily from question_viewer_sketches, kept in a bounded
+LRU (only sketches with no unpersisted changes are evicted) and merged back
+into the table every UNIQUE_VIEWER_PERSIST_INTERVAL seconds and on shutdown.
+"""
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from .async_data_service import AsyncDataService
+from .db.db import AsyncSessionLocal
+from .periodic_flush import PeriodicFlusher
+from .sketches import HyperLogLog, WindowedBloomFilter
+
+UNIQUE_VIEWER_WINDOW = float(os.getenv("UNIQUE_VIEWER_WINDOW", "1800"))
+UNIQUE_VIEWER_DEDUPE_CAPACITY = int(os.getenv("UNIQUE_VIEWER_DEDUPE_CAPACITY", "1000000"))
+UNIQUE_VIEWER_PERSIST_INTERVAL = float(os.getenv("UNIQUE_VIEWER_PERSIST_INTERVAL", "30"))
+UNIQUE_VIEWER_MAX_SKETCHES = int(os.getenv("UNIQUE_VIEWER_MAX_SKETCHES", "10000"))
+
+
+def viewer_key(session_id: Optional[str], client_host: Optional[str], user_agent: Optional[str]) -> str:
+    """Identify a viewer by analytics session, else by client address and agent"""
+    if session_id:
+        return f"session:{session_id}"
+    return f"client:{client_host or 'unknown'}:{user_agent or ''}"
+
+
+class UniqueViewerTracker(PeriodicFlusher):
+    name = "Unique viewer persist"
+
+    def __init__(self, session_factory: Callable[[], Any] = AsyncSessionLocal,
+                 window: float = UNIQUE_VIEWER_WINDOW, capacity: int = UNIQUE_VIEWER_DEDUPE_CAPACITY,
+                 interval: float = UNIQUE_VIEWER_PERSIST_INTERVAL, max_sketches: int = UNIQUE_VIEWER_MAX_SKETCHES):
+        super().__init__(session_factory, interval)
+        self.max_sketches = max_sketches
+        self._recent = WindowedBloomFilter(window, capacity)
+        self._sketches: "OrderedDict[int, HyperLogLog]" = OrderedDict()
+        self._dirty = set()
+        self.views = 0
+        self.repeats = 0
+
+    async def observe(self, data_service: AsyncDataService, question_id: int, viewer: str) -> bool:
+        """Attribute a view to a viewer; False if it repeats one inside the window"""
+        with self._lock:
+            repeat = self._recent.seen(f"{question_id}:{viewer}".encode())
+            if repeat:
+                self.repeats += 1
+                return False
+            self.views += 1
+        sketch = await self._load(data_service, question_id)
+        with self._lock:
+            if sketch.add(viewer.encode()):
+                self._dirty.add(question_id)
+        return True
+
+    def estimate(self, question_id: int) -> Optional[int]:
+        """Current unique viewer estimate, or None if the sketch is not loaded"""
+        with self._lock:
+            sketch = self._sketches.get(question_id)
+            return sketch.estimate() if sketch is not None else None
+
+    async def _load(self, data_service: AsyncDataService, question_id: int) -> HyperLogLog:
+        with self._lock:
+            sketch = self._sketches.get(question_id)
+            if sketch is not None:
+                self._sketches.move_to_end(question_id)
+                return sketch
+        registers = await data_service.get_viewer_sketch(question_id)
+        with self._lock:
+            # Another request may have loaded it while we were reading
+            sketch = self._sketches.get(question_id)
+            if sketch is None:
+                sketch = HyperLogLog(registers=registers)
+                self._sketches[question_id] = sketch
+                self._evict(keep=question_id)
+            return sketch
+
+    def _evict(self, keep: int):
+        # Drop the least recently used sketches that have nothing to persist,
+        # never the one just loaded for the caller
+        excess = len(self._sketches) - self.max_sketches
+        if excess <= 0:
+            return
+        for question_id in list(self._sketches):
+            if excess <= 0:
+                break
+            if question_id != keep and question_id not in self._dirty:
+                del self._sketches[question_id]
+                excess -= 1
+        if len(self._dirty) >= self.max_sketches // 2 and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _drain(self) -> Dict[int, bytes]:
+        # Serialize the changed sketches; the flush merges them into the table
+        with self._lock:
+            changed = {qid: self._sketches[qid].to_bytes() for qid in self._dirty if qid in self._sketches}
+            self._dirty.clear()
+        return changed
+
+    def _restore(self, changed: Dict[int, bytes]):
+        with self._lock:
+            self._dirty.update(changed)
+
+    async def _write(self, changed: Dict[int, bytes]) -> int:
+        async with self._session_factory() as db:
+            await AsyncDataService(db).save_viewer_sketches(changed)
+        return len(changed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = len(self._sketches)
+            dirty = len(self._dirty)
+        return {
+            "running": self.running,
+            "window_seconds": self._recent.window,
+            "interval_seconds": self.interval,
+            "loaded_sketches": loaded,
+            "dirty_sketches": dirty,
+            "max_sketches": self.max_sketches,
+            "views": self.views,
+            "repeats": self.repeats,
+            "persists": self.flushes,
+            "failed_persists": self.failed_flushes,
+            "last_persist_at": self.last_flush_at,
+        }
+
+
+viewer_tracker = UniqueViewerTracker()
+
+
+def get_unique_viewer_stats() -> Dict[str, Any]:
+    """Snapshot dedupe and persistence counters for the metrics endpoint"""
+    return viewer_tracker.stats()
@@ -0,0 +1,103 @@
+"""
+Write-behind buffer for question view counts.
+
+Bumping Question.views inline turns every page read into a write transaction
+that queues on SQLite's single writer lock. Instead, GET /questions/{id}
+records the view here; increments are aggregated per question id in memory
+and written by a background task as one batched UPDATE ... CASE, every
+VIEW_FLUSH_INTERVAL seconds or as soon as VIEW_FLUSH_THRESHOLD distinct
+questions are pending, and once more on shutdown. A crash loses at most one
+flush window of views.
+
+The buffer is bounded: once VIEW_BUFFER_MAX_KEYS distinct questions are
+pending, views of further questions are dropped (and counted) until the next
+flush, while views of already pending questions keep aggregating.
+"""
+import os
+from typing import Any, Callable, Dict
+from .async_data_service import AsyncDataService
+from .db.db import AsyncSessionLocal
+from .periodic_flush import PeriodicFlusher
+
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "5"))
+VIEW_FLUSH_THRESHOLD = int(os.getenv("VIEW_FLUSH_THRESHOLD", "1000"))
+VIEW_BUFFER_MAX_KEYS = int(os.getenv("VIEW_BUFFER_MAX_KEYS", "10000"))
+
+
+class ViewCounterBuffer(PeriodicFlusher):
+    name = "View counter flush"
+
+    def __init__(self, session_factory: Callable[[], Any] = AsyncSessionLocal,
+                 interval: float = VIEW_FLUSH_INTERVAL, threshold: int = VIEW_FLUSH_THRESHOLD,
+                 max_keys: int = VIEW_BUFFER_MAX_KEYS):
+        super().__init__(session_factory, interval)
+        self.threshold = threshold
+        self.max_keys = max_keys
+        self._pending: Dict[int, int] = {}
+        self.recorded = 0
+        self.dropped = 0
+
+    def record(self, question_id: int, views: int = 1) -> bool:
+        """Buffer a view; False if it was dropped because the buffer is full"""
+        with self._lock:
+            if question_id not in self._pending and len(self._pending) >= self.max_keys:
+                self.dropped += views
+                return False
+            self._pending[question_id] = self._pending.get(question_id, 0) + views
+            self.recorded += views
+            size = len(self._pending)
+        if size >= self.threshold and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def pending(self, question_id: int) -> int:
+        """Views recorded for a question but not yet written"""
+        with self._lock:
+            return self._pending.get(question_id, 0)
+
+    def _drain(self) -> Dict[int, int]:
+        with self._lock:
+            counts, self._pending = self._pending, {}
+        return counts
+
+    def _restore(self, counts: Dict[int, int]):
+        # Put back a batch that failed to write, without growing past the bound
+        with self._lock:
+            for question_id, views in counts.items():
+                if question_id in self._pending or len(self._pending) < self.max_keys:
+                    self._pending[question_id] = self._pending.get(question_id, 0) + views
+                else:
+                    self.dropped += views
+
+    async def _write(self, counts: Dict[int, int]) -> int:
+        # One transaction for the whole batch
+        async with self._session_factory() as db:
+            await AsyncDataService(db).add_question_views(counts)
+        return sum(counts.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_questions = len(self._pending)
+            pending_views = sum(self._pending.values())
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "threshold": self.threshold,
+            "max_keys": self.max_keys,
+            "pending_questions": pending_questions,
+            "pending_views": pending_views,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flushed_views": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_at": self.last_flush_at,
+        }
+
+
+view_buffer = ViewCounterBuffer()
+
+
+def get_view_buffer_stats() -> Dict[str, Any]:
+    """Snapshot buffer occupancy and flush counters for the metrics endpoint"""
+    return view_buffer.stats()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Analytics export memory: loading every row vs streaming.
+
+Seeds --logs analytics events into a scratch database, then exports them all
+and reports time and peak Python memory (tracemalloc) for:
+
+    all       the GET /_synthetic/logs approach: .all() and one JSON list
+    ndjson    iter_ndjson() written to a gzip file
+    columnar  write_columnar() chunk files
+
+Streaming peaks should stay flat as --logs grows.
+
+    python benchmarks/bench_analytics_export.py --logs 200000
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.analytics_export import export_statement, iter_ndjson, record_of, write_columnar
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import AnalyticsLog
+
+
+def seed(engine, logs: int):
+    start = datetime(2024, 5, 1)
+    with engine.begin() as connection:
+        for offset in range(0, logs, 10000):
+            connection.execute(insert(AnalyticsLog), [
+                {
+                    "session_id": f"anonymous_bench_{random.randrange(500)}",
+                    "event_type": random.choice(["click", "scroll", "hover", "key_press"]),
+                    "event_data": json.dumps({"payload": {"page_url": "/questions", "x": random.randrange(1000)}}),
+                    "timestamp": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + 10000, logs))
+            ])
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:9} {elapsed:6.2f}s  peak {peak / 2 ** 20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine, args.logs)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        print(f"{args.logs} logs")
+
+        def load_all():
+            rows = db.execute(select(*export_statement().selected_columns)).all()
+            json.dumps([record_of(row) for row in rows])
+
+        def ndjson():
+            with gzip.open(os.path.join(tmp, "logs.ndjson.gz"), "wb") as file:
+                for block in iter_ndjson(db, export_statement()):
+                    file.write(block)
+
+        measure("all", load_all)
+        measure("ndjson", ndjson)
+        measure("columnar", lambda: write_columnar(db, export_statement(), os.path.join(tmp, "columnar")))
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Analytics ingestion throughput: one request per event vs batched events.
+
+Sends the same click/scroll events from N concurrent clients to the app
+in-process (no network), against a scratch database, with the analytics
+write-behind queue running:
+
+    single  POST /_synthetic/log_event, one event per request
+    batch   POST /_synthetic/log_events, --batch events per request
+
+Timings include draining the queue into the database after the last request.
+
+    python benchmarks/bench_analytics_ingest.py --events 5000 --clients 20 --batch 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+def make_event() -> dict:
+    action = random.choice(["click", "scroll", "hover", "key_press"])
+    return {"actionType": action, "payload": {"text": "bench", "page_url": "/questions", "x": random.randrange(1000)}}
+
+
+async def run_clients(client: httpx.AsyncClient, bodies: list, path: str, clients: int) -> int:
+    queue = list(bodies)
+    errors = 0
+
+    async def worker(session_id: str):
+        nonlocal errors
+        while queue:
+            response = await client.post(path, params={"session_id": session_id}, json=queue.pop())
+            errors += response.status_code != 200
+            # In-process requests that never wait on I/O would starve the flusher task
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker(f"anonymous_bench_{i}") for i in range(clients)))
+    return errors
+
+
+async def run_benchmark(events: int, clients: int, batch: int):
+    from main import app
+    from app.analytics_queue import analytics_queue
+
+    analytics_queue.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+        sample = [make_event() for _ in range(events)]
+        runs = {
+            "single": ("/_synthetic/log_event", sample),
+            "batch": ("/_synthetic/log_events", [sample[i:i + batch] for i in range(0, events, batch)]),
+        }
+        print(f"{'path':<8} {'requests':>9} {'seconds':>8} {'events/s':>10} {'errors':>7}")
+        for name, (path, bodies) in runs.items():
+            started = time.perf_counter()
+            errors = await run_clients(client, bodies, path, clients)
+            await analytics_queue.flush()
+            elapsed = time.perf_counter() - started
+            print(f"{name:<8} {len(bodies):>9} {elapsed:>8.2f} {events / elapsed:>10.0f} {errors:>7}")
+    await analytics_queue.stop()
+    stats = analytics_queue.stats()
+    print(f"queue: {stats['flushes']} flushes, mean {stats['mean_flush_ms']}ms, max {stats['max_flush_ms']}ms, "
+          f"{stats['dropped']} dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app creates its engines from DATABASE_URL when first imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app.db.db import init_db
+        init_db()
+        asyncio.run(run_benchmark(args.events, args.clients, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for concurrent API clients.
+
+Seeds a scratch database, starts uvicorn against it (unless --url points at a
+running server) and fires requests from N concurrent clients at a mix of
+list, detail and write endpoints, then reports p50/p95/p99 latency.
+
+    python benchmarks/bench_concurrency.py --clients 200 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+def seed_database(path: str, questions: int):
+    """Create and fill a scratch database before the server imports it"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from benchmarks.bench_engine_profile import seed
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.db.db import create_app_engine
+
+    engine = create_app_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    seed(sessionmaker(bind=engine), questions)
+    engine.dispose()
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become healthy in time")
+
+
+async def run_client(client: httpx.AsyncClient, requests: int, questions: int, latencies: list, errors: list):
+    for _ in range(requests):
+        roll = random.random()
+        question_id = random.randint(1, questions)
+        start = time.perf_counter()
+        try:
+            if roll < 0.5:
+                response = await client.get("/questions/", params={"skip": random.randrange(0, 200), "limit": 15})
+            elif roll < 0.8:
+                response = await client.get(f"/questions/{question_id}")
+            elif roll < 0.9:
+                response = await client.get("/api/tags/")
+            else:
+                response = await client.post(
+                    f"/questions/{question_id}/vote",
+                    params={"user_id": 1, "vote_type": random.choice(["up", "down"])},
+                )
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_benchmark(url: str, clients: int, requests: int, questions: int):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+        await wait_until_healthy(client)
+        latencies: list = []
+        errors: list = []
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(client, requests, questions, latencies, errors) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"clients={clients} requests={len(latencies)} errors={len(errors)} elapsed={elapsed:.2f}s")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"p50={quantiles[49] * 1000:.1f}ms p95={quantiles[94] * 1000:.1f}ms p99={quantiles[98] * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_benchmark(args.url, args.clients, args.requests, args.questions))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed_database(db_path, args.questions)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"},
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(run_benchmark(f"http://127.0.0.1:{args.port}", args.clients, args.requests, args.questions))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
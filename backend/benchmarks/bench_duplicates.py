@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate check latency: ILIKE on the title vs MinHash/LSH.
+
+Seeds the same vocabulary-based questions as bench_question_search.py, then
+checks drafts that copy an existing question with a few words changed:
+
+    ilike  questions whose title ILIKE the draft title's first words
+    lsh    DataService.find_duplicate_questions (after a one-off build)
+
+    python benchmarks/bench_duplicates.py --questions 200000 --lookups 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import Question
+from app.data_service import DataService
+from bench_question_search import VOCABULARY, seed
+
+
+def edited(text: str, changes: int = 3) -> str:
+    words = text.split()
+    for _ in range(changes):
+        words[random.randrange(len(words))] = random.choice(VOCABULARY)
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200000)
+    parser.add_argument("--lookups", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine, args.questions)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        service = DataService(db)
+
+        started = time.perf_counter()
+        service.find_duplicate_questions("warmup", "")
+        print(f"built signatures of {args.questions} questions in {time.perf_counter() - started:.1f}s")
+
+        originals = random.sample(range(1, args.questions + 1), min(args.lookups, args.questions))
+        drafts = [
+            (original, edited(title), edited(body))
+            for original, title, body in (
+                db.execute(select(Question.id, Question.title, Question.body).where(Question.id == i)).one()
+                for i in originals
+            )
+        ]
+
+        found = 0
+        timings = {"ilike": [], "lsh": []}
+        for original, title, body in drafts:
+            started = time.perf_counter()
+            prefix = " ".join(title.split()[:3])
+            db.query(Question.id).filter(Question.title.ilike(f"%{prefix}%")).limit(5).all()
+            timings["ilike"].append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            matches = service.find_duplicate_questions(title, body)
+            timings["lsh"].append((time.perf_counter() - started) * 1000)
+            found += any(match["id"] == original for match in matches)
+
+        for name, values in timings.items():
+            p95 = statistics.quantiles(values, n=20)[-1]
+            print(f"{name:<6} mean {statistics.mean(values):8.2f}ms  p95 {p95:8.2f}ms")
+        print(f"lsh found the original for {found}/{len(drafts)} drafts")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write throughput benchmark for the SQLite engine profiles.
+
+Runs reader threads listing questions and writer threads bumping view counts
+against a scratch database, once per profile, and reports ops/sec and the
+number of "database is locked" errors.
+
+    python benchmarks/bench_engine_profile.py --profiles legacy tuned --seconds 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import ENGINE_PROFILES, create_app_engine
+from app.db.models import User, Question
+from app.data_service import DataService
+
+
+def seed(session_factory, questions: int):
+    db = session_factory()
+    try:
+        user = User(name="bench_user", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        now = datetime.utcnow()
+        db.bulk_save_objects([
+            Question(
+                title=f"Benchmark question {i}",
+                body="lorem ipsum " * 50,
+                author_id=user.id,
+                created_at=now - timedelta(minutes=i),
+                updated_at=now - timedelta(minutes=i),
+            )
+            for i in range(questions)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_profile(profile: str, seconds: float, readers: int, writers: int, questions: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_app_engine(url, profile=profile, pool_size=readers + writers)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(session_factory, questions)
+
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def reader():
+            db = session_factory()
+            done = locked = 0
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        DataService(db).get_questions(skip=random.randrange(0, questions - 20), limit=20)
+                        db.rollback()
+                        done += 1
+                    except OperationalError:
+                        db.rollback()
+                        locked += 1
+            finally:
+                db.close()
+            with lock:
+                counts["reads"] += done
+                counts["locked"] += locked
+
+        def writer():
+            db = session_factory()
+            done = locked = 0
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        DataService(db).increment_question_views(random.randint(1, questions))
+                        done += 1
+                    except OperationalError:
+                        db.rollback()
+                        locked += 1
+            finally:
+                db.close()
+            with lock:
+                counts["writes"] += done
+                counts["locked"] += locked
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    counts["reads_per_sec"] = counts["reads"] / seconds
+    counts["writes_per_sec"] = counts["writes"] / seconds
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "tuned"], choices=sorted(ENGINE_PROFILES))
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.seconds, args.readers, args.writers, args.questions)
+        print(f"{profile:<10} {result['reads_per_sec']:>10.1f} {result['writes_per_sec']:>10.1f} {result['locked']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Question search latency benchmark: substring LIKE scan vs the FTS5 index.
+
+Seeds a scratch database (1M questions with 3 tags each by default) whose
+titles and bodies are drawn from a Zipf-ish vocabulary, then times one page
+of search results per strategy for common, rare and multi-word queries,
+with and without a tag filter:
+
+    like   the original title/body ILIKE '%q%' scan, newest first
+    fts    DataService.search_questions over questions_fts, BM25 ranked
+
+    python benchmarks/bench_question_search.py --questions 1000000 --queries 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import User, Question, Tag, question_tags
+from app.data_service import DataService
+
+BATCH = 20000
+
+
+def make_vocabulary(size: int, seed: int = 0) -> list:
+    """Distinct pseudo-words, so no query is a substring of a whole word family"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice("bcdfgklmnprstvz") + rng.choice("aeiou") for _ in range(rng.randint(2, 4))))
+    return rng.sample(sorted(words), size)
+
+
+VOCABULARY = make_vocabulary(5000)
+# Rank-weighted sampling: the first words are very common, the last are rare
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def text(words: int) -> str:
+    return " ".join(random.choices(VOCABULARY, weights=WEIGHTS, k=words))
+
+
+def seed(engine, questions: int, tags: int = 50):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"name": f"bench_user_{i}", "email": f"bench{i}@example.com", "hashed_password": "x"}
+            for i in range(100)
+        ])
+        conn.execute(insert(Tag), [{"name": f"tag{i}", "count": 0} for i in range(tags)])
+
+        for start in range(0, questions, BATCH):
+            ids = range(start + 1, min(start + BATCH, questions) + 1)
+            # The insert trigger indexes each row as it lands
+            conn.execute(insert(Question), [
+                {
+                    "id": i, "title": text(8), "body": text(80),
+                    "author_id": i % 100 + 1, "votes": random.randint(-5, 500),
+                    "views": 0, "answer_count": 0, "comment_count": 0,
+                    "created_at": now - timedelta(minutes=i), "updated_at": now - timedelta(minutes=i),
+                }
+                for i in ids
+            ])
+            conn.execute(insert(question_tags), [
+                {"question_id": i, "tag_id": (i + k) % tags + 1} for i in ids for k in range(3)
+            ])
+
+
+def search_like(db, query: str, tags, limit: int):
+    q = db.query(Question).filter((Question.title.ilike(f"%{query}%")) | (Question.body.ilike(f"%{query}%")))
+    if tags:
+        q = q.join(Question.tags).filter(Tag.name.in_(tags))
+    q = q.order_by(Question.created_at.desc())
+    total = q.count()
+    return q.limit(limit).all(), total
+
+
+def search_fts(db, query: str, tags, limit: int):
+    return DataService(db).search_questions(query, tags=tags, limit=limit)
+
+
+STRATEGIES = {"like": search_like, "fts": search_fts}
+QUERIES = {
+    "common": lambda: random.choice(VOCABULARY[:10]),
+    "rare": lambda: random.choice(VOCABULARY[-1000:]),
+    "two-word": lambda: f"{random.choice(VOCABULARY[:100])} {random.choice(VOCABULARY[:100])}",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=20, help="queries timed per strategy and kind")
+    parser.add_argument("--limit", type=int, default=15)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        started = time.perf_counter()
+        seed(engine, args.questions)
+        print(f"seeded and indexed {args.questions} questions in {time.perf_counter() - started:.1f}s")
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        print(f"{'strategy':<10} {'query':<10} {'tag':<5} {'mean ms':>9} {'p95 ms':>9}")
+        for kind, make_query in QUERIES.items():
+            for tags in (None, ["tag7"]):
+                # Same query sample for every strategy
+                queries = [make_query() for _ in range(args.queries)]
+                for name in args.strategies:
+                    timings = []
+                    for query in queries:
+                        db = session_factory()
+                        try:
+                            started = time.perf_counter()
+                            STRATEGIES[name](db, query, tags, args.limit)
+                            timings.append((time.perf_counter() - started) * 1000)
+                        finally:
+                            db.close()
+                    p95 = statistics.quantiles(timings, n=20)[-1]
+                    print(f"{name:<10} {kind:<10} {'yes' if tags else 'no':<5} {statistics.mean(timings):>9.2f} {p95:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Listing-page latency benchmark: full ORM objects vs the summary projection.
+
+Seeds a scratch database (100k questions with 10 answers and 3 tags each by
+default), then times one page of GET /questions/ worth of data per strategy:
+
+    joinedload  the original author + tags + answers joinedload and Python
+                excerpt cut, as the router used to do
+    orm         DataService.get_questions (author joined, tags selectin-loaded)
+    summary     DataService.get_question_summaries projection rows
+
+    python benchmarks/bench_question_summaries.py --questions 100000 --answers 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import User, Question, Answer, Tag, question_tags
+from app.data_service import DataService, EXCERPT_LENGTH
+
+BATCH = 20000
+
+
+def seed(engine, questions: int, answers: int, tags: int = 50):
+    now = datetime.utcnow()
+    body = "lorem ipsum dolor sit amet " * 40
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"name": f"bench_user_{i}", "email": f"bench{i}@example.com", "hashed_password": "x"}
+            for i in range(100)
+        ])
+        conn.execute(insert(Tag), [{"name": f"tag{i}", "count": 0} for i in range(tags)])
+
+        for start in range(0, questions, BATCH):
+            ids = range(start + 1, min(start + BATCH, questions) + 1)
+            conn.execute(insert(Question), [
+                {
+                    "id": i, "title": f"Benchmark question {i}", "body": body,
+                    "author_id": i % 100 + 1, "votes": random.randint(-5, 500),
+                    "views": 0, "answer_count": answers, "comment_count": 0,
+                    "created_at": now - timedelta(minutes=i), "updated_at": now - timedelta(minutes=i),
+                }
+                for i in ids
+            ])
+            conn.execute(insert(question_tags), [
+                {"question_id": i, "tag_id": (i + k) % tags + 1} for i in ids for k in range(3)
+            ])
+            conn.execute(insert(Answer), [
+                {
+                    "body": body, "author_id": (i + k) % 100 + 1, "question_id": i,
+                    "votes": 0, "is_accepted": False, "comment_count": 0,
+                    "created_at": now, "updated_at": now,
+                }
+                for i in ids for k in range(answers)
+            ])
+
+
+def list_joinedload(db, skip: int, limit: int, sort: str):
+    order = {"newest": Question.created_at, "votes": Question.votes, "active": Question.updated_at}[sort]
+    questions = (
+        db.query(Question)
+        .options(joinedload(Question.author), joinedload(Question.tags), joinedload(Question.answers))
+        .order_by(order.desc())
+        .offset(skip).limit(limit).all()
+    )
+    return [(q.id, q.body[:EXCERPT_LENGTH], [t.name for t in q.tags], len(q.answers)) for q in questions]
+
+
+def list_orm(db, skip: int, limit: int, sort: str):
+    questions = DataService(db).get_questions(skip=skip, limit=limit, sort=sort)
+    return [(q.id, q.body[:EXCERPT_LENGTH], [t.name for t in q.tags], q.answer_count) for q in questions]
+
+
+def list_summary(db, skip: int, limit: int, sort: str):
+    return DataService(db).get_question_summaries(skip=skip, limit=limit, sort=sort)
+
+
+STRATEGIES = {"joinedload": list_joinedload, "orm": list_orm, "summary": list_summary}
+
+
+def time_strategy(session_factory, fn, pages: int, limit: int, questions: int, sort: str) -> list:
+    timings = []
+    for _ in range(pages):
+        skip = random.randrange(0, min(questions - limit, 50 * limit))
+        db = session_factory()
+        try:
+            started = time.perf_counter()
+            fn(db, skip, limit, sort)
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--answers", type=int, default=10, help="answers per question")
+    parser.add_argument("--pages", type=int, default=50, help="pages timed per strategy and sort")
+    parser.add_argument("--limit", type=int, default=15)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        started = time.perf_counter()
+        seed(engine, args.questions, args.answers)
+        print(f"seeded {args.questions} questions x {args.answers} answers in {time.perf_counter() - started:.1f}s")
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        print(f"{'strategy':<12} {'sort':<8} {'mean ms':>9} {'p95 ms':>9}")
+        for sort in ("newest", "votes", "active"):
+            for name in args.strategies:
+                timings = time_strategy(session_factory, STRATEGIES[name], args.pages, args.limit, args.questions, sort)
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                print(f"{name:<12} {sort:<8} {statistics.mean(timings):>9.2f} {p95:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
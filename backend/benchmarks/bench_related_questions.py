@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Related questions benchmark: vector build time and lookup latency.
+
+Seeds the same vocabulary-based questions as bench_question_search.py, then
+times a full rebuild of the related-question vectors in-process and across a
+process pool, followed by GET /questions/{id}/related lookups for random
+questions:
+
+    python benchmarks/bench_related_questions.py --questions 200000 --workers 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.data_service import DataService
+from app.search import rebuild_related
+from bench_question_search import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine, args.questions)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+        for workers in sorted({1, args.workers}):
+            started = time.perf_counter()
+            stats = rebuild_related(db, workers)
+            print(f"rebuild with {workers} worker(s): {time.perf_counter() - started:.1f}s, "
+                  f"{stats['terms']} terms, {stats['postings']} postings")
+
+        service = DataService(db)
+        timings = []
+        for question_id in random.sample(range(1, args.questions + 1), min(args.lookups, args.questions)):
+            started = time.perf_counter()
+            service.get_related_questions(question_id, 10)
+            timings.append((time.perf_counter() - started) * 1000)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"related lookup: mean {statistics.mean(timings):.2f}ms, p95 {p95:.2f}ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
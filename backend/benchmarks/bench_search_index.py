@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+/search latency benchmark: ILIKE scans vs the in-process inverted index.
+
+Seeds the same vocabulary-based questions as bench_question_search.py, then
+times one page of question search results per strategy, plus the one-off
+cost and size of building the index:
+
+    ilike  title/body ILIKE '%q%' over questions, highest votes first
+    index  DataService.search_entities("questions", ...), TF-IDF ranked
+
+    python benchmarks/bench_search_index.py --questions 200000 --queries 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import Question
+from app.data_service import DataService
+from app.search import search_engine
+from bench_question_search import QUERIES, seed
+
+
+def search_ilike(db, query: str, page: int, limit: int):
+    words = query.split()
+    q = db.query(Question)
+    for word in words:
+        q = q.filter((Question.title.ilike(f"%{word}%")) | (Question.body.ilike(f"%{word}%")))
+    total = q.count()
+    return q.order_by(Question.votes.desc()).offset((page - 1) * limit).limit(limit).all(), total
+
+
+def search_index(db, query: str, page: int, limit: int):
+    return DataService(db).search_entities("questions", query, page=page, limit=limit)
+
+
+STRATEGIES = {"ilike": search_ilike, "index": search_index}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=20, help="queries timed per strategy and kind")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine, args.questions)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = session_factory()
+        started = time.perf_counter()
+        search_index(db, "warmup", 1, args.limit)
+        db.close()
+        sizes = next(iter(search_engine.stats()["indexes"].values()))["questions"]
+        print(f"built index over {sizes['documents']} questions in {time.perf_counter() - started:.1f}s: "
+              f"{sizes['terms']} terms, {sizes['postings']} postings")
+
+        print(f"{'strategy':<10} {'query':<10} {'mean ms':>9} {'p95 ms':>9}")
+        for kind, make_query in QUERIES.items():
+            queries = [make_query() for _ in range(args.queries)]
+            for name, fn in STRATEGIES.items():
+                timings = []
+                for query in queries:
+                    db = session_factory()
+                    try:
+                        started = time.perf_counter()
+                        fn(db, query, 1, args.limit)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    finally:
+                        db.close()
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                print(f"{name:<10} {kind:<10} {statistics.mean(timings):>9.2f} {p95:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
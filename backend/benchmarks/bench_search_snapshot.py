@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Search index startup cost: lazy build vs loading an offline snapshot.
+
+Seeds the same vocabulary-based questions as bench_question_search.py, then
+times:
+
+    build  build_snapshot() with --workers tokenizer processes
+    lazy   the first DataService.search_entities("questions", ...) call
+    load   load_snapshot(), including the catch-up pass over the table
+
+    python benchmarks/bench_search_snapshot.py --questions 200000 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.data_service import DataService
+from app.search import search_engine
+from app.search.snapshot import build_snapshot, load_snapshot
+from bench_question_search import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine, args.questions)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        path = os.path.join(tmp, "index.bin")
+
+        started = time.perf_counter()
+        result = build_snapshot(db, path, kinds=["questions"], workers=args.workers)
+        print(f"build  {time.perf_counter() - started:6.1f}s  ({result['bytes'] / 2 ** 20:.0f} MiB, {args.workers} workers)")
+
+        started = time.perf_counter()
+        DataService(db).search_entities("questions", "warmup")
+        print(f"lazy   {time.perf_counter() - started:6.1f}s")
+
+        search_engine.clear()
+        started = time.perf_counter()
+        load_snapshot(db, path)
+        print(f"load   {time.perf_counter() - started:6.1f}s")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Session log page latency as a session grows.
+
+Seeds one session with N analytics events (a rare "error" type every 100th),
+then times DataService.get_session_logs for the newest page, a page deep in
+the session via its cursor, and the newest page filtered to the rare type.
+Times should stay flat across sizes.
+
+    python benchmarks/bench_session_logs.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.data_service import DataService
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import AnalyticsLog
+from app.pagination import encode_cursor
+
+REPEAT = 50
+
+
+def seed(engine, session_id: str, logs: int):
+    start = datetime(2024, 5, 1)
+    with engine.begin() as connection:
+        for offset in range(0, logs, 10000):
+            connection.execute(insert(AnalyticsLog), [
+                {"session_id": session_id, "event_type": "error" if i % 100 == 0 else "click",
+                 "event_data": "{}", "timestamp": start + timedelta(seconds=i)}
+                for i in range(offset, min(offset + 10000, logs))
+            ])
+    return start + timedelta(seconds=logs // 2)
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - started) / REPEAT * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        service = DataService(db)
+        print(f"{'logs':>8} {'newest':>9} {'deep':>9} {'filtered':>9}   (ms per page of 100)")
+        for size in args.sizes:
+            session_id = f"session_{size}"
+            middle = encode_cursor([seed(engine, session_id, size), 10 ** 9])
+            newest = timed(lambda: service.get_session_logs(session_id))
+            deep = timed(lambda: service.get_session_logs(session_id, before=middle))
+            filtered = timed(lambda: service.get_session_logs(session_id, event_type="error"))
+            print(f"{size:>8} {newest:>9.2f} {deep:>9.2f} {filtered:>9.2f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tag autocomplete latency benchmark: get_tags(search=...) vs the sorted array.
+
+Seeds a scratch database with --tags random tag names and usage counts, then
+times per-keystroke lookups for prefixes of 1-4 characters:
+
+    ilike         DataService.get_tags(search=prefix, sort="popular")
+    autocomplete  DataService.autocomplete_tags(prefix), cold (first lookup
+                  of a prefix) and warm (cached top-k)
+
+    python benchmarks/bench_tag_autocomplete.py --tags 50000 --lookups 200
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.db import create_app_engine
+from app.db.migrations import run_migrations
+from app.db.models import Tag
+from app.data_service import DataService
+
+
+def seed(engine, tags: int):
+    names = set()
+    while len(names) < tags:
+        names.add("".join(random.choices(string.ascii_lowercase, k=random.randint(3, 12))))
+    with engine.begin() as conn:
+        conn.execute(insert(Tag), [{"name": name, "count": int(random.paretovariate(1.2))} for name in names])
+
+
+def timed(fn, prefixes) -> list:
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        fn(prefix)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=200, help="lookups timed per strategy and prefix length")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_app_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        seed(engine, args.tags)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        service = DataService(db)
+
+        started = time.perf_counter()
+        service.autocomplete_tags("warmup")
+        print(f"built array of {args.tags} tags in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        print(f"{'strategy':<18} {'prefix':>6} {'mean us':>10} {'p95 us':>10}")
+        for length in (1, 2, 3, 4):
+            prefixes = ["".join(random.choices(string.ascii_lowercase, k=length)) for _ in range(args.lookups)]
+            results = {
+                "ilike": timed(lambda p: service.get_tags(search=p, limit=10, sort="popular", total_mode="none"), prefixes[:20]),
+                "autocomplete cold": timed(lambda p: service.autocomplete_tags(p), prefixes),
+                "autocomplete warm": timed(lambda p: service.autocomplete_tags(p), prefixes),
+            }
+            for name, timings in results.items():
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                print(f"{name:<18} {length:>6} {statistics.mean(timings):>10.1f} {p95:>10.1f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Build the question and answer search index snapshot offline.
+
+Run after restores or bulk imports so the API loads the indexes at startup
+instead of tokenizing every row on its first search. Tokenizing is spread
+over a process pool; --resume continues an interrupted build.
+"""
+import argparse
+import sys
+import os
+import time
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db import SessionLocal, init_db
+from app.search.snapshot import SNAPSHOT_CHUNK, SNAPSHOT_KINDS, SNAPSHOT_PATH, build_snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=SNAPSHOT_PATH, help="snapshot file (default: SEARCH_INDEX_PATH)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="tokenizer processes")
+    parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK, help="rows read and tokenized per chunk")
+    parser.add_argument("--kinds", nargs="+", choices=SNAPSHOT_KINDS, default=list(SNAPSHOT_KINDS))
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted build")
+    args = parser.parse_args()
+
+    print(f"Building search index snapshot with {args.workers} worker(s)...")
+    init_db()
+    started = time.perf_counter()
+
+    def report(kind, done, total):
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"  {kind}: {done}/{total} rows ({100 * done / max(total, 1):.0f}%, {rate:.0f} rows/s)")
+
+    db = SessionLocal()
+    try:
+        result = build_snapshot(db, args.output, args.kinds, args.workers, args.chunk_size, args.resume, report)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with --resume to continue")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for kind, documents in result["documents"].items():
+        print(f"✓ {kind}: {documents} document(s)")
+    print(f"Wrote {result['path']} ({result['bytes']} bytes, {result['segments']} segments) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Export analytics logs as NDJSON or gzip-compressed columnar chunk files.
+
+Rows are streamed from the database in chunks, so memory stays flat however
+large the export. An --output ending in .gz is gzip-compressed; "-" writes
+NDJSON to stdout. The columnar format writes a directory of chunk files and a
+manifest.json.
+
+    python export_analytics.py --start 2024-05-01 --end 2024-05-02 --output day.ndjson.gz
+    python export_analytics.py --format columnar --output exports/2024-05-01 --start 2024-05-01 --end 2024-05-02
+"""
+import argparse
+import gzip
+import sys
+import os
+import time
+from datetime import datetime
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db import SessionLocal, init_db
+from app.analytics_export import COLUMNAR_CHUNK, EXPORT_CHUNK, export_statement, iter_ndjson, write_columnar
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=("ndjson", "columnar"), default="ndjson")
+    parser.add_argument("--output", required=True, help="NDJSON file (.gz to compress, - for stdout) or columnar directory")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="first timestamp exported (inclusive)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="timestamp to stop at (exclusive)")
+    parser.add_argument("--session-id")
+    parser.add_argument("--event-type")
+    parser.add_argument("--fetch-size", type=int, default=EXPORT_CHUNK, help="rows fetched from the database at a time")
+    parser.add_argument("--chunk-rows", type=int, default=COLUMNAR_CHUNK, help="rows per columnar chunk file")
+    args = parser.parse_args()
+
+    # Progress goes to stderr so NDJSON can be piped from stdout
+    log = sys.stderr
+    print("Exporting analytics logs...", file=log)
+    init_db()
+    started = time.perf_counter()
+
+    try:
+        statement = export_statement(args.start, args.end, args.session_id, args.event_type, args.fetch_size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db = SessionLocal()
+    try:
+        if args.format == "columnar":
+            manifest = write_columnar(db, statement, args.output, args.chunk_rows)
+            rows = manifest["rows"]
+            print(f"✓ {len(manifest['files'])} chunk file(s) and manifest.json in {args.output}", file=log)
+        else:
+            rows = 0
+            if args.output == "-":
+                output = sys.stdout.buffer
+            elif args.output.endswith(".gz"):
+                output = gzip.open(args.output, "wb")
+            else:
+                output = open(args.output, "wb")
+            try:
+                for block in iter_ndjson(db, statement):
+                    output.write(block)
+                    rows += block.count(b"\n")
+            finally:
+                if output is not sys.stdout.buffer:
+                    output.close()
+    finally:
+        db.close()
+
+    print(f"✓ {rows} log(s) exported in {time.perf_counter() - started:.1f}s", file=log)
+
+if __name__ == "__main__":
+    main()
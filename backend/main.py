@@ -1,9 +1,20 @@
+import asyncio
+import os
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import questions, users, tags, search, answers, synthetic, auth, comments
-from app.db.db import init_db, get_db, drop_db, populate_database
+from app.routers import questions, users, tags, search, answers, synthetic, auth, comments, metrics
+from app.db.db import init_db, get_db, get_async_db, dispose_async_engines, drop_db, populate_database, SessionLocal
 from app.db.models import User
-from sqlalchemy.orm import Session
+from app.search.autocomplete import tag_autocomplete
+from app.search.duplicates import duplicate_detector
+from app.search.engine import search_engine
+from app.search.related import related_questions
+from app.search.snapshot import SNAPSHOT_PATH, load_snapshot
+from app.search.trigrams import trigram_vocabulary
+from app.view_counter import view_buffer
+from app.analytics_queue import analytics_queue
+from app.unique_viewers import viewer_tracker
+from sqlalchemy.ext.asyncio import AsyncSession
 
 app = FastAPI(
     title="Stack Overflow Clone API",
@@ -30,6 +41,7 @@ app.include_router(users.router)
 app.include_router(tags.router)
 app.include_router(search.router)
 app.include_router(synthetic.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -40,12 +52,12 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """Health check endpoint that verifies database connectivity"""
     try:
         # Try to make a simple database query
         from sqlalchemy import text
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
@@ -96,6 +108,45 @@ async def startup_event():
     finally:
         db.close()
 
+@app.on_event("startup")
+async def load_search_snapshot():
+    """Serve the question and answer search indexes from the offline-built snapshot, if there is one"""
+    if not os.path.exists(SNAPSHOT_PATH):
+        return
+    db = next(get_db())
+    try:
+        loaded = await asyncio.to_thread(load_snapshot, db, SNAPSHOT_PATH)
+        if loaded is None:
+            print(f"Search index snapshot {SNAPSHOT_PATH} is for another database or version, ignoring it")
+        else:
+            print(f"Loaded search index snapshot: {loaded}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def build_search_indexes():
+    """Build the in-process search indexes on background threads instead of in the first lookup"""
+    search_engine.warm(SessionLocal)
+    tag_autocomplete.warm(SessionLocal)
+    related_questions.warm(SessionLocal)
+    duplicate_detector.warm(SessionLocal)
+    trigram_vocabulary.warm(SessionLocal)
+
+@app.on_event("startup")
+async def start_view_buffer():
+    """Start the periodic flush of buffered question views, viewer sketches and analytics events"""
+    view_buffer.start()
+    viewer_tracker.start()
+    analytics_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered views, sketches and analytics events, then release pooled async connections"""
+    await view_buffer.stop()
+    await viewer_tracker.stop()
+    await analytics_queue.stop()
+    await dispose_async_engines()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Apply pending schema migrations, or list them with --status
+"""
+import argparse
+import sys
+import os
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db import engine, init_db
+from app.db.migrations import MIGRATIONS, schema_migrations, get_applied_versions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    args = parser.parse_args()
+
+    if not args.status:
+        print("Applying migrations...")
+        init_db()
+
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        applied = get_applied_versions(connection)
+
+    for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+        state = "applied" if version in applied else "pending"
+        print(f"{version:>4}  {state:<8} {description}")
+
+if __name__ == "__main__":
+    main()
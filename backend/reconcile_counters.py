@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Recompute the denormalized answer/comment counters from the source tables
+"""
+import sys
+import os
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db import engine, init_db
+from app.db.counters import reconcile_counters
+
+def main():
+    print("Reconciling counters...")
+    init_db()
+
+    with engine.begin() as connection:
+        fixed = reconcile_counters(connection)
+
+    for counter, rows in fixed.items():
+        print(f"✓ {counter}: {rows} row(s) corrected")
+
+    print("Counter reconciliation complete!")
+
+if __name__ == "__main__":
+    main()
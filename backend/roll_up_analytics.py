@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Add analytics logs written since the last run to the rollup tables
+"""
+import sys
+import os
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db import engine, init_db
+from app.db.rollups import roll_up_analytics
+
+def main():
+    print("Rolling up analytics logs...")
+    init_db()
+
+    result = roll_up_analytics(engine)
+
+    print(f"✓ {result['rolled_up']} log(s) rolled up in {result['chunks']} chunk(s)")
+    print(f"✓ High-water mark: log id {result['high_water_mark']}")
+
+    print("Analytics rollup complete!")
+
+if __name__ == "__main__":
+    main()
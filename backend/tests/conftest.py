@@ -13,6 +13,23 @@ def client():
     """Create a test client for the FastAPI app"""
     return TestClient(app)
 
+@pytest.fixture
+def db_session(tmp_path):
+    """A migrated scratch SQLite database populated with the sample data"""
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.db.db import create_app_engine, populate_database
+    from app.db.migrations import run_migrations
+
+    engine = create_app_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    populate_database(session)
+    yield session
+    session.close()
+    engine.dispose()
+
 @pytest.fixture
 def mock_data():
     """Create mock data for testing"""
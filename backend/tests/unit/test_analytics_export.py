@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+import pytest
+from fastapi import status
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app.analytics_export import export_statement, iter_ndjson, write_columnar
+from app.analytics_queue import AnalyticsQueue
+from app.db.db import create_async_app_engine, get_async_db
+from app.db.models import AnalyticsLog
+from app.routers import synthetic
+from main import app
+
+DAY = datetime(2024, 5, 1)
+
+
+@pytest.fixture
+def logs(db_session):
+    """A day of logs for two sessions, plus one the day after"""
+    db_session.add_all(
+        AnalyticsLog(session_id=f"s{i % 2}", event_type="click" if i % 3 else "scroll",
+                     event_data=json.dumps({"payload": {"i": i}}), timestamp=DAY + timedelta(minutes=i))
+        for i in range(25)
+    )
+    db_session.add(AnalyticsLog(session_id="s0", event_type="click", event_data="{}", timestamp=DAY + timedelta(days=1)))
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def export_api(db_session, monkeypatch):
+    """Route the API's async sessions and analytics queue to the scratch database"""
+    url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_app_engine(url, poolclass=NullPool)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    monkeypatch.setattr(synthetic, "analytics_queue", AnalyticsQueue(session_factory=factory))
+    yield
+    app.dependency_overrides.pop(get_async_db, None)
+    asyncio.run(engine.dispose())
+
+
+def day_params(**params):
+    return {"start": DAY.isoformat(), "end": (DAY + timedelta(days=1)).isoformat(), **params}
+
+
+class TestAnalyticsExport:
+    """Test streaming analytics log exports"""
+
+    def test_ndjson_in_fetch_sized_blocks(self, logs):
+        """NDJSON comes out one block per fetched chunk, oldest first"""
+        blocks = list(iter_ndjson(logs, export_statement(DAY, DAY + timedelta(days=1), chunk=10)))
+        assert [block.count(b"\n") for block in blocks] == [10, 10, 5]
+        records = [json.loads(line) for block in blocks for line in block.splitlines()]
+        assert [record["timestamp"] for record in records] == sorted(record["timestamp"] for record in records)
+        assert records[0]["event_data"] == json.dumps({"payload": {"i": 0}})
+
+    def test_filters(self, logs):
+        statement = export_statement(session_id="s1", event_type="scroll")
+        records = [json.loads(line) for block in iter_ndjson(logs, statement) for line in block.splitlines()]
+        assert records and all((r["session_id"], r["event_type"]) == ("s1", "scroll") for r in records)
+
+    def test_invalid_range(self):
+        with pytest.raises(ValueError):
+            export_statement(DAY, DAY)
+
+    def test_range_is_index_backed(self, logs):
+        """Day and session exports read an index in export order, without a sort"""
+        for statement in (export_statement(DAY, DAY + timedelta(days=1)), export_statement(session_id="s0")):
+            compiled = statement.compile(logs.get_bind(), compile_kwargs={"literal_binds": True})
+            plan = " ".join(row[3] for row in logs.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+            assert "USING INDEX" in plan and "TEMP B-TREE" not in plan
+
+    def test_columnar_chunks(self, logs, tmp_path):
+        manifest = write_columnar(logs, export_statement(DAY, DAY + timedelta(days=1), chunk=7), str(tmp_path), chunk_rows=10)
+        assert manifest["rows"] == 25
+        assert [entry["rows"] for entry in manifest["files"]] == [10, 10, 5]
+        with gzip.open(tmp_path / manifest["files"][0]["file"], "rt") as file:
+            chunk = json.load(file)
+        assert chunk["rows"] == 10 and len(chunk["data"]["id"]) == 10
+        assert chunk["data"]["id"][0] == manifest["files"][0]["first_id"]
+        assert json.loads((tmp_path / "manifest.json").read_text())["rows"] == 25
+
+    def test_export_endpoint_streams_ndjson(self, client, logs, export_api):
+        response = client.get("/_synthetic/logs/export", params=day_params(session_id="s0"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == 13 and {record["session_id"] for record in records} == {"s0"}
+
+    def test_export_endpoint_compressed(self, client, logs, export_api):
+        response = client.get("/_synthetic/logs/export", params=day_params(compress="true"))
+        assert response.headers["content-type"] == "application/gzip"
+        assert len(gzip.decompress(response.content).splitlines()) == 25
+
+    def test_export_endpoint_flushes_queued_events_on_request(self, client, db_session, export_api):
+        client.post("/_synthetic/log_event", params={"session_id": "queued"}, json={"actionType": "click"})
+        assert client.get("/_synthetic/logs/export", params={"session_id": "queued"}).text == ""
+        response = client.get("/_synthetic/logs/export", params={"session_id": "queued", "flush": "true"})
+        assert len(response.text.splitlines()) == 1
+
+    def test_export_endpoint_reads_from_the_reader_pool(self, client, logs, export_api):
+        sessions = []
+        override = app.dependency_overrides[get_async_db]
+
+        async def recording():
+            async for session in override():
+                sessions.append(session)
+                yield session
+
+        app.dependency_overrides[get_async_db] = recording
+        response = client.get("/_synthetic/logs/export", params=day_params())
+        assert len(response.text.splitlines()) == 25
+        assert sessions[0].info["read_only"] is True
+
+    def test_export_endpoint_invalid_range(self, client, export_api):
+        response = client.get("/_synthetic/logs/export", params={"start": DAY.isoformat(), "end": DAY.isoformat()})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.analytics_queue import AnalyticsQueue
+from app.db.db import create_async_app_engine
+from app.db.models import AnalyticsLog
+
+
+@pytest.fixture
+def async_factory(db_session):
+    """An async session factory on the scratch database"""
+    url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_app_engine(url)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def rows(count, session_id="queue"):
+    return [{"session_id": session_id, "event_type": f"event_{i}", "event_data": "{}"} for i in range(count)]
+
+
+def logged(db_session, session_id="queue"):
+    db_session.expire_all()
+    return [log.event_type for log in
+            db_session.query(AnalyticsLog).filter(AnalyticsLog.session_id == session_id).order_by(AnalyticsLog.id)]
+
+
+class TestAnalyticsQueue:
+    """Test the write-behind analytics queue"""
+
+    def test_flush_writes_in_order(self, db_session, async_factory):
+        queue = AnalyticsQueue(session_factory=async_factory, batch_size=2)
+        assert asyncio.run(queue.put(rows(3))) == 3
+        assert asyncio.run(queue.flush()) == 3
+        assert logged(db_session) == ["event_0", "event_1", "event_2"]
+        stats = queue.stats()
+        assert (stats["depth"], stats["flushes"], stats["flushed_events"]) == (0, 1, 3)
+        assert stats["last_flush_ms"] is not None
+
+    def test_drop_newest(self):
+        queue = AnalyticsQueue(session_factory=None, max_size=2)
+        assert asyncio.run(queue.put(rows(3))) == 2
+        assert [row["event_type"] for _, row in queue._queue] == ["event_0", "event_1"]
+        assert queue.stats()["dropped"] == 1
+
+    def test_drop_oldest(self):
+        queue = AnalyticsQueue(session_factory=None, max_size=2, policy="drop_oldest")
+        assert asyncio.run(queue.put(rows(3))) == 3
+        assert [row["event_type"] for _, row in queue._queue] == ["event_1", "event_2"]
+        assert queue.stats()["dropped"] == 1
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            AnalyticsQueue(session_factory=None, policy="spill")
+
+    def test_block_waits_for_flush(self, db_session, async_factory):
+        """A full queue under block makes the producer wait for the flusher"""
+        queue = AnalyticsQueue(session_factory=async_factory, interval=60, batch_size=100,
+                               max_size=2, policy="block", enqueue_timeout=5)
+
+        async def run():
+            queue.start()
+            accepted = await queue.put(rows(3))
+            await queue.stop()
+            return accepted
+
+        assert asyncio.run(run()) == 3
+        assert logged(db_session) == ["event_0", "event_1", "event_2"]
+        assert queue.stats()["dropped"] == 0
+
+    def test_failed_flush_keeps_events(self):
+        def broken_factory():
+            raise RuntimeError("database is locked")
+
+        queue = AnalyticsQueue(session_factory=broken_factory)
+        asyncio.run(queue.put(rows(2)))
+        assert asyncio.run(queue.flush()) == 0
+        assert len(queue) == 2
+        assert queue.stats()["failed_flushes"] == 1
+
+    def test_unwritable_rows_are_rejected(self, db_session, async_factory):
+        """A row the database cannot bind is dropped; the rest of the batch is written"""
+        queue = AnalyticsQueue(session_factory=async_factory)
+        batch = rows(5)
+        batch[2]["event_type"] = {"not": "a string"}
+        asyncio.run(queue.put(batch))
+        assert asyncio.run(queue.flush()) == 4
+        assert logged(db_session) == ["event_0", "event_1", "event_3", "event_4"]
+        stats = queue.stats()
+        assert (stats["depth"], stats["rejected"], stats["failed_flushes"]) == (0, 1, 0)
+
+    def test_failure_after_partial_write_keeps_only_the_rest(self):
+        """Events already written or rejected are not queued again when a later slice fails"""
+        queue = AnalyticsQueue(session_factory=None)
+        written = []
+
+        async def insert(entries):
+            types = [row["event_type"] for _, row in entries]
+            if "event_1" in types:
+                raise IntegrityError("INSERT", {}, Exception("bad row"))
+            if "event_3" in types:
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            written.extend(types)
+
+        queue._insert = insert
+        asyncio.run(queue.put(rows(4)))
+        assert asyncio.run(queue.flush()) == 0
+        assert written == ["event_0"]
+        assert [row["event_type"] for _, row in queue._queue] == ["event_2", "event_3"]
+        stats = queue.stats()
+        assert (stats["rejected"], stats["failed_flushes"]) == (1, 1)
+
+    def test_size_threshold_wakes_flusher(self, db_session, async_factory):
+        queue = AnalyticsQueue(session_factory=async_factory, interval=60, batch_size=2)
+
+        async def run():
+            queue.start()
+            await queue.put(rows(2))
+            for _ in range(100):
+                if queue.flushed:
+                    break
+                await asyncio.sleep(0.01)
+            flushed = queue.flushed
+            await queue.stop()
+            return flushed
+
+        assert asyncio.run(run()) == 2
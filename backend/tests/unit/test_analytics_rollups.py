@@ -0,0 +1,82 @@
+import json
+from datetime import datetime
+from app.data_service import DataService
+from app.db import rollups
+from app.db.models import AnalyticsLog, AnalyticsHourlyRollup, AnalyticsSessionRollup
+from app.db.rollups import page_url_of, roll_up_analytics
+
+
+def log(db_session, session_id, event_type, page_url=None, timestamp=datetime(2024, 5, 1, 9, 15)):
+    event = {"actionType": event_type, "payload": {"page_url": page_url} if page_url else {}}
+    # Stored the way log_event stores it: JSON text inside the JSON column
+    db_session.add(AnalyticsLog(session_id=session_id, event_type=event_type,
+                                event_data=json.dumps(event), timestamp=timestamp))
+    db_session.commit()
+
+
+def hourly(db_session):
+    db_session.expire_all()
+    return {(row.hour, row.event_type, row.page_url): row.count for row in db_session.query(AnalyticsHourlyRollup)}
+
+
+class TestAnalyticsRollups:
+    """Test the incremental analytics rollups"""
+
+    def test_page_url_of(self):
+        event = {"payload": {"page_url": "http://localhost:3000/questions/1?tab=votes#a2"}}
+        assert page_url_of(json.dumps(json.dumps(event))) == "http://localhost:3000/questions/1"
+        assert page_url_of(json.dumps(event)) == "http://localhost:3000/questions/1"
+        assert page_url_of(json.dumps({"payload": {}})) == ""
+        assert page_url_of("not json") == ""
+        assert page_url_of(None) == ""
+
+    def test_incremental_runs(self, db_session):
+        """A second run adds only the logs written since the first"""
+        engine = db_session.get_bind()
+        roll_up_analytics(engine)
+        before = hourly(db_session)
+
+        log(db_session, "s1", "click", "http://localhost:3000/?page=2")
+        log(db_session, "s1", "click", "http://localhost:3000/")
+        log(db_session, "s2", "scroll", timestamp=datetime(2024, 5, 1, 10, 5))
+        result = roll_up_analytics(engine, chunk=2)
+        assert (result["rolled_up"], result["chunks"]) == (3, 2)
+        assert result["high_water_mark"] == db_session.query(AnalyticsLog.id).order_by(AnalyticsLog.id.desc()).first()[0]
+
+        after = hourly(db_session)
+        assert after[("2024-05-01T09:00", "click", "http://localhost:3000/")] == \
+            before.get(("2024-05-01T09:00", "click", "http://localhost:3000/"), 0) + 2
+        assert after[("2024-05-01T10:00", "scroll", "")] == before.get(("2024-05-01T10:00", "scroll", ""), 0) + 1
+        assert roll_up_analytics(engine)["rolled_up"] == 0
+        assert hourly(db_session) == after
+
+        session = db_session.query(AnalyticsSessionRollup).filter_by(day="2024-05-01", session_id="s1").one()
+        assert (session.count, session.first_event_at, session.last_event_at) == \
+            (2, datetime(2024, 5, 1, 9, 15), datetime(2024, 5, 1, 9, 15))
+
+    def test_stale_mark_does_not_double_count(self, db_session, monkeypatch):
+        """A run that read an old high-water mark loses the compare-and-set and adds nothing"""
+        engine = db_session.get_bind()
+        log(db_session, "s1", "click", "http://localhost:3000/")
+        roll_up_analytics(engine)
+        counts = hourly(db_session)
+
+        monkeypatch.setattr(rollups, "get_high_water_mark", lambda connection: 0)
+        with engine.begin() as connection:
+            assert rollups._roll_up_chunk(connection, 100) == 0
+        assert hourly(db_session) == counts
+
+    def test_queries_read_rollups(self, db_session):
+        """Reports come from the rollups, so logs above the mark are not counted yet"""
+        log(db_session, "s1", "click", "http://localhost:3000/tags")
+        roll_up_analytics(db_session.get_bind())
+        log(db_session, "s1", "click", "http://localhost:3000/tags")
+
+        service = DataService(db_session)
+        result = service.get_hourly_analytics(start=datetime(2024, 5, 1, 9, 30), end=datetime(2024, 5, 1, 10),
+                                              page_url="http://localhost:3000/tags")
+        assert [(row["hour"], row["count"]) for row in result["rows"]] == [("2024-05-01T09:00", 1)]
+        assert service.get_hourly_analytics(end=datetime(2024, 5, 1, 9), page_url="http://localhost:3000/tags")["rows"] == []
+
+        sessions = service.get_session_analytics(day="2024-05-01", session_id="s1")["rows"]
+        assert [row["count"] for row in sessions] == [1]
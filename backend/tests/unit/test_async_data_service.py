@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app.async_data_service import AsyncDataService
+from app.data_service import DataService
+from app.db.db import create_async_app_engine
+from app.db.models import Tag
+from app.models import TagCreate
+
+
+@pytest.fixture
+def async_factory(db_session):
+    """Async sessions on the scratch database"""
+    url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_app_engine(url, poolclass=NullPool)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def run(factory, call):
+    async def main():
+        async with factory() as session:
+            return await call(AsyncDataService(session), session)
+    return asyncio.run(main())
+
+
+class TestAsyncDataService:
+    """Test DataService methods called through their async twins"""
+
+    def test_reads_match_the_sync_service(self, db_session, async_factory):
+        async def call(service, session):
+            return await service.get_question(1)
+
+        question = run(async_factory, call)
+        assert (question.id, question.title) == (1, DataService(db_session).get_question(1).title)
+
+    def test_reads_are_flagged_read_only_for_the_call(self, db_session, async_factory, monkeypatch):
+        flags = []
+        get_tag = DataService.get_tag
+
+        def recording(self, tag_id):
+            flags.append(self.db.info.get("read_only"))
+            return get_tag(self, tag_id)
+
+        monkeypatch.setattr(DataService, "get_tag", recording)
+
+        async def call(service, session):
+            tag = await service.get_tag(1)
+            return tag, session.info.get("read_only")
+
+        tag, after = run(async_factory, call)
+        assert tag.id == 1
+        assert flags == [True] and after is False
+
+    def test_writes_commit(self, db_session, async_factory):
+        async def call(service, session):
+            return await service.create_tag(TagCreate(name="asyncio-tag"))
+
+        created = run(async_factory, call)
+        assert db_session.query(Tag).filter(Tag.name == "asyncio-tag").one().id == created.id
@@ -0,0 +1,52 @@
+import pytest
+from app.data_service import DataService
+from app.db.counters import reconcile_counters
+from app.db.models import Question as DBQuestion, Answer as DBAnswer
+
+
+class TestDenormalizedCounters:
+    """Test answer/comment counters kept by DataService writes"""
+
+    def test_sample_data_counters(self, db_session):
+        """Populated sample data should start with correct counters"""
+        question = db_session.get(DBQuestion, 1)
+        assert question.answer_count == 1
+        assert question.comment_count == 0
+
+    def test_create_and_delete_answer(self, db_session):
+        """Creating and deleting answers should move answer_count"""
+        service = DataService(db_session)
+        answer = service.create_answer(question_id=1, user_id=2, content="Another answer")
+        assert service.get_question(1).answer_count == 2
+
+        service.delete_answer(answer.id)
+        assert service.get_question(1).answer_count == 1
+
+    def test_create_comment_on_question_and_answer(self, db_session):
+        """Comments should bump the counter of their target"""
+        service = DataService(db_session)
+        service.create_comment(question_id=1, answer_id=None, user_id=1, content="Question comment text")
+        service.create_comment(question_id=None, answer_id=1, user_id=1, content="Answer comment text")
+        db_session.expire_all()
+        assert db_session.get(DBQuestion, 1).comment_count == 1
+        assert db_session.get(DBAnswer, 1).comment_count == 1
+
+    def test_delete_answer_with_comments(self, db_session):
+        """Deleting a commented answer should remove its comments too"""
+        service = DataService(db_session)
+        service.create_comment(question_id=None, answer_id=1, user_id=1, content="Answer comment text")
+        assert service.delete_answer(1)
+        assert service.get_comments_for_answer(1) == []
+        assert service.get_question(1).answer_count == 0
+
+    def test_reconcile_fixes_drift(self, db_session):
+        """Reconcile should recompute counters that drifted"""
+        db_session.query(DBQuestion).filter(DBQuestion.id == 1).update({DBQuestion.answer_count: 42})
+        db_session.commit()
+
+        fixed = reconcile_counters(db_session.connection())
+        db_session.commit()
+        db_session.expire_all()
+
+        assert fixed["questions.answer_count"] == 1
+        assert db_session.get(DBQuestion, 1).answer_count == 1
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import text
+from app.db.db import (
+    create_app_engine, get_engine_profile, to_read_only_url,
+    RoutingSession, async_engine, async_reader_engine
+)
+
+
+class TestEngineProfiles:
+    """Test the SQLite engine profiles applied on connect"""
+
+    def test_tuned_profile_applies_pragmas(self, tmp_path):
+        """Every connection from a tuned engine should run in WAL mode"""
+        engine = create_app_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="tuned")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        engine.dispose()
+
+    def test_legacy_profile_keeps_driver_defaults(self, tmp_path):
+        """The legacy profile should leave the rollback journal in place"""
+        engine = create_app_engine(f"sqlite:///{tmp_path / 'legacy.db'}", profile="legacy")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        engine.dispose()
+
+    def test_unknown_profile(self):
+        """Unknown profile names should be rejected"""
+        with pytest.raises(ValueError):
+            get_engine_profile("turbo")
+
+
+class TestReadWriteRouting:
+    """Test routing of read-only work to the reader pool"""
+
+    def test_read_only_url_for_sqlite_file(self):
+        """File-backed SQLite URLs should map to a mode=ro URI"""
+        assert to_read_only_url("sqlite+aiosqlite:////data/app.db") == "sqlite+aiosqlite:///file:/data/app.db?mode=ro&uri=true"
+
+    def test_no_read_only_url_for_memory_or_other_databases(self):
+        """In-memory SQLite and non-SQLite URLs have no derived reader"""
+        assert to_read_only_url("sqlite+aiosqlite:///:memory:") is None
+        assert to_read_only_url("postgresql+asyncpg://user@host/db") is None
+
+    def test_routing_session_binds(self):
+        """Flagged reads go to the reader engine, everything else to the writer"""
+        session = RoutingSession()
+        assert session.get_bind() is async_engine.sync_engine
+        session.info["read_only"] = True
+        assert session.get_bind() is async_reader_engine.sync_engine
+        session.close()
@@ -0,0 +1,75 @@
+from sqlalchemy.orm import sessionmaker
+from app.data_service import DataService
+from app.db.models import Question
+from app.models import QuestionCreate
+from app.search import DuplicateIndex, signature
+from app.search import duplicates
+from app.search.duplicates import shingles, similarity
+
+DRAFT = ("How do I enable WAL mode in SQLite?",
+         "My FastAPI app uses SQLAlchemy with SQLite and concurrent writers keep failing with database is locked")
+
+
+def jaccard(first, second):
+    a, b = shingles(*first), shingles(*second)
+    return len(a & b) / len(a | b)
+
+
+class TestSignatures:
+    """Test MinHash estimates and LSH candidates directly"""
+
+    def test_estimate_tracks_jaccard(self):
+        edited = (DRAFT[0], DRAFT[1].replace("concurrent", "parallel"))
+        estimate = similarity(signature(*DRAFT), signature(*edited))
+        assert abs(estimate - jaccard(DRAFT, edited)) < 0.2
+        assert similarity(signature(*DRAFT), signature(*DRAFT)) == 1.0
+
+    def test_no_words(self):
+        assert signature("", "!!!") is None
+
+    def test_candidates_above_threshold(self):
+        index = DuplicateIndex()
+        index.add(1, signature(*DRAFT))
+        index.add(2, signature("Centering a div", "Flexbox or grid for centering content horizontally"))
+        assert [question_id for question_id, _ in index.candidates(signature(*DRAFT))] == [1]
+        assert index.candidates(signature(*DRAFT), exclude=1) == []
+
+    def test_candidate_budget(self, monkeypatch):
+        monkeypatch.setattr(duplicates, "DUPLICATE_MAX_CANDIDATES", 3)
+        index = DuplicateIndex()
+        for question_id in range(1, 11):
+            index.add(question_id, signature(*DRAFT))
+        assert [question_id for question_id, _ in index.candidates(signature(*DRAFT), limit=10)] == [8, 9, 10]
+
+
+class TestDuplicateDetection:
+    """Test lookups through DataService and commit-time updates"""
+
+    def test_created_and_edited_questions(self, db_session):
+        service = DataService(db_session)
+        assert service.find_duplicate_questions(*DRAFT) == []
+
+        created = service.create_question(QuestionCreate(title=DRAFT[0], body=DRAFT[1], author_id=1), 1)
+        assert [match["id"] for match in service.find_duplicate_questions(*DRAFT)] == [created.id]
+
+        service.update_question(created.id, QuestionCreate(title="Centering a div", body="With flexbox", author_id=1))
+        assert service.find_duplicate_questions(*DRAFT) == []
+
+    def test_rolled_back_question_is_not_a_duplicate(self, db_session):
+        service = DataService(db_session)
+        service.find_duplicate_questions(*DRAFT)
+        db_session.add(Question(title=DRAFT[0], body=DRAFT[1], author_id=1))
+        db_session.flush()
+        db_session.rollback()
+        assert service.find_duplicate_questions(*DRAFT) == []
+
+    def test_background_build(self, db_session):
+        service = DataService(db_session)
+        created = service.create_question(QuestionCreate(title=DRAFT[0], body=DRAFT[1], author_id=1), 1)
+        duplicates.duplicate_detector.clear()
+        key = duplicates.duplicate_detector.background.register(sessionmaker(bind=db_session.get_bind()))
+
+        # The first lookup starts the build and does not wait for it
+        assert service.find_duplicate_questions(*DRAFT) == []
+        assert duplicates.duplicate_detector.background.wait(key, timeout=30)
+        assert [match["id"] for match in service.find_duplicate_questions(*DRAFT)] == [created.id]
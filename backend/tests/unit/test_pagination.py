@@ -0,0 +1,113 @@
+import pytest
+from datetime import datetime, timedelta
+from app.data_service import DataService, QUESTION_SORTS, ANSWER_SORTS
+from app.db.models import Question as DBQuestion, Answer as DBAnswer, Tag as DBTag
+from app.pagination import encode_cursor, decode_cursor, next_cursor
+
+
+@pytest.fixture
+def paging_db(db_session):
+    """Sample data plus enough rows (with tied sort keys) to span several pages"""
+    now = datetime.utcnow()
+    for i in range(23):
+        db_session.add(DBQuestion(
+            title=f"Paging question {i}", body="body", author_id=1,
+            votes=i % 4, created_at=now - timedelta(minutes=i // 3), updated_at=now,
+        ))
+        db_session.add(DBAnswer(body=f"Paging answer {i}", author_id=2, question_id=1, votes=i % 3, created_at=now))
+        db_session.add(DBTag(name=f"paging-tag-{i:02d}", created_at=now))
+    db_session.commit()
+    return db_session
+
+
+def walk(fetch, cursor_of, limit):
+    """Follow cursors from the first page to the last and collect ids"""
+    ids, cursor = [], None
+    while True:
+        items, cursor = cursor_of(fetch(cursor), limit)
+        ids.extend(item.id for item in items)
+        if cursor is None:
+            return ids
+
+
+class TestCursorEncoding:
+    """Test the opaque cursor format"""
+
+    def test_round_trip_with_datetime(self):
+        """Datetimes survive encoding when the key column is a DateTime"""
+        stamp = datetime(2024, 1, 15, 10, 30, 0, 123456)
+        cursor = encode_cursor([stamp, 42])
+        assert decode_cursor(cursor, [DBQuestion.created_at, DBQuestion.id]) == [stamp, 42]
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor([1, 2, 3]), "e30"])
+    def test_invalid_cursor(self, cursor):
+        """Garbage or mismatched cursors raise ValueError"""
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor, [DBQuestion.votes, DBQuestion.id])
+
+
+class TestKeysetPagination:
+    """Walking cursors must return exactly the offset-paged sequence"""
+
+    @pytest.mark.parametrize("sort", ["newest", "votes", "active"])
+    def test_questions(self, paging_db, sort):
+        """Summary rows paged by cursor match one big page"""
+        service = DataService(paging_db)
+        expected = [q.id for q in service.get_questions(limit=1000, sort=sort)]
+
+        def page(rows, limit):
+            return rows, next_cursor(rows, QUESTION_SORTS[sort][0], limit)
+
+        ids = walk(lambda c: service.get_question_summaries(limit=5, sort=sort, cursor=c), page, 5)
+        assert ids == expected
+
+    @pytest.mark.parametrize("sort", ["votes", "newest", "oldest"])
+    def test_answers(self, paging_db, sort):
+        """Answers paged by cursor match one big page"""
+        service = DataService(paging_db)
+        expected = [a.id for a in service.get_answers(question_id=1, limit=1000, sort=sort)]
+
+        def page(rows, limit):
+            return rows, next_cursor(rows, ANSWER_SORTS[sort][0], limit)
+
+        ids = walk(lambda c: service.get_answers(question_id=1, limit=4, sort=sort, cursor=c), page, 4)
+        assert ids == expected
+
+    @pytest.mark.parametrize("sort", ["name", "newest", "popular"])
+    def test_tags(self, paging_db, sort):
+        """Tags paged by cursor match one big page, including the aggregate sort"""
+        service = DataService(paging_db)
+        expected = [t.id for t in service.get_tags(limit=1000, sort=sort).items]
+        ids = walk(
+            lambda c: service.get_tags(limit=6, sort=sort, cursor=c),
+            lambda result, limit: (result.items, result.next_cursor), 6,
+        )
+        assert ids == expected
+
+    def test_users(self, paging_db):
+        """Users paged by cursor match one big page"""
+        service = DataService(paging_db)
+        expected = [u.id for u in service.get_users(limit=1000).items]
+        ids = walk(
+            lambda c: service.get_users(limit=1, cursor=c),
+            lambda result, limit: (result.items, result.next_cursor), 1,
+        )
+        assert ids == expected
+
+    def test_insert_does_not_shift_next_page(self, paging_db):
+        """A new question at the head of the list must not repeat items"""
+        service = DataService(paging_db)
+        first = service.get_questions_by_user(1, limit=5)
+        second_expected = [q.id for q in service.get_questions_by_user(1, limit=5, cursor=first.next_cursor).items]
+
+        paging_db.add(DBQuestion(title="Brand new", body="body", author_id=1, created_at=datetime.utcnow() + timedelta(hours=1)))
+        paging_db.commit()
+
+        second = service.get_questions_by_user(1, limit=5, cursor=first.next_cursor)
+        assert [q.id for q in second.items] == second_expected
+        assert not {q.id for q in first.items} & set(second_expected)
+
+    def test_last_page_has_no_cursor(self, paging_db):
+        """A short page ends the walk"""
+        result = DataService(paging_db).get_users(limit=1000)
+        assert result.next_cursor is None
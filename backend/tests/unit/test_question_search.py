@@ -0,0 +1,125 @@
+from sqlalchemy import create_engine
+from app.data_service import DataService
+from app.db.base import Base
+from app.db.fts import fts5_supported, has_question_fts, match_expression
+from app.db.migrations import run_migrations
+from app.db.models import Question as DBQuestion, Tag
+
+
+def add_question(db_session, title, body, tags=()):
+    question = DBQuestion(title=title, body=body, author_id=1)
+    question.tags = [db_session.query(Tag).filter(Tag.name == name).one() for name in tags]
+    db_session.add(question)
+    db_session.commit()
+    return question.id
+
+
+def titles(results):
+    return [result["title"] for result in results]
+
+
+class TestMatchExpression:
+    """Test the conversion of free text to FTS5 queries"""
+
+    def test_words_are_quoted(self):
+        assert match_expression("Async Await") == '"async" "await"'
+
+    def test_operators_are_neutralised(self):
+        assert match_expression('title:x OR "y" NEAR(z)') == '"title" "x" "or" "y" "near" "z"'
+
+    def test_no_words(self):
+        assert match_expression("!!! ---") == ""
+
+    def test_migrations_refresh_the_cached_lookup(self, tmp_path):
+        """A database cached as lacking the index is looked up again once migrated"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+        Base.metadata.create_all(bind=engine)
+        try:
+            with engine.connect() as connection:
+                assert not has_question_fts(connection)
+                supported = fts5_supported(connection)
+            run_migrations(engine)
+            with engine.connect() as connection:
+                assert has_question_fts(connection) == supported
+        finally:
+            engine.dispose()
+
+
+class TestQuestionSearch:
+    """Test FTS5-backed question search"""
+
+    def test_title_hits_rank_above_body_hits(self, db_session):
+        body_hit = add_question(db_session, "Storing settings on disk", "I keep my settings in sqlite today")
+        title_hit = add_question(db_session, "Is sqlite fast enough?", "For a small web app backend")
+        results, total = DataService(db_session).search_questions("sqlite")
+        assert total == 2
+        assert [r["id"] for r in results] == [title_hit, body_hit]
+
+    def test_stemming(self, db_session):
+        add_question(db_session, "Indexing strategies", "How are indexes chosen by the planner?")
+        service = DataService(db_session)
+        assert titles(service.search_questions("index")[0]) == ["Indexing strategies"]
+        assert titles(service.search_questions("strategy")[0]) == ["Indexing strategies"]
+
+    def test_tag_filter_in_same_query(self, db_session):
+        add_question(db_session, "Decorators explained", "python decorators", tags=["python"])
+        add_question(db_session, "Decorators in TypeScript", "decorators proposal", tags=["javascript"])
+        results, total = DataService(db_session).search_questions("decorators", tags=["python"])
+        assert total == 1
+        assert titles(results) == ["Decorators explained"]
+
+    def test_index_follows_edits_and_deletes(self, db_session):
+        question_id = add_question(db_session, "Original wording", "nothing special")
+        service = DataService(db_session)
+        question = db_session.get(DBQuestion, question_id)
+        question.title = "Reworded heading"
+        db_session.commit()
+        assert service.search_questions("original")[1] == 0
+        assert titles(service.search_questions("reworded")[0]) == ["Reworded heading"]
+
+        db_session.delete(question)
+        db_session.commit()
+        assert service.search_questions("reworded")[1] == 0
+
+    def test_sort_by_votes(self, db_session):
+        low = add_question(db_session, "Caching layers", "caching")
+        high = add_question(db_session, "Caching headers", "caching")
+        db_session.get(DBQuestion, high).votes = 10
+        db_session.commit()
+        results, _ = DataService(db_session).search_questions("caching", sort="votes")
+        assert [r["id"] for r in results] == [high, low]
+
+    def test_fallback_without_index(self, db_session, monkeypatch):
+        monkeypatch.setattr("app.data_service.has_question_fts", lambda connection: False)
+        results, total = DataService(db_session).search_questions("Pyth")
+        assert total == 1
+        assert "Python" in results[0]["title"]
+
+
+class TestSearchFacets:
+    """Test facet counts over the whole match set"""
+
+    def test_counts_every_match(self, db_session):
+        first = add_question(db_session, "Pinning a wheel build", "The wheel build fails", ["python"])
+        add_question(db_session, "Caching wheel files", "Where do wheel files go?", ["python", "react"])
+        db_session.query(DBQuestion).filter(DBQuestion.id == first).update({DBQuestion.votes: 7, DBQuestion.answer_count: 2})
+        db_session.commit()
+
+        facets = DataService(db_session).search_question_facets("wheel")
+        assert facets["total"] == 2
+        assert facets["tags"] == [{"value": "python", "count": 2}, {"value": "react", "count": 1}]
+        assert facets["answered"] == [{"value": "answered", "count": 1}, {"value": "unanswered", "count": 1}]
+        assert {"value": "5-9", "count": 1} in facets["votes"]
+
+    def test_respects_tag_filter_and_top(self, db_session):
+        add_question(db_session, "Pinning a wheel build", "The wheel build fails", ["python"])
+        add_question(db_session, "Caching wheel files", "Where do wheel files go?", ["python", "react"])
+        facets = DataService(db_session).search_question_facets("wheel", tags=["React"], top_tags=1)
+        assert facets["total"] == 1
+        assert len(facets["tags"]) == 1
+
+    def test_cache_invalidated_by_new_match(self, db_session):
+        service = DataService(db_session)
+        assert service.search_question_facets("wheel")["total"] == 0
+        add_question(db_session, "Building a wheel", "With setuptools", ["python"])
+        assert service.search_question_facets("wheel")["total"] == 1
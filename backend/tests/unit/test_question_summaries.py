@@ -0,0 +1,56 @@
+import pytest
+from app.data_service import DataService, EXCERPT_LENGTH
+from app.db.models import Question as DBQuestion
+from app.routers.questions import convert_row_to_summary
+
+
+class TestQuestionSummaries:
+    """Test the projected listing query behind GET /questions/"""
+
+    def test_rows_match_full_objects(self, db_session):
+        """Summary rows should agree with the ORM objects they replace"""
+        service = DataService(db_session)
+        rows = service.get_question_summaries(limit=10)
+        questions = service.get_questions(limit=10)
+
+        assert [row.id for row in rows] == [q.id for q in questions]
+        for row, question in zip(rows, questions):
+            assert row.title == question.title
+            assert row.answer_count == len(question.answers)
+            assert sorted(row.tag_names.split("\x1f")) == sorted(t.name for t in question.tags)
+            assert row.author_name == question.author.name
+
+    def test_long_body_is_cut_in_sql(self, db_session):
+        """Bodies longer than the excerpt come back truncated and flagged"""
+        question = db_session.get(DBQuestion, 1)
+        question.body = "x" * (EXCERPT_LENGTH + 50)
+        db_session.commit()
+
+        row = next(r for r in DataService(db_session).get_question_summaries(limit=50) if r.id == 1)
+        assert len(row.excerpt) == EXCERPT_LENGTH
+        assert row.truncated
+
+        summary = convert_row_to_summary(row)
+        assert summary.content == "x" * EXCERPT_LENGTH + "..."
+
+    def test_tag_and_user_filters(self, db_session):
+        """Tag and author filters narrow the page"""
+        service = DataService(db_session)
+        tagged = service.get_question_summaries(tag="PYTHON", limit=50)
+        assert tagged
+        assert all("python" in row.tag_names.split("\x1f") for row in tagged)
+
+        by_user = service.get_question_summaries(user_id=1, limit=50)
+        expected = db_session.query(DBQuestion).filter(DBQuestion.author_id == 1).count()
+        assert len(by_user) == expected
+
+    def test_unknown_tag_returns_no_rows(self, db_session):
+        """An unknown tag yields an empty page"""
+        assert DataService(db_session).get_question_summaries(tag="no-such-tag") == []
+
+    @pytest.mark.parametrize("sort,column", [("newest", "created_at"), ("votes", "votes")])
+    def test_sort_orders(self, db_session, sort, column):
+        """Rows come back in the requested order"""
+        rows = DataService(db_session).get_question_summaries(sort=sort, limit=50)
+        values = [getattr(row, column) for row in rows]
+        assert values == sorted(values, reverse=True)
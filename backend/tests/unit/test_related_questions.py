@@ -0,0 +1,104 @@
+import math
+from sqlalchemy.orm import sessionmaker
+from app.data_service import DataService
+from app.db.models import Question, Tag
+from app.models import QuestionCreate
+from app.search import RelatedIndex, question_vector, related_questions, rebuild_related
+from app.search.hooks import database_key
+
+
+def add_question(db_session, title, body, tags=()):
+    question = Question(title=title, body=body, author_id=1)
+    question.tags = [db_session.query(Tag).filter(Tag.name == name).one() for name in tags]
+    db_session.add(question)
+    db_session.commit()
+    return question.id
+
+
+def related_ids(service, question_id, limit=10):
+    return [q["id"] for q in service.get_related_questions(question_id, limit)]
+
+
+class TestRelatedIndex:
+    """Test vectors and similarity lookups directly"""
+
+    def test_tags_are_separate_terms(self):
+        vector = question_vector("Python python", "", ["Python"])
+        assert set(vector) == {"python", "#python"}
+        assert vector["python"] == 1 + math.log(6)
+
+    def test_most_similar_first(self):
+        index = RelatedIndex()
+        index.add(1, question_vector("sqlite locking in wal mode", "", ["sqlite"]))
+        index.add(2, question_vector("sqlite wal checkpoint", "", ["sqlite"]))
+        index.add(3, question_vector("react hooks", "", ["react"]))
+        index.add(4, question_vector("sqlite vacuum", "", []))
+        index.add(5, question_vector("react state", "", ["react"]))
+        assert [question_id for question_id, _ in index.related(1)] == [2, 4]
+        index.remove(2)
+        assert [question_id for question_id, _ in index.related(1)] == [4]
+
+
+class TestRelatedQuestions:
+    """Test lookups through DataService and commit-time updates"""
+
+    def test_create_update_delete_apply_incrementally(self, db_session):
+        service = DataService(db_session)
+        first = add_question(db_session, "Tuning sqlite wal checkpoints", "Checkpoints stall writers")
+        assert related_ids(service, first) == []
+        builds = related_questions.builds
+
+        created = service.create_question(
+            QuestionCreate(title="When do sqlite wal checkpoints run?", body="Writers stall on checkpoints",
+                           author_id=1, tags=["sqlite"]), 1)
+        assert related_ids(service, first) == [created.id]
+
+        service.update_question(created.id, QuestionCreate(title="Styling buttons", body="With css grid", author_id=1))
+        assert created.id not in related_ids(service, first)
+
+        service.update_question(created.id, QuestionCreate(title="sqlite wal checkpoints again", body="Checkpoints stall",
+                                                           author_id=1))
+        assert related_ids(service, first) == [created.id]
+        service.delete_question(created.id)
+        assert related_ids(service, first) == []
+        assert related_questions.builds == builds
+
+    def test_missing_question(self, db_session):
+        assert DataService(db_session).get_related_questions(9999) is None
+
+    def test_process_pool_rebuild_matches_lazy_build(self, db_session):
+        service = DataService(db_session)
+        first = add_question(db_session, "Tuning sqlite wal checkpoints", "Checkpoints stall writers", ["python"])
+        add_question(db_session, "When do sqlite wal checkpoints run?", "Writers stall on checkpoints", ["python"])
+        lazy = service.get_related_questions(first)
+        assert rebuild_related(db_session, workers=2)["questions"] == db_session.query(Question).count()
+        assert service.get_related_questions(first) == lazy
+
+    def test_tag_links_are_reread_without_a_rebuild(self, db_session):
+        service = DataService(db_session)
+        tag = Tag(name="checkpointing")
+        db_session.add(tag)
+        db_session.commit()
+        first = add_question(db_session, "Tuning sqlite wal", "Writers stall", ["checkpointing"])
+        second = add_question(db_session, "Styling buttons", "With css grid")
+        assert related_ids(service, first) == []
+        builds = related_questions.builds
+
+        assert service.add_tag_to_question(second, tag.id)
+        assert related_ids(service, first) == [second]
+        assert service.remove_tag_from_question(second, tag.id)
+        assert related_ids(service, first) == []
+        assert related_questions.builds == builds
+
+    def test_background_build(self, db_session):
+        service = DataService(db_session)
+        first = add_question(db_session, "Tuning sqlite wal checkpoints", "Checkpoints stall writers")
+        second = add_question(db_session, "When do sqlite wal checkpoints run?", "Writers stall on checkpoints")
+        related_questions.clear()
+        key = related_questions.background.register(sessionmaker(bind=db_session.get_bind()))
+
+        # The first lookup starts the build and does not wait for it
+        assert related_ids(service, first) == []
+        assert related_questions.background.wait(key, timeout=30)
+        assert related_ids(service, first) == [second]
+        assert key == database_key(db_session.get_bind().url)
@@ -0,0 +1,81 @@
+from sqlalchemy import event
+from app.data_service import DataService
+from app.db.models import Question, Tag
+from app.search import SearchResultCache, search_cache
+
+
+class TestSearchResultCache:
+    """Test the LRU and generation bookkeeping directly"""
+
+    def test_lru_eviction(self):
+        cache = SearchResultCache(max_entries=2, ttl=60)
+        for key in ("a", "b"):
+            cache.put((key,), cache.snapshot(()), [1], 1)
+        assert cache.get(("a",), ()) == ([1], 1)
+        cache.put(("c",), cache.snapshot(()), [2], 1)
+        assert cache.get(("b",), ()) is None
+        assert cache.get(("a",), ()) is not None
+        assert cache.evictions == 1
+
+    def test_ttl_expiry(self):
+        cache = SearchResultCache(ttl=0)
+        cache.put(("a",), cache.snapshot(()), [1], 1)
+        assert cache.get(("a",), ()) is None
+        assert cache.expirations == 1
+
+    def test_tag_bump_only_invalidates_matching_filters(self):
+        cache = SearchResultCache(ttl=60)
+        cache.put(("python",), cache.snapshot(("python",)), [1], 1)
+        cache.put(("react",), cache.snapshot(("react",)), [2], 1)
+        cache.put(("all",), cache.snapshot(()), [1, 2], 2)
+        cache.invalidate(["python"])
+        assert cache.get(("python",), ("python",)) is None
+        assert cache.get(("react",), ("react",)) == ([2], 1)
+        assert cache.get(("all",), ()) is None
+        cache.invalidate()
+        assert cache.get(("react",), ("react",)) is None
+        assert cache.stale == 3
+
+
+class TestCachedSearch:
+    """Test search_questions through the cache"""
+
+    def test_repeat_search_skips_queries(self, db_session):
+        service = DataService(db_session)
+        first = service.search_questions("python", tags=["Python"])
+        hits = search_cache.hits
+
+        statements = []
+        engine = db_session.get_bind()
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            again = service.search_questions("Python", tags=["python"])
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert search_cache.hits == hits + 1
+        assert [q["id"] for q in again[0]] == [q["id"] for q in first[0]]
+        assert again[1] == first[1]
+        assert not any("count(" in statement.lower() or "MATCH" in statement for statement in statements)
+
+    def test_new_question_invalidates(self, db_session):
+        service = DataService(db_session)
+        _, total = service.search_questions("python")
+        question = Question(title="Python packaging", body="How do I publish a package?", author_id=1)
+        question.tags = [db_session.query(Tag).filter(Tag.name == "python").one()]
+        db_session.add(question)
+        db_session.commit()
+        results, new_total = service.search_questions("python")
+        assert new_total == total + 1
+        assert question.id in [q["id"] for q in results]
+
+    def test_unrelated_tag_edit_keeps_entry(self, db_session):
+        service = DataService(db_session)
+        service.search_questions("python", tags=["python"])
+        question = db_session.query(Question).filter(~Question.tags.any(Tag.name == "python")).first()
+        question.title = question.title + " (edited)"
+        db_session.commit()
+        hits = search_cache.hits
+        service.search_questions("python", tags=["python"])
+        assert search_cache.hits == hits + 1
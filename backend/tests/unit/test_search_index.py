@@ -0,0 +1,180 @@
+import asyncio
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.data_service import DataService
+from app.db.db import create_async_app_engine, get_async_db
+from app.db.models import Answer as DBAnswer, Question as DBQuestion, User
+from app.models import AnswerUpdate
+from app.search import ENTITIES, InvertedIndex, search_engine, tokenize
+from app.search.engine import database_key, _statement_ids
+from main import app
+
+
+def ids_of(page):
+    return [item.id for item in page.items]
+
+
+class TestInvertedIndex:
+    """Test the TF-IDF index itself"""
+
+    def test_tokenize(self):
+        assert tokenize("John_Doe likes C++ & Rust!") == ["john", "doe", "likes", "c", "rust"]
+
+    def test_every_word_must_match(self):
+        index = InvertedIndex()
+        index.add(1, {"python": 1, "async": 1})
+        index.add(2, {"python": 1})
+        assert index.search("python async") == ([1], 1)
+        assert index.search("python missing") == ([], 0)
+
+    def test_rare_terms_and_boosts_rank_higher(self):
+        index = InvertedIndex()
+        index.add(1, {"python": 1, "common": 1})
+        index.add(2, {"python": 1, "common": 1, "rare": 1})
+        index.add(3, {"common": 1})
+        # The rarer query term decides the order
+        assert index.search("common rare")[0] == [2]
+        # Equal text, so the boost signal breaks the tie
+        index.add(4, {"python": 1, "common": 1}, signal=100)
+        assert index.search("python common")[0][0] == 4
+
+    def test_sorts_and_pages(self):
+        index = InvertedIndex()
+        for doc_id in range(1, 6):
+            index.add(doc_id, {"word": 1}, signal=10 - doc_id, created=doc_id)
+        assert index.search("word", sort="signal") == ([1, 2, 3, 4, 5], 5)
+        assert index.search("word", sort="newest", offset=1, limit=2) == ([4, 3], 5)
+
+    def test_replace_and_remove(self):
+        index = InvertedIndex()
+        index.add(1, {"before": 1})
+        index.add(1, {"after": 1})
+        assert index.search("before") == ([], 0)
+        index.remove(1)
+        assert index.search("after") == ([], 0)
+        assert index.stats() == {"documents": 0, "terms": 0, "postings": 0}
+
+
+class TestSearchEngine:
+    """Test index builds and commit-time updates through DataService"""
+
+    def test_database_key_ignores_driver_and_read_only_uri(self, tmp_path):
+        path = tmp_path / "app.db"
+        writer = make_url(f"sqlite+aiosqlite:///{path}")
+        reader = make_url(f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true")
+        assert database_key(writer) == database_key(reader) == database_key(make_url(f"sqlite:///{path}"))
+
+    def test_statement_ids(self):
+        from sqlalchemy import update
+        table = DBQuestion.__table__
+        assert _statement_ids(update(table).where(table.c.id == 3), table.c.id) == [3]
+        assert _statement_ids(update(table).where(table.c.id.in_([1, 2])), table.c.id) == [1, 2]
+        assert _statement_ids(update(table).where(table.c.votes > 1), table.c.id) is None
+
+    def test_search_each_entity(self, db_session):
+        service = DataService(db_session)
+        assert service.search_entities("questions", "python").total == 1
+        assert service.search_entities("users", "john").items[0].name == "john_doe"
+        assert service.search_entities("tags", "react").items[0].name == "react"
+        with pytest.raises(ValueError):
+            service.search_entities("comments", "python")
+
+    def test_committed_writes_update_the_index(self, db_session):
+        service = DataService(db_session)
+        service.search_entities("questions", "python")
+        builds = search_engine.builds
+
+        question = DBQuestion(title="Incremental indexing question", body="zebra", author_id=1)
+        db_session.add(question)
+        db_session.commit()
+        assert ids_of(service.search_entities("questions", "zebra")) == [question.id]
+
+        question.body = "giraffe"
+        db_session.commit()
+        assert service.search_entities("questions", "zebra").total == 0
+        assert ids_of(service.search_entities("questions", "giraffe")) == [question.id]
+
+        db_session.delete(question)
+        db_session.commit()
+        assert service.search_entities("questions", "giraffe").total == 0
+        assert search_engine.builds == builds
+
+    def test_rolled_back_writes_are_ignored(self, db_session):
+        service = DataService(db_session)
+        service.search_entities("users", "john")
+        db_session.add(User(name="okapi_fan", email="okapi@example.com", hashed_password="x"))
+        db_session.flush()
+        db_session.rollback()
+        assert service.search_entities("users", "okapi").total == 0
+
+    def test_bulk_vote_updates_refresh_signals(self, db_session):
+        service = DataService(db_session)
+        ids = []
+        for title in ("Pelican one", "Pelican two"):
+            question = DBQuestion(title=title, body="pelican", author_id=1)
+            db_session.add(question)
+            db_session.commit()
+            ids.append(question.id)
+        assert ids_of(service.search_entities("questions", "pelican", sort="votes")) == [ids[1], ids[0]]
+
+        service.vote_question(ids[0], 1, "up")
+        assert ids_of(service.search_entities("questions", "pelican", sort="votes")) == [ids[0], ids[1]]
+
+    def test_answer_edits_are_reindexed(self, db_session):
+        service = DataService(db_session)
+        answer_id = db_session.query(DBAnswer.id).order_by(DBAnswer.id).first()[0]
+        service.search_entities("answers", "python")
+        service.update_answer(answer_id, AnswerUpdate(body="Use a narwhal for this"))
+        assert ids_of(service.search_entities("answers", "narwhal")) == [answer_id]
+
+        # A bulk UPDATE of indexed text by id re-reads the document too
+        db_session.query(DBAnswer).filter(DBAnswer.id == answer_id).update({DBAnswer.body: "Try a capybara"})
+        db_session.commit()
+        assert service.search_entities("answers", "narwhal").total == 0
+        assert ids_of(service.search_entities("answers", "capybara")) == [answer_id]
+
+    def test_background_build_falls_back_to_the_database(self, db_session):
+        service = DataService(db_session)
+        search_engine.clear()
+        key = search_engine.background.register(sessionmaker(bind=db_session.get_bind()))
+
+        # The first search starts the build and is answered without the index
+        builds = search_engine.builds
+        page = service.search_entities("users", "john")
+        assert page.total == 1 and page.items[0].name == "john_doe"
+        assert search_engine.background.wait(key, timeout=30)
+        assert search_engine.builds == builds + len(ENTITIES)
+        assert service.search_entities("users", "john").items[0].name == "john_doe"
+
+    def test_second_session_sees_the_same_index(self, db_session):
+        """Sessions on another engine for the same file share the index"""
+        DataService(db_session).search_entities("tags", "python")
+        other = sessionmaker(bind=db_session.get_bind())()
+        try:
+            builds = search_engine.builds
+            assert DataService(other).search_entities("tags", "python").total == 1
+            assert search_engine.builds == builds
+        finally:
+            other.close()
+
+    def test_router_returns_a_list_with_the_total_in_a_header(self, client, db_session):
+        url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+        engine = create_async_app_engine(url, poolclass=NullPool)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def override():
+            async with factory() as session:
+                yield session
+
+        app.dependency_overrides[get_async_db] = override
+        try:
+            response = client.get("/search/tags?query=python")
+        finally:
+            app.dependency_overrides.pop(get_async_db, None)
+            asyncio.run(engine.dispose())
+        assert response.status_code == 200
+        assert [tag["name"] for tag in response.json()] == ["python"]
+        assert response.headers["X-Total-Count"] == "1"
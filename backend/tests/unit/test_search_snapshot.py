@@ -0,0 +1,92 @@
+import os
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.data_service import DataService
+from app.db.models import Question, Answer
+from app.search import search_engine
+from app.search.snapshot import build_snapshot, load_snapshot
+
+
+def ids_of(page):
+    return [item.id for item in page.items]
+
+
+def searches(db_session):
+    service = DataService(db_session)
+    return [
+        (ids_of(service.search_entities(kind, query)), service.search_entities(kind, query).total)
+        for kind, query in (("questions", "python"), ("questions", "react"), ("answers", "use"))
+    ]
+
+
+class TestSearchSnapshot:
+    """Test offline snapshot builds, resumes and loads"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_loaded_indexes_match_lazy_build(self, db_session, tmp_path, workers):
+        path = str(tmp_path / "index.bin")
+        result = build_snapshot(db_session, path, workers=workers, chunk_size=3)
+        assert result["documents"]["questions"] == db_session.query(Question).count()
+        expected = searches(db_session)
+
+        search_engine.clear()
+        builds = search_engine.builds
+        loaded = load_snapshot(db_session, path)
+        assert loaded == {"questions": db_session.query(Question).count(), "answers": db_session.query(Answer).count()}
+        assert searches(db_session) == expected
+        assert search_engine.builds == builds
+
+    def test_catches_up_with_later_writes(self, db_session, tmp_path):
+        path = str(tmp_path / "index.bin")
+        build_snapshot(db_session, path, workers=1)
+        edited, deleted = db_session.query(Question).order_by(Question.id).all()[:2]
+        edited.body = "walrus"
+        added = Question(title="Snapshot catch up", body="narwhal", author_id=1)
+        db_session.add(added)
+        deleted_id, deleted_title = deleted.id, deleted.title
+        db_session.delete(deleted)
+        db_session.commit()
+
+        search_engine.clear()
+        load_snapshot(db_session, path)
+        service = DataService(db_session)
+        assert ids_of(service.search_entities("questions", "narwhal")) == [added.id]
+        assert ids_of(service.search_entities("questions", "walrus")) == [edited.id]
+        assert deleted_id not in ids_of(service.search_entities("questions", deleted_title))
+
+    def test_resume_after_interruption(self, db_session, tmp_path):
+        path = str(tmp_path / "index.bin")
+
+        def interrupt(kind, done, total):
+            if kind == "answers":
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            build_snapshot(db_session, path, workers=1, chunk_size=2, progress=interrupt)
+        assert not os.path.exists(path) and os.path.exists(path + ".progress")
+
+        reported = []
+        result = build_snapshot(db_session, path, workers=1, chunk_size=2, resume=True,
+                                progress=lambda kind, done, total: reported.append(kind))
+        assert "questions" not in reported
+        assert result["documents"]["answers"] == db_session.query(Answer).count()
+        assert result["documents"]["questions"] == db_session.query(Question).count()
+        assert not os.path.exists(path + ".progress")
+
+        expected = searches(db_session)
+        search_engine.clear()
+        load_snapshot(db_session, path)
+        assert searches(db_session) == expected
+
+    def test_snapshot_of_another_database_is_ignored(self, db_session, tmp_path):
+        path = str(tmp_path / "index.bin")
+        build_snapshot(db_session, path, workers=1)
+        from app.db.db import create_app_engine
+        other = create_app_engine(f"sqlite:///{tmp_path / 'other.db'}")
+        session = sessionmaker(bind=other)()
+        try:
+            assert load_snapshot(session, path) is None
+        finally:
+            session.close()
+            other.dispose()
+        assert load_snapshot(db_session, str(tmp_path / "missing.bin")) is None
@@ -0,0 +1,60 @@
+import sqlite3
+from app.search import highlight, snippet
+from app.search.stemmer import fts_term
+
+FILLER = "Lorem ipsum dolor sit amet consectetur " * 20
+
+
+class TestSnippets:
+    """Test snippet windows and highlight offsets"""
+
+    def test_window_covers_most_distinct_terms(self):
+        body = FILLER + "an index on sqlite " + FILLER + "we tried Indexing the sqlite database with a covering index. " + FILLER
+        excerpt, highlights = snippet(body, ["index", "sqlite", "covering"])
+        assert [excerpt[start:end] for start, end in highlights] == ["Indexing", "sqlite", "covering", "index"]
+        assert excerpt.startswith("...") and excerpt.endswith("...")
+        assert len(excerpt) <= 200 + 2 * len("...")
+
+    def test_words_not_cut_at_window_edges(self):
+        excerpt, _ = snippet(FILLER + "sqlite " + FILLER, ["sqlite"])
+        words = set(FILLER.split())
+        assert all(word in words | {"sqlite"} for word in excerpt.strip(".").split())
+
+    def test_short_text_returned_whole(self):
+        assert snippet("Why is SQLite locked?", ["sqlite"]) == ("Why is SQLite locked?", [[7, 13]])
+
+    def test_no_match_gives_leading_excerpt(self):
+        excerpt, highlights = snippet(FILLER, ["sqlite"])
+        assert excerpt.startswith("Lorem") and excerpt.endswith("...")
+        assert highlights == []
+
+    def test_highlight_matches_whole_words_only(self):
+        assert highlight("reindex the index_name indexes", ["index"]) == [[12, 17], [23, 30]]
+        assert highlight(None, ["index"]) == []
+
+    def test_highlight_matches_stems(self):
+        """Words sharing the query's stem are highlighted, words merely sharing its prefix are not"""
+        text = "He runs; she ran; the runway was running."
+        assert [text[start:end] for start, end in highlight(text, ["running"])] == ["runs", "running"]
+        assert highlight("Connected CONNECTIONS", ["connect"]) == [[0, 9], [10, 21]]
+
+    def test_terms_match_the_fts_index(self):
+        """fts_term gives the terms SQLite's porter unicode61 tokenizer indexes"""
+        words = ["caresses", "ponies", "ties", "agreed", "hopping", "filing", "happy", "relational",
+                 "conditional", "digitizer", "vietnamization", "sensibiliti", "electrical", "adjustment",
+                 "adoption", "controll", "generalizations", "Café", "naïve", "ies", "eed", "go", "µs"]
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='porter unicode61')")
+            connection.execute("CREATE VIRTUAL TABLE v USING fts5vocab(t, 'instance')")
+            connection.executemany("INSERT INTO t(rowid, x) VALUES (?, ?)", enumerate(words, 1))
+            indexed = [term for _, term in connection.execute("SELECT doc, term FROM v ORDER BY doc")]
+        finally:
+            connection.close()
+        assert [fts_term(word) for word in words] == indexed
+
+    def test_word_longer_than_window(self):
+        """A matching word longer than the window is shown from its start, highlighted to the edge"""
+        excerpt, highlights = snippet("see " + "abc" * 100, ["abc" * 100])
+        assert excerpt == "..." + ("abc" * 100)[:200] + "..."
+        assert highlights == [[3, 203]]
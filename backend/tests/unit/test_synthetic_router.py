@@ -0,0 +1,160 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+import pytest
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app.db.db import create_async_app_engine, get_async_db
+from app.analytics_queue import AnalyticsQueue
+from app.db.models import AnalyticsLog
+from app.routers import synthetic
+from app.routers.synthetic import MAX_EVENT_BATCH
+from main import app
+
+
+@pytest.fixture
+def inserts(db_session, monkeypatch):
+    """Route the API's async sessions and analytics queue to the scratch database, and log its INSERT statements"""
+    url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_app_engine(url, poolclass=NullPool)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT"):
+            statements.append(statement)
+
+    async def override():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override
+    monkeypatch.setattr(synthetic, "analytics_queue", AnalyticsQueue(session_factory=factory))
+    yield statements
+    app.dependency_overrides.pop(get_async_db, None)
+    asyncio.run(engine.dispose())
+
+
+def logs_of(db_session, session_id):
+    db_session.expire_all()
+    return db_session.query(AnalyticsLog).filter(AnalyticsLog.session_id == session_id).order_by(AnalyticsLog.id).all()
+
+
+class TestLogEvents:
+    """Test batched analytics event logging"""
+
+    def test_batch_is_one_insert_with_per_event_results(self, client, db_session, inserts):
+        events = [
+            {"actionType": "click", "payload": {"page_url": "/"}},
+            "not an event",
+            {"actionType": "scroll", "payload": []},
+            {"actionType": "key_press", "payload": {"key": "a"}},
+        ]
+        response = client.post("/_synthetic/log_events?session_id=batch", json=events)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["accepted"], data["rejected"]) == (2, 2)
+        assert [result["accepted"] for result in data["results"]] == [True, False, False, True]
+        assert data["results"][2]["error"] == "payload must be an object"
+
+        assert inserts == [] and len(synthetic.analytics_queue) == 2
+        asyncio.run(synthetic.analytics_queue.flush())
+        assert len(inserts) == 1
+        logs = logs_of(db_session, "batch")
+        assert [log.event_type for log in logs] == ["click", "key_press"]
+        assert json.loads(logs[0].event_data) == events[0]
+
+    def test_nothing_queued_without_valid_events(self, client, db_session, inserts):
+        response = client.post("/_synthetic/log_events?session_id=empty", json=[{"actionType": ""}])
+        assert response.json()["accepted"] == 0
+        assert len(synthetic.analytics_queue) == 0
+
+    def test_events_past_a_full_queue_are_rejected(self, client, db_session, inserts):
+        synthetic.analytics_queue.max_size = 2
+        response = client.post("/_synthetic/log_events?session_id=full", json=[{"actionType": "click"}] * 3)
+        data = response.json()
+        assert (data["accepted"], data["rejected"]) == (2, 1)
+        assert data["results"][2] == {"index": 2, "accepted": False, "logged_action": "click",
+                                      "error": "Analytics queue is full"}
+
+    def test_logs_lag_until_flushed(self, client, db_session, inserts):
+        assert client.post("/_synthetic/log_event?session_id=mine", json={"actionType": "click"}).json()["status"] == "success"
+        assert client.get("/_synthetic/logs?session_id=mine").json()["logs"] == []
+        logs = client.get("/_synthetic/logs?session_id=mine&flush=true").json()["logs"]
+        assert [log["event_type"] for log in logs] == ["click"]
+
+    def test_malformed_single_event_is_rejected(self, client, db_session, inserts):
+        for event in ({"actionType": {"nested": True}}, {"actionType": "click", "payload": [1, 2]}):
+            response = client.post("/_synthetic/log_event?session_id=bad", json=event)
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert len(synthetic.analytics_queue) == 0
+        client.post("/_synthetic/log_event?session_id=bad", json={"actionType": "click"})
+        assert asyncio.run(synthetic.analytics_queue.flush()) == 1
+
+    def test_oversized_batch_is_rejected(self, client, db_session, inserts):
+        response = client.post("/_synthetic/log_events?session_id=big", json=[{}] * (MAX_EVENT_BATCH + 1))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert logs_of(db_session, "big") == []
+
+    def test_reset(self, client, db_session, inserts):
+        response = client.post("/_synthetic/reset?seed=7")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "ok", "seed": 7}
+
+
+@pytest.fixture
+def long_session(db_session):
+    """A session with 30 logs one minute apart, every third a scroll"""
+    start = datetime(2024, 5, 1)
+    db_session.add_all(
+        AnalyticsLog(session_id="long", event_type="scroll" if i % 3 == 0 else "click",
+                     event_data="{}", timestamp=start + timedelta(minutes=i))
+        for i in range(30)
+    )
+    db_session.commit()
+    return [log.id for log in logs_of(db_session, "long")]
+
+
+class TestSessionLogs:
+    """Test cursor-paged session log retrieval"""
+
+    def test_pages_back_with_before(self, client, long_session, inserts):
+        seen, params = [], {"session_id": "long", "limit": 12}
+        while True:
+            data = client.get("/_synthetic/logs", params=params).json()
+            seen += [log["id"] for log in data["logs"]]
+            if not data["next_cursor"]:
+                break
+            params["before"] = data["next_cursor"]
+        assert seen == long_session[::-1]
+
+    def test_after_returns_newer_logs(self, client, db_session, long_session, inserts):
+        first = client.get("/_synthetic/logs", params={"session_id": "long", "limit": 5}).json()
+        assert [log["id"] for log in first["logs"]] == long_session[:-6:-1]
+        polled = client.get("/_synthetic/logs", params={"session_id": "long", "after": first["prev_cursor"]}).json()
+        assert polled["logs"] == [] and polled["prev_cursor"] == first["prev_cursor"]
+
+        db_session.add(AnalyticsLog(session_id="long", event_type="click", event_data="{}", timestamp=datetime(2024, 5, 2)))
+        db_session.commit()
+        polled = client.get("/_synthetic/logs", params={"session_id": "long", "after": first["prev_cursor"]}).json()
+        assert len(polled["logs"]) == 1 and polled["next_cursor"] == polled["prev_cursor"]
+
+        older = client.get("/_synthetic/logs", params={"session_id": "long", "before": first["next_cursor"], "limit": 3}).json()
+        assert [log["id"] for log in older["logs"]] == long_session[-6:-9:-1]
+
+    def test_event_type_filter(self, client, long_session, inserts):
+        data = client.get("/_synthetic/logs", params={"session_id": "long", "event_type": "scroll", "limit": 4}).json()
+        assert [log["event_type"] for log in data["logs"]] == ["scroll"] * 4
+        rest = client.get("/_synthetic/logs", params={"session_id": "long", "event_type": "scroll",
+                                                      "before": data["next_cursor"]}).json()
+        assert len(rest["logs"]) == 6 and rest["next_cursor"] is None
+
+    def test_invalid_cursors(self, client, long_session, inserts):
+        assert client.get("/_synthetic/logs", params={"session_id": "long", "before": "nope"}).status_code == \
+            status.HTTP_400_BAD_REQUEST
+        cursor = client.get("/_synthetic/logs", params={"session_id": "long"}).json()["prev_cursor"]
+        response = client.get("/_synthetic/logs", params={"session_id": "long", "before": cursor, "after": cursor})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
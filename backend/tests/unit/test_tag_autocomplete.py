@@ -0,0 +1,85 @@
+from sqlalchemy.orm import sessionmaker
+from app.data_service import DataService
+from app.db.models import Tag
+from app.models import TagCreate
+from app.search import TagCompletions, tag_autocomplete
+
+
+def names(completions):
+    return [completion["name"] for completion in completions]
+
+
+class TestTagCompletions:
+    """Test the sorted array itself"""
+
+    def test_prefix_slice_ranked_by_count(self):
+        completions = TagCompletions([(1, "python", 50), (2, "pytest", 80), (3, "pandas", 90), (4, "Python-3", 50)])
+        assert [name for _, name, _ in completions.complete("py")] == ["pytest", "python", "Python-3"]
+        assert [name for _, name, _ in completions.complete("PY", limit=1)] == ["pytest"]
+        assert completions.complete("rust") == []
+
+    def test_upsert_and_remove(self):
+        completions = TagCompletions([(1, "python", 5)])
+        completions.complete("py")
+        completions.upsert(1, "cpython")
+        assert completions.complete("py") == []
+        assert completions.complete("cp") == [(1, "cpython", 5)]
+        completions.upsert(2, "cplusplus", 10)
+        assert [tag_id for tag_id, _, _ in completions.complete("c")] == [2, 1]
+        completions.remove(2)
+        assert len(completions) == 1
+
+
+class TestTagAutocomplete:
+    """Test lazy builds and commit-time updates through DataService"""
+
+    def test_create_rename_delete_update_in_place(self, db_session):
+        service = DataService(db_session)
+        assert names(service.autocomplete_tags("py")) == ["python"]
+        builds = tag_autocomplete.builds
+
+        tag = service.create_tag(TagCreate(name="pyramid"))
+        assert names(service.autocomplete_tags("pyr")) == ["pyramid"]
+
+        service.update_tag(tag.id, TagCreate(name="flask"))
+        assert service.autocomplete_tags("pyr") == []
+        assert names(service.autocomplete_tags("fl")) == ["flask"]
+
+        service.delete_tag(tag.id)
+        assert service.autocomplete_tags("fl") == []
+        assert tag_autocomplete.builds == builds
+
+    def test_rolled_back_tag_is_not_suggested(self, db_session):
+        service = DataService(db_session)
+        service.autocomplete_tags("")
+        db_session.add(Tag(name="phantom"))
+        db_session.flush()
+        db_session.rollback()
+        assert service.autocomplete_tags("ph") == []
+
+    def test_counts_refresh_after_ttl(self, db_session, monkeypatch):
+        service = DataService(db_session)
+        service.autocomplete_tags("re")
+        db_session.query(Tag).filter(Tag.name == "react").update({Tag.count: 42})
+        db_session.commit()
+        monkeypatch.setattr(tag_autocomplete, "ttl", 0)
+        assert service.autocomplete_tags("re")[0]["count"] == 42
+
+    def test_background_build_and_reload(self, db_session, monkeypatch):
+        service = DataService(db_session)
+        tag_autocomplete.clear()
+        key = tag_autocomplete.background.register(sessionmaker(bind=db_session.get_bind()))
+
+        # Nothing is suggested until the first build finishes
+        assert service.autocomplete_tags("py") == []
+        assert tag_autocomplete.background.wait(key, timeout=30)
+        assert names(service.autocomplete_tags("py")) == ["python"]
+
+        # An expired array is served while it reloads
+        db_session.query(Tag).filter(Tag.name == "python").update({Tag.count: 42})
+        db_session.commit()
+        monkeypatch.setattr(tag_autocomplete, "ttl", 0)
+        assert names(service.autocomplete_tags("py")) == ["python"]
+        assert tag_autocomplete.background.wait(key, timeout=30)
+        monkeypatch.setattr(tag_autocomplete, "ttl", 300)
+        assert service.autocomplete_tags("py")[0]["count"] == 42
@@ -0,0 +1,153 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from app.data_service import DataService
+from app.db.db import create_app_engine, to_read_only_url
+from app.db.models import Question as DBQuestion, Tag as DBTag
+from app.models import QuestionCreate
+from app.totals_cache import TotalsCache
+
+
+@pytest.fixture
+def count_statements(db_session):
+    """Record the COUNT queries issued against the test database"""
+    statements = []
+    engine = db_session.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "count(" in statement.lower():
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+class TestTotalsCache:
+    """Test cached, estimated and skipped listing totals"""
+
+    def test_repeat_total_hits_cache(self, db_session, count_statements):
+        """The second identical total is served without a COUNT query"""
+        service = DataService(db_session)
+        first = service.get_total_questions()
+        second = service.get_total_questions()
+        assert first == second == db_session.query(DBQuestion).count()
+        assert len(count_statements) == 2  # one cached COUNT, one from the assertion
+
+    def test_filters_are_cached_separately(self, db_session):
+        """Tag and user filters get their own totals"""
+        service = DataService(db_session)
+        everything = service.get_total_questions()
+        tagged = service.get_total_questions(tag="python")
+        by_user = service.get_total_questions(user_id=1)
+        assert tagged == len(service.get_questions_by_tag("python", limit=100).items)
+        assert by_user == db_session.query(DBQuestion).filter(DBQuestion.author_id == 1).count()
+        assert everything >= max(tagged, by_user)
+
+    def test_reader_shares_the_writers_totals(self, db_session):
+        """A read-only connection to the same file is served the cached total"""
+        total = DataService(db_session).get_total_questions()
+        reader = create_app_engine(to_read_only_url(str(db_session.get_bind().url)))
+        statements = []
+        event.listen(reader, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        try:
+            with sessionmaker(bind=reader)() as session:
+                assert DataService(session).get_total_questions() == total
+        finally:
+            reader.dispose()
+        assert not any("count(" in statement.lower() for statement in statements)
+
+    def test_commit_invalidates(self, db_session):
+        """Creating a question drops cached question totals after commit"""
+        service = DataService(db_session)
+        before = service.get_total_questions()
+        service.create_question(QuestionCreate(title="A brand new question", body="Body text for the question", tags=["python"], author_id=1), 1)
+        assert service.get_total_questions() == before + 1
+
+    def test_rollback_keeps_cache(self, db_session, count_statements):
+        """Uncommitted inserts do not invalidate"""
+        service = DataService(db_session)
+        service.get_total_questions()
+        db_session.add(DBQuestion(title="Never committed", body="body", author_id=1))
+        db_session.flush()
+        db_session.rollback()
+        service.get_total_questions()
+        assert len(count_statements) == 1
+
+    def test_ttl_expiry(self):
+        """Entries expire after the TTL"""
+        cache = TotalsCache(ttl=0)
+        calls = []
+        cache.get_or_compute("db", "questions", (), lambda: calls.append(1) or 1)
+        cache.get_or_compute("db", "questions", (), lambda: calls.append(1) or 1)
+        assert len(calls) == 2
+
+    def test_invalidation_during_compute_is_not_stored(self):
+        """A count that raced an invalidation is returned but not cached"""
+        cache = TotalsCache(ttl=60)
+
+        def compute():
+            cache.invalidate("questions")
+            return 5
+
+        assert cache.get_or_compute("db", "questions", (), compute) == 5
+        assert cache.stats()["entries"] == 0
+
+
+class TestTotalModes:
+    """Test the total_mode parameter"""
+
+    def test_none_skips_count(self, db_session, count_statements):
+        """none returns no total and runs no COUNT"""
+        service = DataService(db_session)
+        assert service.get_total_questions(total_mode="none") is None
+        assert service.get_tags(sort="name", total_mode="none").total is None
+        assert count_statements == []
+
+    def test_estimate_uses_counters(self, db_session, count_statements):
+        """estimate reads the highest id or Tag.count instead of counting rows"""
+        service = DataService(db_session)
+        assert service.get_total_questions(total_mode="estimate") == db_session.query(DBQuestion).count()
+        python = db_session.query(DBTag).filter(DBTag.name == "python").one()
+        assert service.get_total_questions(tag="python", total_mode="estimate") == python.count
+        # Only the assertion above counted rows
+        assert len(count_statements) == 1
+
+    def test_estimate_is_an_upper_bound_after_deletes(self, db_session):
+        """Without a cached count the highest id overcounts deleted rows; a cached exact total is preferred"""
+        service = DataService(db_session)
+        first = db_session.query(DBQuestion).order_by(DBQuestion.id).first()
+        assert service.delete_question(first.id)
+        remaining = db_session.query(DBQuestion).count()
+        assert service.get_total_questions(total_mode="estimate") == remaining + 1
+        assert service.get_total_questions() == remaining
+        assert service.get_total_questions(total_mode="estimate") == remaining
+
+    def test_invalid_mode(self, db_session):
+        """Unknown modes are rejected"""
+        with pytest.raises(ValueError):
+            DataService(db_session).get_total_questions(total_mode="guess")
+
+
+class TestTagCounts:
+    """Tag.count is maintained so it can serve as the per-tag estimate"""
+
+    def test_tag_links_move_count(self, db_session):
+        """Linking, unlinking and deleting questions keep Tag.count exact"""
+        service = DataService(db_session)
+        python = service.get_tag_by_name("python")
+        start = python.count
+        assert start == len(service.get_questions_by_tag("python", limit=100).items)
+
+        question = service.create_question(QuestionCreate(title="Another python question", body="Body text for the question", tags=["python"], author_id=1), 1)
+        db_session.refresh(python)
+        assert python.count == start + 1
+
+        service.remove_tag_from_question(question.id, python.id)
+        db_session.refresh(python)
+        assert python.count == start
+
+        service.add_tag_to_question(question.id, python.id)
+        service.delete_question(question.id)
+        db_session.refresh(python)
+        assert python.count == start
@@ -0,0 +1,87 @@
+from sqlalchemy.orm import sessionmaker
+from app.data_service import DataService
+from app.db.models import Question, Tag
+from app.models import QuestionCreate, TagCreate
+from app.search import TrigramIndex, correct_query, trigram_vocabulary, trigrams
+
+
+def add_question(db_session, title, body="A body long enough to be a question"):
+    question = Question(title=title, body=body, author_id=1)
+    db_session.add(question)
+    db_session.commit()
+    return question.id
+
+
+class TestTrigramIndex:
+    """Test trigram matching and reference counts directly"""
+
+    def test_padded_trigrams(self):
+        assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+
+    def test_similar_ranked_by_score_then_use(self):
+        index = TrigramIndex()
+        index.add(["asynchronous", "asynchronous", "synchronous", "python"])
+        matches = index.similar("asynchronus")
+        assert [term for term, _ in matches] == ["asynchronous", "synchronous"]
+        assert matches[0][1] > 0.5
+        assert index.similar("kotlin") == []
+
+    def test_posting_arrays_stay_sorted(self):
+        index = TrigramIndex()
+        index.add(["banana", "bandana", "cabana"])
+        assert all(list(postings) == sorted(postings) for postings in index._postings.values())
+
+    def test_removed_terms_are_not_suggested(self):
+        index = TrigramIndex()
+        index.add(["asynchronous", "asynchronous"])
+        index.remove(["asynchronous"])
+        assert "asynchronous" in index
+        index.remove(["asynchronous"])
+        assert "asynchronous" not in index
+        assert index.similar("asynchronus") == []
+
+
+class TestFuzzySearch:
+    """Test corrections and the search fallback through DataService"""
+
+    def test_fallback_corrects_misspelling(self, db_session):
+        question_id = add_question(db_session, "Debugging asynchronous generators")
+        service = DataService(db_session)
+        assert service.search_questions("asynchronus generatrs")[1] == 0
+        results, total, corrected = service.search_questions_with_fallback("asynchronus generatrs")
+        assert corrected == "asynchronous generators"
+        assert [result["id"] for result in results] == [question_id]
+
+    def test_no_fallback_when_exact_search_matches(self, db_session):
+        add_question(db_session, "Debugging asynchronous generators")
+        service = DataService(db_session)
+        for _ in range(3):
+            add_question(db_session, "Python generators explained")
+        assert service.search_questions_with_fallback("generators")[2] is None
+
+    def test_vocabulary_follows_edits(self, db_session):
+        service = DataService(db_session)
+        assert correct_query(db_session, "kubernets") is None
+        created = service.create_question(QuestionCreate(title="Kubernetes ingress", body="How to route", author_id=1), 1)
+        assert correct_query(db_session, "kubernets") == "kubernetes"
+        service.update_question(created.id, QuestionCreate(title="Docker ingress", body="How to route", author_id=1))
+        assert correct_query(db_session, "kubernets") is None
+
+    def test_tag_suggestions(self, db_session):
+        service = DataService(db_session)
+        assert service.suggest_search("javascrpt")["tags"][0]["name"] == "javascript"
+        service.create_tag(TagCreate(name="typescript"))
+        assert service.suggest_search("typscript")["tags"][0]["name"] == "typescript"
+        db_session.delete(db_session.query(Tag).filter(Tag.name == "typescript").one())
+        db_session.commit()
+        assert "typescript" not in [tag["name"] for tag in service.suggest_search("typscript")["tags"]]
+
+    def test_no_suggestions_while_building(self, db_session):
+        service = DataService(db_session)
+        trigram_vocabulary.clear()
+        key = trigram_vocabulary.background.register(sessionmaker(bind=db_session.get_bind()))
+
+        # The first lookup starts the build and does not wait for it
+        assert service.suggest_search("javascrpt")["tags"] == []
+        assert trigram_vocabulary.background.wait(key, timeout=30)
+        assert service.suggest_search("javascrpt")["tags"][0]["name"] == "javascript"
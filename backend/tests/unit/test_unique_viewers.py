@@ -0,0 +1,121 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.data_service import DataService
+from app.db.db import create_async_app_engine
+from app.db.models import Question as DBQuestion
+from app.sketches import HyperLogLog, WindowedBloomFilter
+from app.unique_viewers import UniqueViewerTracker, viewer_key
+
+
+class StubDataService:
+    """Serves stored sketches without a database"""
+
+    def __init__(self, stored=None):
+        self.stored = stored or {}
+        self.loads = 0
+
+    async def get_viewer_sketch(self, question_id):
+        self.loads += 1
+        return self.stored.get(question_id)
+
+
+@pytest.fixture
+def async_factory(db_session):
+    url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_app_engine(url)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+class TestSketches:
+    """Test the HyperLogLog and windowed Bloom filter"""
+
+    @pytest.mark.parametrize("n", [10, 1000, 20000])
+    def test_hyperloglog_accuracy(self, n):
+        sketch = HyperLogLog()
+        for i in range(n):
+            sketch.add(f"viewer-{i}".encode())
+        assert abs(sketch.estimate() - n) <= max(2, 0.1 * n)
+
+    def test_hyperloglog_merge_and_round_trip(self):
+        left, right = HyperLogLog(), HyperLogLog()
+        for i in range(500):
+            left.add(f"a{i}".encode())
+            right.add(f"b{i}".encode())
+        restored = HyperLogLog(registers=left.to_bytes())
+        assert restored.merge(right.to_bytes())
+        assert abs(restored.estimate() - 1000) <= 100
+        assert not restored.merge(left.to_bytes())
+
+    def test_bloom_filter_window(self):
+        recent = WindowedBloomFilter(window_seconds=0.05, capacity=1000)
+        assert not recent.seen(b"q1:viewer")
+        assert recent.seen(b"q1:viewer")
+        assert not recent.seen(b"q2:viewer")
+        # Forgotten after two rotations
+        time.sleep(0.06)
+        recent.seen(b"other")
+        time.sleep(0.06)
+        assert not recent.seen(b"q1:viewer")
+
+
+class TestUniqueViewerTracker:
+    """Test view dedupe and sketch persistence"""
+
+    def test_viewer_key(self):
+        assert viewer_key("abc", "10.0.0.1", "curl") == "session:abc"
+        assert viewer_key(None, "10.0.0.1", "curl") == "client:10.0.0.1:curl"
+
+    def test_repeat_views_are_not_counted(self):
+        tracker = UniqueViewerTracker(session_factory=None)
+        service = StubDataService()
+
+        async def run():
+            return [await tracker.observe(service, 1, viewer) for viewer in ["a", "a", "b", "a"]]
+
+        assert asyncio.run(run()) == [True, False, True, False]
+        assert tracker.estimate(1) == 2
+        assert tracker.stats()["repeats"] == 2
+        assert service.loads == 1
+
+    def test_persist_merges_into_stored_sketch(self, db_session, async_factory):
+        """Persisted registers combine with ones written by another process"""
+        other = HyperLogLog()
+        for i in range(50):
+            other.add(f"session:other-{i}".encode())
+        DataService(db_session).save_viewer_sketches({1: other.to_bytes()})
+
+        tracker = UniqueViewerTracker(session_factory=async_factory)
+        service = StubDataService()
+
+        async def run():
+            for i in range(30):
+                await tracker.observe(service, 1, f"session:mine-{i}")
+            return await tracker.flush()
+
+        assert asyncio.run(run()) == 1
+        db_session.expire_all()
+        assert abs(db_session.get(DBQuestion, 1).unique_viewers - 80) <= 8
+        assert tracker.stats()["dirty_sketches"] == 0
+
+    def test_sketches_of_deleted_questions_are_skipped(self, db_session):
+        sketch = HyperLogLog()
+        sketch.add(b"viewer")
+        assert DataService(db_session).save_viewer_sketches({9999: sketch.to_bytes()}) == {}
+
+    def test_only_clean_sketches_are_evicted(self):
+        tracker = UniqueViewerTracker(session_factory=None, max_sketches=2)
+        service = StubDataService()
+
+        async def run():
+            for question_id in (1, 2, 3):
+                await tracker.observe(service, question_id, "viewer")
+
+        asyncio.run(run())
+        # All three have unpersisted changes, so none may be dropped yet
+        assert tracker.stats()["loaded_sketches"] == 3
+        tracker._dirty.clear()
+        asyncio.run(tracker.observe(service, 4, "viewer"))
+        assert tracker.stats()["loaded_sketches"] == 2
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.db import create_async_app_engine
+from app.db.models import Question as DBQuestion
+from app.view_counter import ViewCounterBuffer
+
+
+@pytest.fixture
+def async_factory(db_session):
+    """An async session factory on the scratch database, plus its UPDATE log"""
+    url = str(db_session.get_bind().url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_app_engine(url)
+    updates = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            updates.append(statement)
+
+    yield async_sessionmaker(engine, expire_on_commit=False), updates
+    asyncio.run(engine.dispose())
+
+
+def views_of(db_session, question_id):
+    db_session.expire_all()
+    return db_session.get(DBQuestion, question_id).views
+
+
+class TestViewCounterBuffer:
+    """Test the write-behind view counter"""
+
+    def test_record_aggregates_per_question(self):
+        """Repeated views of a question collapse into one pending counter"""
+        buffer = ViewCounterBuffer(session_factory=None)
+        for _ in range(3):
+            buffer.record(1)
+        buffer.record(2)
+        assert buffer.pending(1) == 3
+        assert buffer.pending(2) == 1
+        assert buffer.stats()["pending_questions"] == 2
+
+    def test_flush_is_one_batched_update(self, db_session, async_factory):
+        """All pending questions are written by a single UPDATE ... CASE"""
+        factory, updates = async_factory
+        before = {qid: views_of(db_session, qid) for qid in (1, 2)}
+        buffer = ViewCounterBuffer(session_factory=factory)
+        for _ in range(5):
+            buffer.record(1)
+        buffer.record(2)
+
+        assert asyncio.run(buffer.flush()) == 6
+        assert len(updates) == 1 and "CASE" in updates[0]
+        assert views_of(db_session, 1) == before[1] + 5
+        assert views_of(db_session, 2) == before[2] + 1
+        assert buffer.pending(1) == 0
+
+    def test_buffer_is_bounded(self):
+        """New questions are dropped once max_keys are pending"""
+        buffer = ViewCounterBuffer(session_factory=None, max_keys=2)
+        assert buffer.record(1) and buffer.record(2)
+        assert not buffer.record(3)
+        assert buffer.record(1)
+        assert buffer.stats()["dropped"] == 1
+        assert buffer.pending(1) == 2
+
+    def test_failed_flush_keeps_views(self):
+        """A batch that cannot be written goes back into the buffer"""
+        def broken_factory():
+            raise RuntimeError("database is locked")
+
+        buffer = ViewCounterBuffer(session_factory=broken_factory)
+        buffer.record(1)
+        assert asyncio.run(buffer.flush()) == 0
+        assert buffer.pending(1) == 1
+        assert buffer.stats()["failed_flushes"] == 1
+
+    def test_stop_flushes_pending_views(self, db_session, async_factory):
+        """Shutdown writes whatever is still buffered"""
+        factory, _ = async_factory
+        before = views_of(db_session, 1)
+        buffer = ViewCounterBuffer(session_factory=factory, interval=3600)
+
+        async def run():
+            buffer.start()
+            buffer.record(1)
+            await buffer.stop()
+
+        asyncio.run(run())
+        assert views_of(db_session, 1) == before + 1
+        assert not buffer.stats()["running"]
+
+    def test_threshold_wakes_flusher(self, db_session, async_factory):
+        """Reaching the threshold flushes before the interval elapses"""
+        factory, _ = async_factory
+        buffer = ViewCounterBuffer(session_factory=factory, interval=3600, threshold=2)
+
+        async def run():
+            buffer.start()
+            buffer.record(1)
+            buffer.record(2)
+            for _ in range(100):
+                if buffer.stats()["flushes"]:
+                    break
+                await asyncio.sleep(0.01)
+            await buffer.stop()
+
+        asyncio.run(run())
+        assert buffer.stats()["flushes"] == 1